@@ -5,5 +5,6 @@ Analysis package - Moduli di analisi COT
 # ✅ Import CORRETTI - SOLO moduli nella cartella analysis/
 from .gpt_analyzer import GPTAnalyzer
 from .predictions import COTPredictionSystem
+from .cot_metrics import compute_metrics, weighted_sentiment
 
-__all__ = ['GPTAnalyzer', 'COTPredictionSystem']
\ No newline at end of file
+__all__ = ['GPTAnalyzer', 'COTPredictionSystem', 'compute_metrics', 'weighted_sentiment']
\ No newline at end of file
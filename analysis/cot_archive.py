@@ -0,0 +1,216 @@
+"""
+Archivio colonnare dello storico COT (Parquet o Arrow IPC)
+Un file per simbolo e anno (ogni file contiene anche symbol e date):
+
+    data/cot_archive/GOLD/2024.parquet
+
+Le partizioni toccate da un ingest vengono riscritte (atomicamente) dal DB;
+backtest e training ML leggono da qui in memory-map senza passare dal
+database transazionale. Richiede pyarrow (opzionale).
+"""
+
+import logging
+import os
+import sys
+import threading
+import uuid
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional
+
+# Setup path per imports
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    import pyarrow.dataset as ds
+    import pyarrow.parquet as pq
+    ARROW_AVAILABLE = True
+except ImportError:
+    ARROW_AVAILABLE = False
+
+try:
+    from config import current_config as config
+except ImportError:
+    config = None
+
+from analysis.cot_metrics import CHANGE_COLUMNS, METRIC_COLUMNS
+
+logger = logging.getLogger(__name__)
+
+ARCHIVE_DIR = os.getenv(
+    "COT_ARCHIVE_DIR",
+    os.path.join(getattr(config, 'DATA_FOLDER', 'data'), 'cot_archive')
+)
+ARCHIVE_FORMAT = os.getenv("COT_ARCHIVE_FORMAT", "parquet").lower()  # parquet | arrow
+ARCHIVE_ENABLED = ARROW_AVAILABLE and os.getenv("COT_ARCHIVE_ENABLED", "true").lower() == "true"
+
+# Colonne archiviate (ordine = ordine nel file)
+ARCHIVE_COLUMNS = [
+    'symbol', 'date',
+    'non_commercial_long', 'non_commercial_short', 'non_commercial_spreads',
+    'commercial_long', 'commercial_short',
+    'net_position', 'sentiment_score',
+] + METRIC_COLUMNS + CHANGE_COLUMNS
+
+_FLOAT_COLUMNS = {'sentiment_score', 'nc_long_ratio', 'c_long_ratio', 'nc_share_pct', 'sentiment_change'}
+
+_WRITE_LOCK = threading.Lock()
+
+
+def _schema():
+    fields = [pa.field('symbol', pa.string()), pa.field('date', pa.timestamp('us'))]
+    for column in ARCHIVE_COLUMNS[2:]:
+        fields.append(pa.field(column, pa.float64() if column in _FLOAT_COLUMNS else pa.int64()))
+    return pa.schema(fields)
+
+
+def _extension():
+    return 'arrow' if ARCHIVE_FORMAT == 'arrow' else 'parquet'
+
+
+def partition_path(symbol: str, year: int, root: str = None) -> str:
+    return os.path.join(root or ARCHIVE_DIR, symbol, f'{year}.{_extension()}')
+
+
+def write_partition(symbol: str, year: int, rows: Iterable[Dict], root: str = None) -> int:
+    """
+    Riscrive la partizione (simbolo, anno) con le righe date, in ordine di data.
+    Scrittura su file temporaneo + rename: i lettori non vedono mai file parziali.
+    Una partizione senza righe viene rimossa.
+
+    Returns:
+        righe scritte
+    """
+    if not ARCHIVE_ENABLED:
+        return 0
+
+    rows = sorted(rows, key=lambda r: r['date'])
+    path = partition_path(symbol, year, root)
+
+    with _WRITE_LOCK:
+        if not rows:
+            if os.path.exists(path):
+                os.remove(path)
+            return 0
+
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        table = pa.Table.from_pylist(
+            [{column: row.get(column) for column in ARCHIVE_COLUMNS} for row in rows],
+            schema=_schema()
+        )
+        # Prefisso '.': ignorato dalla discovery di pyarrow.dataset durante la scrittura.
+        # Il lock vale solo nel processo: nome univoco per worker/scrittura
+        tmp_path = os.path.join(
+            os.path.dirname(path), f'.{os.path.basename(path)}.{os.getpid()}.{uuid.uuid4().hex}.tmp'
+        )
+        try:
+            if ARCHIVE_FORMAT == 'arrow':
+                with pa.OSFile(tmp_path, 'wb') as sink:
+                    with pa.ipc.new_file(sink, table.schema) as writer:
+                        writer.write_table(table)
+            else:
+                pq.write_table(table, tmp_path, compression='zstd')
+            os.replace(tmp_path, path)
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+    return len(rows)
+
+
+def _read_partition(path: str, columns: Optional[List[str]]):
+    if path.endswith('.arrow'):
+        # Arrow IPC non compresso: memory-map zero-copy
+        table = pa.ipc.open_file(pa.memory_map(path, 'r')).read_all()
+        return table.select(columns) if columns else table
+    return pq.read_table(path, columns=columns, memory_map=True)
+
+
+def read_history(symbol: str, start: datetime = None, end: datetime = None,
+                 columns: List[str] = None, root: str = None):
+    """
+    Storico di un simbolo come pyarrow.Table (ordinato per data), leggendo
+    solo le partizioni degli anni richiesti.
+
+    Returns:
+        pyarrow.Table, oppure None se l'archivio non è disponibile o vuoto
+    """
+    if not ARROW_AVAILABLE:
+        return None
+
+    directory = os.path.join(root or ARCHIVE_DIR, symbol)
+    if not os.path.isdir(directory):
+        return None
+
+    selected = list(columns) if columns else None
+    if selected and 'date' not in selected:
+        selected.append('date')
+
+    tables = []
+    for name in sorted(os.listdir(directory)):
+        stem, _, extension = name.partition('.')
+        if extension != _extension() or not stem.isdigit():
+            continue
+        year = int(stem)
+        if (start and year < start.year) or (end and year > end.year):
+            continue
+        tables.append(_read_partition(os.path.join(directory, name), selected))
+    if not tables:
+        return None
+
+    table = pa.concat_tables(tables)
+    if start or end:
+        mask = None
+        if start:
+            mask = pc.greater_equal(table['date'], pa.scalar(start, pa.timestamp('us')))
+        if end:
+            upper = pc.less_equal(table['date'], pa.scalar(end, pa.timestamp('us')))
+            mask = upper if mask is None else pc.and_(mask, upper)
+        table = table.filter(mask)
+    table = table.sort_by('date')
+    return table.select(columns) if columns else table
+
+
+def read_frame(symbol: str, start: datetime = None, end: datetime = None,
+               columns: List[str] = None, root: str = None):
+    """Come read_history ma come pandas.DataFrame (None se non disponibile)"""
+    table = read_history(symbol, start, end, columns, root)
+    return table.to_pandas() if table is not None else None
+
+
+def dataset(root: str = None):
+    """
+    Dataset pyarrow su tutto l'archivio: scansioni multi-simbolo con filtri
+    e proiezioni spinti nel reader, es.
+        dataset().to_table(columns=['symbol', 'date', 'net_position'],
+                           filter=ds.field('symbol') == 'GOLD')
+    """
+    if not ARROW_AVAILABLE:
+        raise RuntimeError("pyarrow non installato: pip install pyarrow")
+    return ds.dataset(root or ARCHIVE_DIR, schema=_schema(),
+                      format='ipc' if ARCHIVE_FORMAT == 'arrow' else 'parquet')
+
+
+def archive_status(root: str = None) -> Dict:
+    """Partizioni e dimensione su disco per simbolo"""
+    root = root or ARCHIVE_DIR
+    status = {
+        'enabled': ARCHIVE_ENABLED,
+        'available': ARROW_AVAILABLE,
+        'format': _extension(),
+        'path': root,
+        'symbols': {}
+    }
+    if not os.path.isdir(root):
+        return status
+    for entry in sorted(os.listdir(root)):
+        directory = os.path.join(root, entry)
+        if not os.path.isdir(directory):
+            continue
+        files = [f for f in os.listdir(directory) if f.endswith(f'.{_extension()}')]
+        status['symbols'][entry] = {
+            'partitions': len(files),
+            'bytes': sum(os.path.getsize(os.path.join(directory, f)) for f in files),
+        }
+    return status
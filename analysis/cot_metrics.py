@@ -0,0 +1,113 @@
+"""
+Metriche derivate COT - unica fonte delle formule
+Calcolate una volta all'ingest e salvate in cot_data; API, ML, sistema di
+previsione e prompt GPT leggono gli stessi valori.
+"""
+
+from typing import Dict, Iterable, List, Optional
+
+# Pesi del sentiment: i non-commercial guidano (70%), i commercial sono contrarian (30%)
+NC_SENTIMENT_WEIGHT = 0.7
+C_SENTIMENT_WEIGHT = 0.3
+SENTIMENT_AMPLIFY = 3  # rende il punteggio più sensibile
+
+# Colonne calcolate salvate in cot_data (oltre a net_position e sentiment_score)
+METRIC_COLUMNS = [
+    'commercial_net',
+    'total_long',
+    'total_short',
+    'total_oi',
+    'nc_long_ratio',
+    'c_long_ratio',
+    'nc_share_pct',
+]
+
+# Variazioni rispetto al report precedente dello stesso simbolo
+CHANGE_COLUMNS = [
+    'net_position_change',
+    'commercial_net_change',
+    'total_oi_change',
+    'sentiment_change',
+]
+
+BASE_FIELDS = ('non_commercial_long', 'non_commercial_short', 'commercial_long', 'commercial_short')
+
+
+def weighted_sentiment(nc_long, nc_short, c_long, c_short) -> float:
+    """
+    Sentiment COT pesato, normalizzato sul total open interest.
+    I non-commercial sono gli 'smart money', i commercial gli hedger (segno opposto).
+    Range limitato a [-100, 100], arrotondato a 2 decimali.
+    """
+    total_oi = nc_long + nc_short + c_long + c_short
+    if total_oi == 0:
+        return 0
+
+    nc_sentiment = ((nc_long - nc_short) / total_oi) * 100 * NC_SENTIMENT_WEIGHT
+    # I commercial vanno letti al contrario
+    c_sentiment = -((c_long - c_short) / total_oi) * 100 * C_SENTIMENT_WEIGHT
+
+    final_sentiment = (nc_sentiment + c_sentiment) * SENTIMENT_AMPLIFY
+    return round(max(-100, min(100, final_sentiment)), 2)
+
+
+def compute_metrics(row: Dict) -> Dict:
+    """Metriche derivate di un singolo report (net, OI, ratio, sentiment)"""
+    nc_long, nc_short, c_long, c_short = (int(row.get(f) or 0) for f in BASE_FIELDS)
+
+    total_long = nc_long + c_long
+    total_short = nc_short + c_short
+    total_oi = total_long + total_short
+
+    return {
+        'net_position': nc_long - nc_short,
+        'commercial_net': c_long - c_short,
+        'total_long': total_long,
+        'total_short': total_short,
+        'total_oi': total_oi,
+        'nc_long_ratio': nc_long / (nc_short + 1),  # +1 evita divisione per zero
+        'c_long_ratio': c_long / (c_short + 1),
+        'nc_share_pct': ((nc_long + nc_short) / total_oi * 100) if total_oi > 0 else 0.0,
+        'sentiment_score': weighted_sentiment(nc_long, nc_short, c_long, c_short),
+    }
+
+
+def compute_changes(current: Dict, previous: Optional[Dict]) -> Dict:
+    """Variazioni settimana su settimana (None se manca il report precedente)"""
+    if not previous:
+        return {column: None for column in CHANGE_COLUMNS}
+    return {
+        'net_position_change': current['net_position'] - previous['net_position'],
+        'commercial_net_change': current['commercial_net'] - previous['commercial_net'],
+        'total_oi_change': current['total_oi'] - previous['total_oi'],
+        'sentiment_change': current['sentiment_score'] - previous['sentiment_score'],
+    }
+
+
+def enrich_series(rows: Iterable[Dict]) -> List[Dict]:
+    """
+    Metriche + variazioni per una serie di report dello stesso simbolo
+    in ordine cronologico. Ritorna un dict per riga (stesso ordine).
+    """
+    enriched = []
+    previous = None
+    for row in rows:
+        metrics = compute_metrics(row)
+        metrics.update(compute_changes(metrics, previous))
+        enriched.append(metrics)
+        previous = metrics
+    return enriched
+
+
+def metrics_for(row: Dict) -> Dict:
+    """
+    Metriche di un report: usa i valori già salvati all'ingest se presenti,
+    altrimenti le calcola con le stesse formule.
+    """
+    if all(row.get(column) is not None for column in METRIC_COLUMNS):
+        return row
+    merged = dict(row)
+    for key, value in compute_metrics(row).items():
+        if merged.get(key) is None:
+            merged[key] = value
+    return merged
@@ -21,6 +21,8 @@ except ImportError:
         SENTIMENT_THRESHOLD_BEARISH = -20
         ANALYSIS_OUTPUT_FOLDER = 'data/analysis_output'
 
+from analysis.cot_metrics import metrics_for
+
 # Setup logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -203,21 +205,25 @@ class GPTAnalyzer:
         symbol = cot_data.get('symbol', 'ASSET')
         name = cot_data.get('name', symbol)
 
-        # Calcola metriche addizionali
-        nc_long = cot_data.get('non_commercial_long', 0)
-        nc_short = cot_data.get('non_commercial_short', 0)
-        c_long = cot_data.get('commercial_long', 0)
-        c_short = cot_data.get('commercial_short', 0)
-        net_position = cot_data.get('net_position', 0)
-        sentiment_score = cot_data.get('sentiment_score', 0)
-
-        # Calcola % di variazione se disponibile
-        prev_net = cot_data.get('prev_net_position', net_position)
-        net_change = ((net_position - prev_net) / abs(prev_net) * 100) if prev_net != 0 else 0
-
-        # Total open interest
-        total_oi = nc_long + nc_short + c_long + c_short
-        nc_percentage = ((nc_long + nc_short) / total_oi * 100) if total_oi > 0 else 0
+        # Metriche calcolate all'ingest (stessi valori di API e modello ML)
+        metrics = metrics_for(cot_data)
+        nc_long = metrics.get('non_commercial_long') or 0
+        nc_short = metrics.get('non_commercial_short') or 0
+        c_long = metrics.get('commercial_long') or 0
+        c_short = metrics.get('commercial_short') or 0
+        net_position = metrics['net_position']
+        commercial_net = metrics['commercial_net']
+        sentiment_score = metrics['sentiment_score']
+
+        # % di variazione vs report precedente, se disponibile
+        net_delta = metrics.get('net_position_change')
+        if net_delta is None and cot_data.get('prev_net_position') is not None:
+            net_delta = net_position - cot_data['prev_net_position']
+        prev_net = net_position - (net_delta or 0)
+        net_change = (net_delta / abs(prev_net) * 100) if net_delta and prev_net != 0 else 0
+
+        total_oi = metrics['total_oi']
+        nc_percentage = metrics['nc_share_pct']
 
         prompt = f"""
 Sei un analista finanziario esperto specializzato in COT (Commitment of Traders) e analisi dei flussi istituzionali.
@@ -232,19 +238,19 @@ Analizza in dettaglio i dati COT per **{name} ({symbol})** e fornisci un'analisi
 • Long Positions: {nc_long:,} contratti
 • Short Positions: {nc_short:,} contratti
 • Net Position: {net_position:,} contratti ({net_change:+.1f}% vs periodo precedente)
-• Long/Short Ratio: {(nc_long/nc_short if nc_short > 0 else 0):.2f}
+• Long/Short Ratio: {metrics['nc_long_ratio']:.2f}
 
 **Commercial (Hedger/Produttori):**
 • Long Positions: {c_long:,} contratti
 • Short Positions: {c_short:,} contratti
-• Net Position: {(c_long - c_short):,} contratti
-• Long/Short Ratio: {(c_long/c_short if c_short > 0 else 0):.2f}
+• Net Position: {commercial_net:,} contratti
+• Long/Short Ratio: {metrics['c_long_ratio']:.2f}
 
 **Metriche Aggregate:**
 • Sentiment Score: {sentiment_score:.2f}% (range: -100 a +100)
 • Total Open Interest: {total_oi:,} contratti
 • Non-Commercial % del mercato: {nc_percentage:.1f}%
-• Divergenza NC vs Commercial: {abs((nc_long - nc_short) + (c_short - c_long)):,} contratti
+• Divergenza NC vs Commercial: {abs(net_position - commercial_net):,} contratti
 
 ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
 🎯 RICHIESTA ANALISI
@@ -15,6 +15,8 @@ sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from config import current_config as config
 
 # Import moduli interni
+from analysis.cot_metrics import metrics_for
+
 try:
     from analysis.gpt_analyzer import GPTAnalyzer
 except:
@@ -49,6 +51,9 @@ class COTPredictionSystem:
             Dict con previsione completa
         """
         try:
+            # Metriche derivate dall'ingest (calcolate al volo se mancano)
+            current_data = metrics_for(current_data)
+            
             prediction = {
                 'symbol': current_data.get('symbol', 'UNKNOWN'),
                 'timestamp': datetime.now().isoformat(),
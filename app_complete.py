@@ -10,6 +10,8 @@ from flask_apscheduler import APScheduler
 from flask_caching import Cache
 from flask_login import LoginManager, login_required, current_user  # ✅ AGGIUNGI QUI
 from functools import wraps
+import click
+import uuid
 from datetime import datetime, timedelta
 import pandas as pd
 import numpy as np
@@ -19,6 +21,10 @@ from selenium.webdriver.common.by import By
 from selenium.webdriver.chrome.options import Options
 from webdriver_manager.chrome import ChromeDriverManager
 from cache_manager import GLOBAL_CACHE, cached
+import query_monitor
+import db_engine
+import db_routing
+from db_routing import read_replica
 import time
 import os
 import re
@@ -35,6 +41,9 @@ from models import db, User, init_db, SUBSCRIPTION_PLANS
 from auth_routes import auth_bp
 from decorators import subscription_context_processor
 from analysis.gpt_analyzer import GPTAnalyzer
+from sqlalchemy.dialects.postgresql import JSONB
+from analysis import cot_archive
+from analysis.cot_metrics import BASE_FIELDS, METRIC_COLUMNS, enrich_series, metrics_for, weighted_sentiment
 # Setup logging
 logger = logging.getLogger(__name__)
 
@@ -69,18 +78,12 @@ app.config['SQLALCHEMY_DATABASE_URI'] = DATABASE_URL
 app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
 app.config['SQLALCHEMY_ECHO'] = False  # Disabilita log query
 
-# 🚀 CONNECTION POOLING - CRITICO PER PERFORMANCE!
-app.config['SQLALCHEMY_ENGINE_OPTIONS'] = {
-    'pool_size': 10,              # Connessioni base nel pool
-    'max_overflow': 20,           # Connessioni extra se necessario
-    'pool_timeout': 30,           # Timeout acquisizione connessione
-    'pool_recycle': 3600,         # Ricicla connessioni dopo 1h
-    'pool_pre_ping': True,        # Verifica connessione prima dell'uso
-    'connect_args': {
-        'connect_timeout': 10,
-        'options': '-c statement_timeout=30000'  # Query timeout 30s
-    }
-}
+# 📖 READ REPLICA (opzionale): DATABASE_REPLICA_URL, anche più URL separati da virgola
+if db_routing.REPLICA_URLS:
+    app.config['SQLALCHEMY_BINDS'] = db_routing.replica_binds()
+
+# 🚀 CONNECTION POOLING - opzioni per dialetto (PostgreSQL: timeout + pool, SQLite: WAL + pragma)
+app.config['SQLALCHEMY_ENGINE_OPTIONS'] = db_engine.engine_options(DATABASE_URL)
 
 # 💾 CACHE CONFIGURATION
 app.config['CACHE_TYPE'] = 'simple'  # In-memory per ora
@@ -161,6 +164,9 @@ def get_smart_cache_timeout():
         return 600  # 10 minuti
     return 1800  # 30 minuti altri giorni (invece di 24 ore!)
 
+# Parametri query inclusi nella chiave di smart_cache_response
+CACHE_KEY_ARGS = frozenset(('from', 'to', 'days', 'limit', 'order', 'cursor'))
+
 def smart_cache_response(key_prefix):
     """Decorator con cache intelligente + coalescing"""
     def decorator(f):
@@ -175,6 +181,11 @@ def smart_cache_response(key_prefix):
                 # Sort kwargs per cache key consistente
                 key_parts.extend(f"{k}:{v}" for k, v in sorted(kwargs.items()))
             cache_key = ':'.join(key_parts)
+            # Solo i parametri che cambiano la risposta (pagina/intervallo dello storico):
+            # i cache-buster del client (es. _t) non devono creare nuove voci
+            params = sorted((k, v) for k, v in request.args.items() if k in CACHE_KEY_ARGS)
+            if params:
+                cache_key += '?' + '&'.join(f"{k}={v}" for k, v in params)
 
             # Check cache
             cached = cache.get(cache_key)
@@ -209,8 +220,9 @@ logger.info("✅ Request Coalescer inizializzato")
 # =================== MIDDLEWARE PER PERFORMANCE MONITORING ===================
 @app.before_request
 def before_request():
-    """Traccia tempo di esecuzione richieste"""
+    """Traccia tempo di esecuzione richieste e query SQL"""
     g.request_start_time = time.time()
+    query_monitor.start_request()
 
 @app.after_request
 def after_request(response):
@@ -227,8 +239,13 @@ def after_request(response):
         
         # Aggiungi header X-Response-Time per debugging
         response.headers['X-Response-Time'] = f"{elapsed:.2f}ms"
+        response.headers['Server-Timing'] = f"app;dur={elapsed:.2f}"
     
-    return response
+    # Read-your-writes: l'utente che ha appena scritto legge dal primario
+    db_routing.finish_request(response)
+    
+    # Totali SQL della richiesta (X-DB-Query-Count, X-DB-Time, Server-Timing)
+    return query_monitor.finish_request(response)
 
 # =================== DECORATORE CACHE ===================
 def cache_response(timeout=300, key_prefix=None):
@@ -279,6 +296,9 @@ def unauthorized():
         return jsonify({'error': 'Login richiesto'}), 401
     return redirect('/login')
 
+# JSON nativo: JSONB su PostgreSQL, JSON (testo) sugli altri dialetti
+NATIVE_JSON = db.JSON(none_as_null=True).with_variant(JSONB(none_as_null=True), 'postgresql')
+
 class COTData(db.Model):
     __tablename__ = 'cot_data'
     
@@ -292,7 +312,66 @@ class COTData(db.Model):
     commercial_short = db.Column(db.Integer)
     net_position = db.Column(db.Integer)
     sentiment_score = db.Column(db.Float)
+    
+    # Metriche derivate calcolate all'ingest (analysis/cot_metrics.py)
+    commercial_net = db.Column(db.Integer, index=True)
+    total_long = db.Column(db.Integer)
+    total_short = db.Column(db.Integer)
+    total_oi = db.Column(db.Integer)
+    nc_long_ratio = db.Column(db.Float)
+    c_long_ratio = db.Column(db.Float)
+    nc_share_pct = db.Column(db.Float)
+    
+    # Variazioni vs report precedente dello stesso simbolo
+    net_position_change = db.Column(db.Integer, index=True)
+    commercial_net_change = db.Column(db.Integer)
+    total_oi_change = db.Column(db.Integer)
+    sentiment_change = db.Column(db.Float)
+    
+    # Sezioni extra della pagina report: {changes, percent_oi, traders}
+    report_sections = db.Column(NATIVE_JSON)
+    
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    
+    # Un solo report per simbolo e settimana: base per gli upsert nativi
+    __table_args__ = (
+        db.UniqueConstraint('symbol', 'date', name='uq_cot_symbol_date'),
+    )
+
+class COTLatest(db.Model):
+    """Ultimo report per simbolo + variazioni vs settimana precedente (aggiornato a ogni ingest)"""
+    __tablename__ = 'cot_latest'
+    
+    symbol = db.Column(db.String(20), primary_key=True)
+    date = db.Column(db.DateTime, nullable=False)
+    non_commercial_long = db.Column(db.Integer)
+    non_commercial_short = db.Column(db.Integer)
+    non_commercial_spreads = db.Column(db.Integer)
+    commercial_long = db.Column(db.Integer)
+    commercial_short = db.Column(db.Integer)
+    net_position = db.Column(db.Integer)
+    sentiment_score = db.Column(db.Float)
+    commercial_net = db.Column(db.Integer)
+    total_long = db.Column(db.Integer)
+    total_short = db.Column(db.Integer)
+    total_oi = db.Column(db.Integer)
+    nc_long_ratio = db.Column(db.Float)
+    c_long_ratio = db.Column(db.Float)
+    nc_share_pct = db.Column(db.Float)
+    
+    # Variazioni rispetto al report precedente
+    prev_date = db.Column(db.DateTime)
+    non_commercial_long_change = db.Column(db.Integer)
+    non_commercial_short_change = db.Column(db.Integer)
+    commercial_long_change = db.Column(db.Integer)
+    commercial_short_change = db.Column(db.Integer)
+    net_position_change = db.Column(db.Integer)
+    commercial_net_change = db.Column(db.Integer)
+    total_oi_change = db.Column(db.Integer)
+    sentiment_change = db.Column(db.Float)
+    
+    history_count = db.Column(db.Integer, default=0)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow)
 
 class Prediction(db.Model):
     __tablename__ = 'predictions'
@@ -303,9 +382,102 @@ class Prediction(db.Model):
     predicted_direction = db.Column(db.String(20))
     confidence = db.Column(db.Float)
     ml_score = db.Column(db.Float)
-    gpt_analysis = db.Column(db.Text)
+    gpt_analysis = db.Column(db.Text)  # Legacy: JSON come testo, svuotato dalla migrazione
+    analysis = db.Column(NATIVE_JSON)  # Analisi strutturata (JSONB su PostgreSQL)
+    analysis_model = db.Column(db.String(50))  # Modello GPT o 'fallback_analysis'
+    analysis_hash = db.Column(db.String(64))  # Impronta per deduplicare analisi identiche
+    report_date = db.Column(db.DateTime)  # Data del report COT analizzato
     actual_result = db.Column(db.String(20))
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    
+    __table_args__ = (
+        db.Index('ix_predictions_symbol_date', 'symbol', 'prediction_date'),
+    )
+
+class PredictionLatest(db.Model):
+    """Ultima analisi per simbolo: puntatore alla predizione + copia strutturata (lettura per chiave primaria)"""
+    __tablename__ = 'prediction_latest'
+    
+    symbol = db.Column(db.String(20), primary_key=True)
+    prediction_id = db.Column(db.Integer, db.ForeignKey('predictions.id'), nullable=False)
+    prediction_date = db.Column(db.DateTime, nullable=False)
+    predicted_direction = db.Column(db.String(20))
+    confidence = db.Column(db.Float)
+    analysis = db.Column(NATIVE_JSON)
+    analysis_hash = db.Column(db.String(64))
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+class PredictionArchive(db.Model):
+    """Predizioni uscite dalla retention: analisi compressa (zlib), partizionata per anno su PostgreSQL"""
+    __tablename__ = 'predictions_archive'
+
+    # La chiave di partizione deve far parte della chiave primaria
+    id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    prediction_date = db.Column(db.DateTime, primary_key=True)
+    symbol = db.Column(db.String(20), nullable=False)
+    predicted_direction = db.Column(db.String(20))
+    confidence = db.Column(db.Float)
+    ml_score = db.Column(db.Float)
+    analysis_gz = db.Column(db.LargeBinary)  # JSON dell'analisi compresso con zlib
+    analysis_model = db.Column(db.String(50))
+    analysis_hash = db.Column(db.String(64))
+    report_date = db.Column(db.DateTime)
+    actual_result = db.Column(db.String(20))
+    created_at = db.Column(db.DateTime)
+    archived_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    __table_args__ = (
+        db.Index('ix_predictions_archive_symbol_date', 'symbol', 'prediction_date'),
+        {'postgresql_partition_by': 'RANGE (prediction_date)'},
+    )
+
+class PredictionRollup(db.Model):
+    """Aggregati mensili per simbolo delle predizioni archiviate (statistiche senza leggere l'archivio)"""
+    __tablename__ = 'prediction_rollups'
+
+    symbol = db.Column(db.String(20), primary_key=True)
+    month = db.Column(db.DateTime, primary_key=True)  # Primo giorno del mese
+    predictions = db.Column(db.Integer, default=0)
+    bullish = db.Column(db.Integer, default=0)
+    bearish = db.Column(db.Integer, default=0)
+    neutral = db.Column(db.Integer, default=0)
+    confidence_sum = db.Column(db.Float, default=0.0)
+    evaluated = db.Column(db.Integer, default=0)  # Con actual_result valorizzato
+    correct = db.Column(db.Integer, default=0)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+class ScrapeJob(db.Model):
+    __tablename__ = 'scrape_jobs'
+    
+    id = db.Column(db.String(32), primary_key=True)
+    symbol = db.Column(db.String(20), nullable=False, index=True)
+    status = db.Column(db.String(20), nullable=False, default='queued', index=True)  # queued|running|done|unchanged|failed
+    stage = db.Column(db.String(20))
+    stage_timings = db.Column(db.Text)  # JSON {fase: ms}
+    force = db.Column(db.Boolean, default=False)
+    requested_by = db.Column(db.Integer)
+    worker = db.Column(db.String(100))  # host:pid del processo che esegue il job
+    result = db.Column(db.Text)  # JSON della risposta della pipeline
+    error = db.Column(db.Text)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    started_at = db.Column(db.DateTime)
+    finished_at = db.Column(db.DateTime)
+    
+    def to_dict(self, include_result=False):
+        data = {
+            'job_id': self.id,
+            'symbol': self.symbol,
+            'status': self.status,
+            'stage': self.stage,
+            'stage_timings': json.loads(self.stage_timings) if self.stage_timings else {},
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'started_at': self.started_at.isoformat() if self.started_at else None,
+            'finished_at': self.finished_at.isoformat() if self.finished_at else None,
+            'error': self.error
+        }
+        if include_result:
+            data['result'] = json.loads(self.result) if self.result else None
+        return data
 
 # =================== FUNZIONI DATABASE OTTIMIZZATE ===================
 def get_cot_history_optimized(symbol, limit=100):
@@ -324,44 +496,801 @@ def get_cot_history_optimized(symbol, limit=100):
         logger.error(f"Errore query COT: {e}")
         return []
 
-def get_latest_data_batch(symbols):
+COT_COLUMNS = [c.name for c in COTData.__table__.columns if c.name not in ('id', 'created_at')]
+
+# Sezioni della pagina report salvate insieme in cot_data.report_sections
+REPORT_SECTIONS = ('changes', 'percent_oi', 'traders')
+
+def cot_record_fields(data):
+    """Solo le colonne di cot_data (lo scraper ritorna anche metadati); sezioni extra in report_sections"""
+    record = {k: data[k] for k in COT_COLUMNS if k in data}
+    sections = {k: data[k] for k in REPORT_SECTIONS if data.get(k)}
+    if sections:
+        record['report_sections'] = sections
+    return record
+
+COT_UPSERT_KEY = ('symbol', 'date')
+
+def upsert_cot_rows(rows, update=True, archive=True):
     """
-    Recupera dati più recenti per più simboli in UNA query
+    Upsert in blocco su cot_data con chiave (symbol, date).
+    PostgreSQL/SQLite: INSERT ... ON CONFLICT nativo, un round trip per blocco.
+    Altri dialetti: SELECT delle chiavi esistenti + insert/update in blocco.
+    
+    Args:
+        rows: dict con almeno symbol e date (chiavi extra ignorate)
+        update: True aggiorna le righe esistenti, False le lascia invariate
+        archive: True riscrive dopo il commit le partizioni dell'archivio colonnare toccate
+    
+    Returns:
+        numero di righe inserite o aggiornate
     """
-    from sqlalchemy import func
+    if not rows:
+        return 0
+    
+    # Una riga per chiave (ON CONFLICT non può toccare due volte la stessa riga)
+    unique = {}
+    for row in rows:
+        record = cot_record_fields(row)
+        unique[(record['symbol'], record['date'])] = record
+    
+    # Raggruppa per insieme di colonne: ogni statement multi-VALUES deve essere omogeneo
+    groups = defaultdict(list)
+    for record in unique.values():
+        groups[tuple(sorted(record))].append(record)
     
+    dialect = db.engine.dialect.name
+    written = 0
+    since = {}
     try:
-        # Subquery per trovare date più recenti
-        subq = (
-            db.session.query(
-                COTData.symbol,
-                func.max(COTData.date).label('max_date')
+        for columns, records in groups.items():
+            if dialect in ('postgresql', 'sqlite'):
+                written += _upsert_native(dialect, columns, records, update)
+            else:
+                written += _upsert_fallback(records, update)
+        # Metriche derivate e snapshot "latest" aggiornati nella stessa transazione
+        if written:
+            for symbol, date in unique:
+                since[symbol] = min(date, since.get(symbol, date))
+            enrich_cot_metrics(since)
+            refresh_cot_latest(since)
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+    
+    # Archivio colonnare fuori transazione: un errore non annulla l'ingest
+    if written and archive:
+        try:
+            archive_cot_history(since)
+        except Exception as e:
+            logger.warning(f"⚠️ Aggiornamento archivio COT fallito: {e}")
+    return written
+
+def _upsert_native(dialect, columns, records, update):
+    if dialect == 'postgresql':
+        from sqlalchemy.dialects.postgresql import insert as dialect_insert
+        chunk_size = 1000
+    else:
+        from sqlalchemy.dialects.sqlite import insert as dialect_insert
+        chunk_size = max(1, 900 // len(columns))  # limite variabili SQLite
+    
+    written = 0
+    for i in range(0, len(records), chunk_size):
+        stmt = dialect_insert(COTData.__table__).values(records[i:i + chunk_size])
+        if update:
+            stmt = stmt.on_conflict_do_update(
+                index_elements=list(COT_UPSERT_KEY),
+                set_={c: stmt.excluded[c] for c in columns if c not in COT_UPSERT_KEY}
             )
-            .filter(COTData.symbol.in_(symbols))
-            .group_by(COTData.symbol)
-            .subquery()
+        else:
+            stmt = stmt.on_conflict_do_nothing(index_elements=list(COT_UPSERT_KEY))
+        result = db.session.execute(stmt)
+        written += max(result.rowcount or 0, 0)
+    return written
+
+def _upsert_fallback(records, update):
+    symbols = {r['symbol'] for r in records}
+    dates = {r['date'] for r in records}
+    existing = {
+        (row.symbol, row.date): row.id for row in
+        db.session.query(COTData.id, COTData.symbol, COTData.date)
+        .filter(COTData.symbol.in_(symbols), COTData.date.in_(dates))
+    }
+    
+    to_insert, to_update = [], []
+    for record in records:
+        key = (record['symbol'], record['date'])
+        if key in existing:
+            if update:
+                to_update.append(dict(record, id=existing[key]))
+        else:
+            to_insert.append(record)
+    
+    if to_insert:
+        db.session.bulk_insert_mappings(COTData, to_insert)
+    if to_update:
+        db.session.bulk_update_mappings(COTData, to_update)
+    return len(to_insert) + len(to_update)
+
+def enrich_cot_metrics(since):
+    """
+    Calcola le metriche derivate (analysis/cot_metrics.py) sulle righe di
+    cot_data a partire dalla data indicata per simbolo, incluse le variazioni
+    vs il report precedente. Le righe successive vengono ricalcolate perché
+    un inserimento nel mezzo della serie ne cambia le variazioni.
+    Non esegue commit: gira nella transazione dell'ingest.
+    
+    Args:
+        since: dict simbolo -> data della prima riga scritta
+    
+    Returns:
+        numero di righe aggiornate
+    """
+    columns = (COTData.id, COTData.date) + tuple(getattr(COTData, f) for f in BASE_FIELDS)
+    updates = []
+    for symbol, first_date in since.items():
+        # Report precedente: base per le variazioni della prima riga scritta
+        previous = db.session.execute(
+            select(*columns)
+            .where(COTData.symbol == symbol, COTData.date < first_date)
+            .order_by(COTData.date.desc())
+            .limit(1)
+        ).all()
+        rows = previous + fetch_cot_rows(symbol, columns=columns, since=first_date, ascending=True)
+        metrics = enrich_series(row._asdict() for row in rows)
+        for row, values in zip(rows[len(previous):], metrics[len(previous):]):
+            updates.append(dict(values, id=row.id))
+    
+    if updates:
+        db.session.bulk_update_mappings(COTData, updates)
+    return len(updates)
+
+def _delta(current, previous):
+    if current is None or previous is None:
+        return None
+    return current - previous
+
+def refresh_cot_latest(symbols):
+    """
+    Ricalcola le righe di cot_latest per i simboli indicati (due letture
+    sull'indice symbol+date per simbolo). Non esegue commit: gira nella
+    transazione dell'ingest.
+    """
+    from sqlalchemy import func
+    
+    # Metriche e variazioni aggregate arrivano già calcolate da enrich_cot_metrics
+    columns = (COTData.date, COTData.non_commercial_spreads) + COT_FEATURE_COLUMNS + COT_METRIC_COLUMNS + (
+        COTData.net_position_change, COTData.commercial_net_change,
+        COTData.total_oi_change, COTData.sentiment_change,
+    )
+    for symbol in symbols:
+        rows = fetch_cot_rows(symbol, columns=columns, limit=2)
+        if not rows:
+            continue
+        latest = rows[0]
+        previous = rows[1] if len(rows) > 1 else None
+        
+        snapshot = COTLatest(symbol=symbol, updated_at=datetime.utcnow(), **latest._asdict())
+        snapshot.prev_date = previous.date if previous else None
+        for field in BASE_FIELDS:
+            setattr(snapshot, f'{field}_change', _delta(getattr(latest, field), getattr(previous, field, None)))
+        snapshot.history_count = db.session.execute(
+            select(func.count()).select_from(COTData).where(COTData.symbol == symbol)
+        ).scalar()
+        db.session.merge(snapshot)
+
+def ensure_cot_latest():
+    """
+    Popola cot_latest su database esistenti (una tantum, se vuota) e ricalcola
+    gli snapshot creati prima delle colonne aggiunte in seguito (es. total_long/total_short).
+    """
+    added = add_missing_columns(COTLatest)
+    if added:
+        logger.info(f"✅ Colonne cot_latest aggiunte: {', '.join(added)}")
+    
+    if db.session.query(COTLatest.symbol).first() is None:
+        symbols = [row.symbol for row in db.session.query(COTData.symbol).distinct()]
+        message = "popolata"
+    else:
+        symbols = [row.symbol for row in db.session.query(COTLatest.symbol).filter(
+            COTLatest.total_long.is_(None) | COTLatest.total_short.is_(None)
+        )]
+        message = "aggiornata"
+    if symbols:
+        refresh_cot_latest(symbols)
+        logger.info(f"✅ cot_latest {message} per {len(symbols)} simboli")
+    db.session.commit()
+
+def add_missing_columns(*models):
+    """
+    ALTER TABLE ADD COLUMN per le colonne dei modelli assenti nel database
+    (create_all non altera tabelle già presenti). Non esegue commit.
+    
+    Returns:
+        lista 'tabella.colonna' aggiunte
+    """
+    from sqlalchemy import inspect, text
+    
+    inspector = inspect(db.engine)
+    added = []
+    for model in models:
+        table = model.__table__
+        existing = {c['name'] for c in inspector.get_columns(table.name)}
+        for column in table.columns:
+            if column.name not in existing:
+                col_type = column.type.compile(dialect=db.engine.dialect)
+                db.session.execute(text(f'ALTER TABLE {table.name} ADD COLUMN {column.name} {col_type}'))
+                added.append(f'{table.name}.{column.name}')
+    return added
+
+def ensure_cot_metric_columns():
+    """
+    Aggiunge le colonne delle metriche derivate ai database esistenti
+    (create_all non altera tabelle già presenti) e le calcola per le righe
+    che non le hanno ancora.
+    """
+    from sqlalchemy import func, text
+    
+    added = add_missing_columns(COTData, COTLatest)
+    if added:
+        for name in ('commercial_net', 'net_position_change'):
+            db.session.execute(text(f'CREATE INDEX IF NOT EXISTS ix_cot_data_{name} ON cot_data({name})'))
+        logger.info(f"✅ Colonne metriche aggiunte: {', '.join(added)}")
+    
+    pending = dict(db.session.execute(
+        select(COTData.symbol, func.min(COTData.date))
+        .where(COTData.total_oi.is_(None))
+        .group_by(COTData.symbol)
+    ).all())
+    if pending:
+        updated = enrich_cot_metrics(pending)
+        refresh_cot_latest(pending)
+        logger.info(f"✅ Metriche derivate calcolate su {updated} righe ({len(pending)} simboli)")
+    db.session.commit()
+
+def ensure_cot_unique_key():
+    """
+    Crea il vincolo univoco (symbol, date) sui database esistenti
+    (create_all non altera tabelle già presenti), eliminando prima i duplicati.
+    """
+    from sqlalchemy import inspect, text
+    
+    inspector = inspect(db.engine)
+    names = {i['name'] for i in inspector.get_indexes('cot_data')}
+    names |= {c['name'] for c in inspector.get_unique_constraints('cot_data')}
+    if 'uq_cot_symbol_date' in names:
+        return
+    
+    removed = db.session.execute(text(
+        'DELETE FROM cot_data WHERE id NOT IN '
+        '(SELECT keep_id FROM (SELECT MAX(id) AS keep_id FROM cot_data GROUP BY symbol, date) AS keep)'
+    )).rowcount
+    db.session.execute(text(
+        'CREATE UNIQUE INDEX IF NOT EXISTS uq_cot_symbol_date ON cot_data(symbol, date)'
+    ))
+    db.session.commit()
+    logger.info(f"✅ Vincolo univoco cot_data(symbol, date) creato ({removed} duplicati rimossi)")
+
+def cot_report_rows(data):
+    """
+    Righe da upsertare per una pagina report: settimane storiche presenti
+    nella pagina + report corrente (per ultimo: a parità di data vince lui,
+    che porta anche le sezioni extra).
+    """
+    rows = []
+    for week in data.get('history') or []:
+        row = cot_record_fields(week)
+        row['symbol'] = data['symbol']
+        row['net_position'] = week['non_commercial_long'] - week['non_commercial_short']
+        row['sentiment_score'] = calculate_cot_sentiment(
+            week['non_commercial_long'], week['non_commercial_short'],
+            week['commercial_long'], week['commercial_short']
         )
-        
-        # Join per record completi
-        results = (
-            db.session.query(COTData)
-            .join(
-                subq,
-                db.and_(
-                    COTData.symbol == subq.c.symbol,
-                    COTData.date == subq.c.max_date
-                )
-            )
-            .all()
+        rows.append(row)
+    rows.append(data)
+    return rows
+
+# =================== ANALISI GPT (JSON strutturato + ultima per simbolo) ===================
+import hashlib
+
+# Chiavi che cambiano a ogni generazione e non contano per la deduplica
+ANALYSIS_VOLATILE_KEYS = ('timestamp',)
+
+def analysis_fingerprint(symbol, analysis, report_date=None):
+    """Impronta SHA-256 dell'analisi (chiavi ordinate, senza timestamp) + simbolo e report"""
+    payload = {k: v for k, v in analysis.items() if k not in ANALYSIS_VOLATILE_KEYS}
+    canonical = json.dumps(
+        [symbol, report_date.isoformat() if isinstance(report_date, datetime) else report_date, payload],
+        sort_keys=True, default=str, ensure_ascii=False
+    )
+    return hashlib.sha256(canonical.encode('utf-8')).hexdigest()
+
+def save_prediction_analysis(symbol, analysis, report_date=None, ml_score=None):
+    """
+    Salva un'analisi GPT come predizione e aggiorna il puntatore prediction_latest.
+    Se l'ultima analisi del simbolo è identica (stesso report, stesso contenuto)
+    non crea una nuova riga.
+    
+    Returns:
+        (prediction_id, created)
+    """
+    if isinstance(report_date, str):
+        report_date = datetime.fromisoformat(report_date)
+    digest = analysis_fingerprint(symbol, analysis, report_date)
+    
+    latest = db.session.get(PredictionLatest, symbol)
+    if latest is not None and latest.analysis_hash == digest:
+        latest.updated_at = datetime.utcnow()
+        db.session.commit()
+        logger.info(f"🔁 Analisi {symbol} identica alla precedente (#{latest.prediction_id}), non duplicata")
+        return latest.prediction_id, False
+    
+    now = datetime.now()
+    prediction = Prediction(
+        symbol=symbol,
+        prediction_date=now,
+        predicted_direction=analysis.get('direction', 'NEUTRAL'),
+        confidence=analysis.get('confidence', 50),
+        ml_score=ml_score,
+        analysis=analysis,
+        analysis_model=analysis.get('model'),
+        analysis_hash=digest,
+        report_date=report_date
+    )
+    db.session.add(prediction)
+    db.session.flush()
+    
+    db.session.merge(PredictionLatest(
+        symbol=symbol,
+        prediction_id=prediction.id,
+        prediction_date=now,
+        predicted_direction=prediction.predicted_direction,
+        confidence=prediction.confidence,
+        analysis=analysis,
+        analysis_hash=digest,
+        updated_at=datetime.utcnow()
+    ))
+    db.session.commit()
+    return prediction.id, True
+
+def fetch_latest_analysis(symbol):
+    """Ultima analisi GPT del simbolo come dict (lettura per chiave primaria) o None"""
+    return db.session.execute(
+        select(PredictionLatest.analysis).where(PredictionLatest.symbol == symbol)
+    ).scalar()
+
+def ensure_prediction_analysis():
+    """
+    Migra i database esistenti: aggiunge le colonne strutturate, converte
+    il testo JSON legacy in analysis (una sola volta) e popola prediction_latest.
+    """
+    from sqlalchemy import func, text
+    
+    added = add_missing_columns(Prediction)
+    if added:
+        db.session.execute(text(
+            'CREATE INDEX IF NOT EXISTS ix_predictions_symbol_date ON predictions(symbol, prediction_date)'
+        ))
+        logger.info(f"✅ Colonne analisi aggiunte: {', '.join(added)}")
+    
+    migrated = 0
+    while True:
+        legacy = db.session.execute(
+            select(Prediction.id, Prediction.symbol, Prediction.gpt_analysis, Prediction.report_date)
+            .where(Prediction.analysis.is_(None), Prediction.gpt_analysis.isnot(None))
+            .limit(500)
+        ).all()
+        if not legacy:
+            break
+        updates = []
+        for row in legacy:
+            try:
+                analysis = json.loads(row.gpt_analysis)
+            except (TypeError, ValueError):
+                analysis = {'analysis': row.gpt_analysis}
+            if not isinstance(analysis, dict):
+                analysis = {'analysis': analysis}
+            updates.append({
+                'id': row.id,
+                'analysis': analysis,
+                'analysis_model': analysis.get('model'),
+                'analysis_hash': analysis_fingerprint(row.symbol, analysis, row.report_date),
+                'gpt_analysis': None
+            })
+        db.session.bulk_update_mappings(Prediction, updates)
+        db.session.commit()
+        migrated += len(updates)
+    if migrated:
+        logger.info(f"✅ {migrated} analisi legacy convertite in JSON strutturato")
+    
+    if db.session.query(PredictionLatest.symbol).first() is None:
+        newest = (
+            select(Prediction.symbol, func.max(Prediction.prediction_date).label('prediction_date'))
+            .where(Prediction.analysis.isnot(None))
+            .group_by(Prediction.symbol)
+            .subquery()
         )
-        
-        return {r.symbol: r for r in results}
+        rows = db.session.execute(
+            select(Prediction).join(newest, (Prediction.symbol == newest.c.symbol) &
+                                    (Prediction.prediction_date == newest.c.prediction_date))
+        ).scalars().all()
+        for p in rows:
+            db.session.merge(PredictionLatest(
+                symbol=p.symbol, prediction_id=p.id, prediction_date=p.prediction_date,
+                predicted_direction=p.predicted_direction, confidence=p.confidence,
+                analysis=p.analysis, analysis_hash=p.analysis_hash, updated_at=datetime.utcnow()
+            ))
+        if rows:
+            logger.info(f"✅ prediction_latest popolata per {len(rows)} simboli")
+    db.session.commit()
+
+# =================== RETENTION PREDIZIONI (hot table + archivio compresso) ===================
+import zlib
+
+PREDICTION_RETENTION_PER_SYMBOL = int(os.getenv("PREDICTION_RETENTION_PER_SYMBOL", "20"))  # Righe "hot" per simbolo
+PREDICTION_RETENTION_BATCH = int(os.getenv("PREDICTION_RETENTION_BATCH", "500"))
+PREDICTION_RETENTION_LOCK_ID = 50501  # Chiave advisory lock PostgreSQL
+PREDICTION_RETENTION_LOCK_MAX_AGE = 3600  # Lock file (altri dialetti) più vecchio = abbandonato
+
+def _compress_analysis(analysis):
+    if analysis is None:
+        return None
+    return zlib.compress(json.dumps(analysis, ensure_ascii=False, default=str).encode('utf-8'), 9)
+
+def load_archived_analysis(prediction_id):
+    """Analisi di una predizione archiviata come dict (None se assente)"""
+    data = db.session.execute(
+        select(PredictionArchive.analysis_gz).where(PredictionArchive.id == prediction_id)
+    ).scalar()
+    return json.loads(zlib.decompress(data).decode('utf-8')) if data else None
+
+def _ensure_archive_partitions(years):
+    """PostgreSQL: crea le partizioni annuali di predictions_archive mancanti"""
+    from sqlalchemy import text
+
+    if db.engine.dialect.name != 'postgresql':
+        return
+    for year in sorted(years):
+        db.session.execute(text(
+            f"CREATE TABLE IF NOT EXISTS predictions_archive_{year} PARTITION OF predictions_archive "
+            f"FOR VALUES FROM ('{year}-01-01') TO ('{year + 1}-01-01')"
+        ))
+
+def _add_to_rollups(rows):
+    """Somma le righe archiviate negli aggregati mensili (symbol, mese)"""
+    buckets = defaultdict(list)
+    for row in rows:
+        month = row['prediction_date'].replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+        buckets[(row['symbol'], month)].append(row)
+
+    for (symbol, month), items in buckets.items():
+        rollup = db.session.get(PredictionRollup, (symbol, month))
+        if rollup is None:
+            rollup = PredictionRollup(symbol=symbol, month=month, predictions=0, bullish=0, bearish=0,
+                                      neutral=0, confidence_sum=0.0, evaluated=0, correct=0)
+            db.session.add(rollup)
+        for row in items:
+            direction = (row['predicted_direction'] or 'NEUTRAL').upper()
+            rollup.predictions += 1
+            rollup.bullish += direction == 'BULLISH'
+            rollup.bearish += direction == 'BEARISH'
+            rollup.neutral += direction not in ('BULLISH', 'BEARISH')
+            rollup.confidence_sum += row['confidence'] or 0.0
+            if row['actual_result']:
+                rollup.evaluated += 1
+                rollup.correct += row['actual_result'].upper() == direction
+        rollup.updated_at = datetime.utcnow()
+
+from contextlib import contextmanager
+
+@contextmanager
+def _retention_lock():
+    """
+    Un solo run di retention alla volta tra i worker gunicorn (ognuno ha il
+    suo APScheduler). PostgreSQL: advisory lock su una connessione dedicata;
+    altri dialetti (SQLite, un solo host): lock file accanto ai dati.
+    Restituisce True se il lock è stato acquisito.
+    """
+    from sqlalchemy import text
     
-    except Exception as e:
-        logger.error(f"Errore batch query: {e}")
-        return {}
+    if db.engine.dialect.name == 'postgresql':
+        with db.engine.connect() as conn:
+            acquired = conn.execute(text('SELECT pg_try_advisory_lock(:k)'), {'k': PREDICTION_RETENTION_LOCK_ID}).scalar()
+            try:
+                yield bool(acquired)
+            finally:
+                if acquired:
+                    conn.execute(text('SELECT pg_advisory_unlock(:k)'), {'k': PREDICTION_RETENTION_LOCK_ID})
+        return
+    
+    lock_path = os.path.join('data', 'prediction_retention.lock')
+    os.makedirs(os.path.dirname(lock_path), exist_ok=True)
+    try:
+        if os.path.exists(lock_path) and time.time() - os.path.getmtime(lock_path) > PREDICTION_RETENTION_LOCK_MAX_AGE:
+            os.remove(lock_path)
+        os.close(os.open(lock_path, os.O_CREAT | os.O_EXCL | os.O_WRONLY))
+    except FileExistsError:
+        yield False
+        return
+    try:
+        yield True
+    finally:
+        try:
+            os.remove(lock_path)
+        except OSError:
+            pass
+
+def prune_predictions(keep=None, batch_size=None):
+    """
+    Retention: per ogni simbolo restano in predictions le `keep` predizioni
+    più recenti (mai quella puntata da prediction_latest); le altre passano
+    in predictions_archive con l'analisi compressa e vengono sommate in
+    prediction_rollups. Un commit per blocco: archivio, aggregati e delete
+    nella stessa transazione.
+
+    Un solo run alla volta: se un altro worker ha il lock ritorna skipped=True.
+
+    Returns:
+        dict con righe archiviate (totali e per simbolo) e durata
+    """
+    keep = PREDICTION_RETENTION_PER_SYMBOL if keep is None else keep
+    if keep < 1:
+        raise ValueError(f"keep deve essere almeno 1 (ricevuto {keep})")
+    batch_size = batch_size or PREDICTION_RETENTION_BATCH
+
+    with _retention_lock() as acquired:
+        if not acquired:
+            logger.info("🗄️ Retention predizioni già in corso in un altro worker, salto")
+            return {'archived': 0, 'symbols': {}, 'keep': keep, 'seconds': 0, 'skipped': True}
+        return _prune_predictions(keep, batch_size)
+
+def _prune_predictions(keep, batch_size):
+    from sqlalchemy import delete, func
+
+    start = time.time()
+
+    ranked = select(
+        Prediction.id,
+        func.row_number().over(
+            partition_by=Prediction.symbol,
+            order_by=(Prediction.prediction_date.desc(), Prediction.id.desc())
+        ).label('rank')
+    ).subquery()
+    expired = (
+        select(ranked.c.id)
+        .where(ranked.c.rank > keep, ranked.c.id.notin_(select(PredictionLatest.prediction_id)))
+        .limit(batch_size)
+    )
+
+    per_symbol = defaultdict(int)
+    while True:
+        ids = db.session.execute(expired).scalars().all()
+        if not ids:
+            break
+        rows = [r._asdict() for r in db.session.execute(
+            select(*Prediction.__table__.c).where(Prediction.id.in_(ids))
+        ).all()]
+
+        try:
+            _ensure_archive_partitions({row['prediction_date'].year for row in rows})
+            now = datetime.utcnow()
+            db.session.bulk_insert_mappings(PredictionArchive, [{
+                'id': row['id'],
+                'prediction_date': row['prediction_date'],
+                'symbol': row['symbol'],
+                'predicted_direction': row['predicted_direction'],
+                'confidence': row['confidence'],
+                'ml_score': row['ml_score'],
+                'analysis_gz': _compress_analysis(row['analysis']),
+                'analysis_model': row['analysis_model'],
+                'analysis_hash': row['analysis_hash'],
+                'report_date': row['report_date'],
+                'actual_result': row['actual_result'],
+                'created_at': row['created_at'],
+                'archived_at': now
+            } for row in rows])
+            _add_to_rollups(rows)
+            db.session.execute(delete(Prediction).where(Prediction.id.in_(ids)))
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+
+        for row in rows:
+            per_symbol[row['symbol']] += 1
+
+    archived = sum(per_symbol.values())
+    if archived:
+        cache.delete(PREDICTION_COUNTS_CACHE_KEY)
+        logger.info(f"🗄️ Retention predizioni: {archived} righe archiviate (keep={keep}/simbolo)")
+    return {
+        'archived': archived,
+        'symbols': dict(per_symbol),
+        'keep': keep,
+        'seconds': round(time.time() - start, 2),
+        'skipped': False
+    }
+
+PREDICTION_COUNTS_CACHE_KEY = 'prediction_retention_counts'
+PREDICTION_COUNTS_TTL = int(os.getenv("PREDICTION_COUNTS_TTL", "600"))  # Secondi
+
+def _prediction_row_counts():
+    """
+    Righe hot/archiviate. PostgreSQL: stima del planner (pg_class.reltuples,
+    sommata sulle partizioni dell'archivio), nessuno scan; altri dialetti: COUNT
+    (tabelle piccole su SQLite, e comunque in cache per PREDICTION_COUNTS_TTL).
+    """
+    from sqlalchemy import func, text
+
+    if db.engine.dialect.name == 'postgresql':
+        hot = db.session.execute(text(
+            "SELECT GREATEST(reltuples, 0)::bigint FROM pg_class WHERE oid = 'predictions'::regclass"
+        )).scalar()
+        archived = db.session.execute(text(
+            "SELECT COALESCE(SUM(GREATEST(c.reltuples, 0)), 0)::bigint FROM pg_inherits i "
+            "JOIN pg_class c ON c.oid = i.inhrelid WHERE i.inhparent = 'predictions_archive'::regclass"
+        )).scalar()
+        return {'hot_rows': hot, 'archived_rows': archived, 'estimated': True}
+
+    return {
+        'hot_rows': db.session.execute(select(func.count()).select_from(Prediction)).scalar(),
+        'archived_rows': db.session.execute(select(func.count()).select_from(PredictionArchive)).scalar(),
+        'estimated': False
+    }
+
+def prediction_retention_status():
+    """Righe hot/archiviate (in cache, TTL) e configurazione retention per lo status di sistema"""
+    counts = cache.get(PREDICTION_COUNTS_CACHE_KEY)
+    if counts is None:
+        counts = _prediction_row_counts()
+        cache.set(PREDICTION_COUNTS_CACHE_KEY, counts, timeout=PREDICTION_COUNTS_TTL)
+    return {
+        'keep_per_symbol': PREDICTION_RETENTION_PER_SYMBOL,
+        **counts,
+        'partitioned': db.engine.dialect.name == 'postgresql'
+    }
+
+# =================== DATA ACCESS COT (Core select, senza ORM) ===================
+from sqlalchemy import select
+
+COT_FEATURE_COLUMNS = (
+    COTData.non_commercial_long,
+    COTData.non_commercial_short,
+    COTData.commercial_long,
+    COTData.commercial_short,
+    COTData.net_position,
+    COTData.sentiment_score,
+)
+# Metriche derivate salvate all'ingest (stessi valori per API, ML e GPT): tutte
+# quelle di METRIC_COLUMNS, così metrics_for usa i valori salvati senza ricalcolo
+COT_METRIC_COLUMNS = tuple(getattr(COTData, name) for name in METRIC_COLUMNS)
+COT_HISTORY_COLUMNS = (COTData.symbol, COTData.date) + COT_FEATURE_COLUMNS + COT_METRIC_COLUMNS + (
+    COTData.net_position_change, COTData.sentiment_change,
+)
+COT_HISTORY_KEYS = tuple(c.key for c in COT_HISTORY_COLUMNS)
+COT_TRAIN_HISTORY_LIMIT = int(os.getenv("COT_TRAIN_HISTORY_LIMIT", "520"))  # ~10 anni di settimane
+
+COT_PAGE_DEFAULT_LIMIT = int(os.getenv("COT_PAGE_DEFAULT_LIMIT", "100"))
+COT_PAGE_MAX_LIMIT = int(os.getenv("COT_PAGE_MAX_LIMIT", "500"))
+
+def fetch_cot_rows(symbol, columns=COT_HISTORY_COLUMNS, since=None, limit=None, ascending=False,
+                   until=None, after=None):
+    """
+    Righe COT come tuple, proiettate sulle sole colonne richieste
+    (niente identity map né attributi instrumentati dell'ORM).
+    
+    Args:
+        since / until: intervallo di date (estremi inclusi)
+        after: cursore keyset, data esclusa nel verso di scansione
+               (righe più vecchie se discendente, più recenti se ascendente)
+    """
+    stmt = select(*columns).where(COTData.symbol == symbol)
+    if since is not None:
+        stmt = stmt.where(COTData.date >= since)
+    if until is not None:
+        stmt = stmt.where(COTData.date <= until)
+    if after is not None:
+        stmt = stmt.where(COTData.date > after if ascending else COTData.date < after)
+    stmt = stmt.order_by(COTData.date.asc() if ascending else COTData.date.desc())
+    if limit:
+        stmt = stmt.limit(limit)
+    return db.session.execute(stmt).all()
+
+def fetch_latest_cot(symbol):
+    """
+    Ultimo report del simbolo (Row con accesso per attributo) o None.
+    Lettura per chiave primaria su cot_latest, fallback su cot_data.
+    """
+    fields = (COTData.date,) + COT_FEATURE_COLUMNS + COT_METRIC_COLUMNS + (
+        COTData.net_position_change, COTData.commercial_net_change,
+        COTData.total_oi_change, COTData.sentiment_change,
+    )
+    columns = [getattr(COTLatest, c.key) for c in fields]
+    row = db.session.execute(select(*columns).where(COTLatest.symbol == symbol)).first()
+    if row is not None:
+        return row
+    rows = fetch_cot_rows(symbol, columns=fields, limit=1)
+    return rows[0] if rows else None
+
+def _archive_covers_db(symbol, table):
+    """
+    True se l'archivio ha le stesse righe del DB per il simbolo (conteggio,
+    prima e ultima data): le partizioni vengono scritte solo per gli anni
+    toccati da un ingest, quindi su installazioni esistenti l'archivio può
+    contenere solo gli ultimi anni finché non si esegue `flask archive-cot`.
+    """
+    from sqlalchemy import func
     
+    latest = db.session.execute(
+        select(COTLatest.history_count, COTLatest.date).where(COTLatest.symbol == symbol)
+    ).first()
+    if latest is None or table.num_rows != latest.history_count:
+        return False
+    dates = table.column('date')
+    first_date = db.session.execute(
+        select(func.min(COTData.date)).where(COTData.symbol == symbol)
+    ).scalar()
+    covered = dates[0].as_py() == first_date and dates[-1].as_py() == latest.date
+    if not covered:
+        logger.info(f"📦 Archivio COT incompleto per {symbol}, training dal DB (flask archive-cot per ricostruirlo)")
+    return covered
+
+def fetch_cot_training_history(symbol, limit=COT_TRAIN_HISTORY_LIMIT):
+    """
+    Ultimi `limit` report in ordine cronologico come dict per il feature builder ML.
+    Legge dall'archivio colonnare se copre tutto lo storico del DB, altrimenti dal database.
+    """
+    columns = COT_FEATURE_COLUMNS + COT_METRIC_COLUMNS
+    if cot_archive.ARCHIVE_ENABLED:
+        try:
+            names = [c.key for c in columns]
+            table = cot_archive.read_history(symbol, columns=names + ['date'])
+            if table is not None and table.num_rows and _archive_covers_db(symbol, table):
+                return table.slice(max(table.num_rows - limit, 0)).select(names).to_pylist()
+        except Exception as e:
+            logger.warning(f"⚠️ Lettura archivio COT fallita per {symbol}, uso il DB: {e}")
+    rows = fetch_cot_rows(symbol, columns=columns, limit=limit)
+    return [row._asdict() for row in reversed(rows)]
+
+# =================== ARCHIVIO COLONNARE COT (Parquet/Arrow) ===================
+COT_ARCHIVE_COLUMNS = tuple(getattr(COTData, name) for name in cot_archive.ARCHIVE_COLUMNS)
+
+def archive_cot_history(since):
+    """
+    Riscrive le partizioni annuali dell'archivio dal DB, per simbolo, dall'anno
+    della prima riga scritta in avanti (le variazioni delle righe successive
+    possono essere cambiate con l'ingest).
     
+    Args:
+        since: dict simbolo -> data della prima riga scritta
+    
+    Returns:
+        righe scritte nell'archivio
+    """
+    if not cot_archive.ARCHIVE_ENABLED:
+        return 0
+    
+    written = 0
+    for symbol, first_date in since.items():
+        rows = fetch_cot_rows(symbol, columns=COT_ARCHIVE_COLUMNS,
+                              since=datetime(first_date.year, 1, 1), ascending=True)
+        by_year = defaultdict(list)
+        for row in rows:
+            by_year[row.date.year].append(row._asdict())
+        for year in range(first_date.year, max(by_year, default=first_date.year) + 1):
+            written += cot_archive.write_partition(symbol, year, by_year.get(year, []))
+    return written
+
+def rebuild_cot_archive(symbols=None):
+    """Ricostruisce l'archivio completo per i simboli indicati (default: tutti quelli nel DB)"""
+    from sqlalchemy import func
+    
+    stmt = select(COTData.symbol, func.min(COTData.date)).group_by(COTData.symbol)
+    if symbols:
+        stmt = stmt.where(COTData.symbol.in_(symbols))
+    return archive_cot_history(dict(db.session.execute(stmt).all()))
+
 # =================== CONFIGURAZIONE SIMBOLI COT ===================
 COT_SYMBOLS = {
     'GOLD': {
@@ -422,39 +1351,9 @@ def calculate_cot_sentiment(nc_long, nc_short, c_long, c_short):
     Calcola sentiment COT migliorato
     I non-commercial sono i 'smart money' - peso maggiore
     I commercial sono gli hedger - comportamento opposto
+    (formula unica in analysis/cot_metrics.py, usata anche all'ingest)
     """
-    
-    # Net position dei non-commercial (gli speculatori intelligenti)
-    nc_net = nc_long - nc_short
-    
-    # Net position dei commercial (opposite sentiment)
-    c_net = c_long - c_short
-    
-    # Total Open Interest
-    total_oi = nc_long + nc_short + c_long + c_short
-    
-    if total_oi == 0:
-        return 0
-    
-    # I non-commercial guidano il sentiment (peso 70%)
-    # I commercial sono contrarian (peso 30%, invertito)
-    nc_weight = 0.7
-    c_weight = 0.3
-    
-    # Normalizza rispetto al total OI
-    nc_sentiment = (nc_net / total_oi) * 100 * nc_weight
-    c_sentiment = -(c_net / total_oi) * 100 * c_weight  # Nota il segno meno
-    
-    # Sentiment finale
-    final_sentiment = nc_sentiment + c_sentiment
-    
-    # Amplifica per rendere pi sensibile (moltiplica per 3)
-    final_sentiment *= 3
-    
-    # Limita tra -100 e +100
-    final_sentiment = max(-100, min(100, final_sentiment))
-    
-    return round(final_sentiment, 2)
+    return weighted_sentiment(nc_long, nc_short, c_long, c_short)
 
 try:
     from technical_analyzer import (
@@ -463,7 +1362,10 @@ try:
         get_symbol_technical_data, 
         get_economic_events, 
         get_market_sentiment,
-        get_technical_signals
+        get_market_context,
+        get_technical_signals,
+        get_upstream_status,
+        refresh_market_data
     )
     TECHNICAL_ANALYZER_AVAILABLE = True
     logger.info("✅ Technical Analyzer importato correttamente")
@@ -474,17 +1376,12 @@ except ImportError as e:
 
 
 def scrape_cot_data(symbol):
-    """Scraping dati COT per un simbolo specifico - VERSIONE CORRETTA CON LOCK"""
-    
-    # Importa threading per gestire concorrenza
-    import threading
+    """Scraping dati COT per un simbolo specifico - lock per simbolo"""
     
-    # Lock globale per evitare scraping concorrenti
-    if not hasattr(scrape_cot_data, 'lock'):
-        scrape_cot_data.lock = threading.Lock()
+    from collectors.scrape_executor import symbol_lock
     
-    # Acquisisci lock - una sola istanza di scraping alla volta
-    with scrape_cot_data.lock:
+    # Lock per simbolo: simboli diversi possono essere scrapati in parallelo
+    with symbol_lock(symbol):
         try:
             # Importa il nuovo scraper
             from collectors.cot_scraper import COTScraper
@@ -517,6 +1414,28 @@ def scrape_cot_data(symbol):
             logger.error(f"❌ Errore generale scraping {symbol}: {str(e)}")
             return None
 
+def get_unchanged_report_date(symbol):
+    """
+    Probe di freschezza: se il report pubblicato non è più recente dell'ultimo
+    salvato nel DB ritorna la sua data (nessun lavoro da fare), altrimenti None.
+    """
+    try:
+        from collectors.cot_scraper import probe_report_date
+        
+        published = probe_report_date(symbol)
+        if not published:
+            return None
+        
+        # Ultima data salvata: lettura per chiave primaria sullo snapshot cot_latest
+        latest = db.session.execute(select(COTLatest.date).where(COTLatest.symbol == symbol)).scalar()
+        if latest and published.date() <= latest.date():
+            logger.info(f"⏭️ {symbol}: report {published.date()} già presente, skip")
+            return published
+        return None
+    except Exception as e:
+        logger.warning(f"⚠️ Probe freschezza {symbol} non disponibile: {e}")
+        return None
+
 # =================== MACHINE LEARNING PREDICTIONS ===================
 class COTPredictorFixed:
     """Sistema ML corretto per predizioni COT"""
@@ -582,20 +1501,21 @@ class COTPredictorFixed:
             # Estrai features base
             features = []
             
+            # Metriche salvate all'ingest (calcolate al volo solo per dati non ancora salvati)
+            metrics = metrics_for(data_point)
+            
             # Features principali COT
-            nc_long = float(data_point.get('non_commercial_long', 0))
-            nc_short = float(data_point.get('non_commercial_short', 0))
-            c_long = float(data_point.get('commercial_long', 0))
-            c_short = float(data_point.get('commercial_short', 0))
-            net_pos = float(data_point.get('net_position', 0))
-            sentiment = float(data_point.get('sentiment_score', 0))
+            nc_long = float(metrics.get('non_commercial_long') or 0)
+            nc_short = float(metrics.get('non_commercial_short') or 0)
+            c_long = float(metrics.get('commercial_long') or 0)
+            c_short = float(metrics.get('commercial_short') or 0)
+            net_pos = float(metrics['net_position'])
+            sentiment = float(metrics['sentiment_score'])
             
             # Features derivate
-            nc_ratio = nc_long / (nc_short + 1)  # Evita divisione per zero
-            c_ratio = c_long / (c_short + 1)
-            total_long = nc_long + c_long
-            total_short = nc_short + c_short
-            total_oi = total_long + total_short
+            nc_ratio = float(metrics['nc_long_ratio'])
+            c_ratio = float(metrics['c_long_ratio'])
+            total_oi = float(metrics['total_oi'])
             
             # Features normalizzate
             if total_oi > 0:
@@ -1110,7 +2030,29 @@ def get_economic_calendar_api():
         logger.error(f"Errore calendario economico: {str(e)}")
         return jsonify({'error': str(e)}), 500
 
+@app.route('/api/economic/context')
+@cached(category='economic', ttl=1800)  # Cache 30 minuti
+def get_market_context_api():
+    """Contesto di mercato condiviso (calendario + sentiment) referenziato da market_context_id"""
+    try:
+        if not TECHNICAL_ANALYZER_AVAILABLE:
+            return jsonify({
+                'context_id': None,
+                'economic_calendar': create_fallback_calendar(),
+                'market_sentiment': {},
+                'source': 'fallback'
+            })
+        
+        context = get_market_context().as_dict()
+        context['source'] = 'technical_analyzer'
+        return jsonify(context)
+        
+    except Exception as e:
+        logger.error(f"Errore market context: {str(e)}")
+        return jsonify({'error': str(e)}), 500
+
 @app.route('/api/synthesis/<symbol>')
+@read_replica  # Solo letture: SELECT su replica se configurata
 @smart_cache_response('synthesis')
 # NOTA: NON usare @cached qui! Crea conflitto con smart_cache_response
 # smart_cache_response è sufficiente per gestire la cache correttamente
@@ -1121,15 +2063,13 @@ def get_cot_synthesis(symbol):
             return jsonify({'error': 'Simbolo non valido'}), 400
         
         # Ottieni dati COT pi recenti
-        latest_cot = COTData.query.filter_by(symbol=symbol)\
-            .order_by(COTData.date.desc()).first()
+        latest_cot = fetch_latest_cot(symbol)
         
         if not latest_cot:
             return jsonify({'error': 'Nessun dato COT disponibile'}), 404
         
-        # Calcola metriche COT
-        nc_net = latest_cot.non_commercial_long - latest_cot.non_commercial_short
-        c_net = latest_cot.commercial_long - latest_cot.commercial_short
+        # Metriche COT calcolate all'ingest
+        metrics = metrics_for(latest_cot._asdict())
         
         # Ottieni analisi tecnica se disponibile
         technical_data = {}
@@ -1149,9 +2089,10 @@ def get_cot_synthesis(symbol):
             'symbol': symbol,
             'timestamp': datetime.now().isoformat(),
             'cot_summary': {
-                'large_spec_net': nc_net,
-                'commercial_net': c_net,
-                'open_interest_delta': calculate_oi_delta(symbol),
+                'large_spec_net': metrics['net_position'],
+                'commercial_net': metrics['commercial_net'],
+                'total_open_interest': metrics['total_oi'],
+                'open_interest_delta': metrics.get('total_oi_change') or 0,
                 'sentiment_score': latest_cot.sentiment_score,
                 'net_position': latest_cot.net_position,
                 'last_update': latest_cot.date.isoformat()
@@ -1178,6 +2119,7 @@ def get_cot_synthesis(symbol):
         return jsonify({'error': str(e)}), 500
 
 @app.route('/api/analysis/complete/<symbol>')
+@read_replica  # Solo letture: SELECT su replica se configurata
 @smart_cache_response('complete_analysis')
 # CRITICO: NON usare @cached qui! Causa conflitto cache:
 # - @cached si esegue PRIMA e serve dati vecchi con chiavi sbagliate
@@ -1196,8 +2138,7 @@ def get_complete_analysis(symbol):
         }
         
         # 1. Dati COT
-        latest_cot = COTData.query.filter_by(symbol=symbol)\
-            .order_by(COTData.date.desc()).first()
+        latest_cot = fetch_latest_cot(symbol)
 
         # NOTA: GPT Analysis NON viene generata qui!
         # Viene generata SOLO da:
@@ -1221,40 +2162,20 @@ def get_complete_analysis(symbol):
             if predictor is None:
                 predictor = create_production_predictor()
             
-            # Carica dati storici per training automatico
-            hist_rows = (COTData.query
-                        .filter_by(symbol=symbol)
-                        .order_by(COTData.date.asc())
-                        .all())
-            
-            historical = []
-            for r in hist_rows:
-                historical.append({
-                    "non_commercial_long": r.non_commercial_long,
-                    "non_commercial_short": r.non_commercial_short,
-                    "commercial_long": r.commercial_long,
-                    "commercial_short": r.commercial_short,
-                    "net_position": r.net_position,
-                    "sentiment_score": r.sentiment_score
-                })
-            
-            # Auto-train se necessario (serve almeno 3 record)
-            if not predictor.is_trained and len(historical) >= 3:
-                try:
-                    trained = predictor.train(historical)
-                    logger.info(f"🎯 Auto-train per {symbol}: {'OK' if trained else 'FAILED'} (n={len(historical)})")
-                except Exception as e:
-                    logger.warning(f"⚠️ Auto-train fallito per {symbol}: {e}")
+            # Auto-train se necessario (serve almeno 3 record): lo storico
+            # si carica solo quando il modello non è ancora addestrato
+            if not predictor.is_trained:
+                historical = fetch_cot_training_history(symbol)
+                if len(historical) >= 3:
+                    try:
+                        trained = predictor.train(historical)
+                        logger.info(f"🎯 Auto-train per {symbol}: {'OK' if trained else 'FAILED'} (n={len(historical)})")
+                    except Exception as e:
+                        logger.warning(f"⚠️ Auto-train fallito per {symbol}: {e}")
             
             # Prepara dati per predizione
-            cot_data_dict = {
-                'non_commercial_long': latest_cot.non_commercial_long,
-                'non_commercial_short': latest_cot.non_commercial_short,
-                'commercial_long': latest_cot.commercial_long,
-                'commercial_short': latest_cot.commercial_short,
-                'net_position': latest_cot.net_position,
-                'sentiment_score': latest_cot.sentiment_score
-            }
+            cot_data_dict = latest_cot._asdict()
+            cot_data_dict.pop('date', None)
             
             # Genera predizione
             ml_prediction = predictor.predict(cot_data_dict)
@@ -1275,18 +2196,10 @@ def get_complete_analysis(symbol):
         
         # Usa GPT Analysis dal database SOLO se non è stata generata una nuova
         if 'gpt_analysis' not in complete_analysis or not complete_analysis.get('gpt_analysis'):
-            last_pred = Prediction.query.filter_by(symbol=symbol)\
-                .order_by(Prediction.prediction_date.desc()).first()
-
-            if last_pred and last_pred.gpt_analysis:
-                try:
-                    gpt_json = json.loads(last_pred.gpt_analysis) \
-                               if isinstance(last_pred.gpt_analysis, str) else last_pred.gpt_analysis
-                    complete_analysis['gpt_analysis'] = gpt_json
-                    logger.info(f"✅ Using GPT from database for {symbol}")
-                except Exception as e:
-                    complete_analysis['gpt_analysis'] = last_pred.gpt_analysis
-                    logger.warning(f"⚠️ GPT parse error for {symbol}: {e}")
+            latest_analysis = fetch_latest_analysis(symbol)
+            if latest_analysis:
+                complete_analysis['gpt_analysis'] = latest_analysis
+                logger.info(f"✅ Using GPT from database for {symbol}")
         else:
             logger.info(f"✅ Using fresh GPT analysis for {symbol}")
 
@@ -1315,7 +2228,7 @@ def get_system_status():
         db_status = 'ONLINE'
         db_count = 0
         try:
-            db_count = COTData.query.count()
+            db_count = db.session.query(db.func.coalesce(db.func.sum(COTLatest.history_count), 0)).scalar()
         except:
             db_status = 'ERROR'
         
@@ -1331,8 +2244,11 @@ def get_system_status():
                 'database': {
                     'status': db_status,
                     'record_count': db_count,
-                    'last_update': get_last_db_update()
+                    'last_update': get_last_db_update(),
+                    'read_replica': db_routing.status()
                 },
+                'cot_archive': cot_archive.archive_status(),
+                'prediction_retention': prediction_retention_status(),
                 'machine_learning': {
                     'status': 'TRAINED' if ml_info['is_trained'] else 'NOT_TRAINED',
                     'available': ml_info['ml_available'],
@@ -1345,7 +2261,8 @@ def get_system_status():
                 },
                 'openai_api': {
                     'status': 'CONFIGURED' if os.environ.get('OPENAI_API_KEY') else 'NOT_CONFIGURED'
-                }
+                },
+                'twelve_data': get_upstream_status() if TECHNICAL_ANALYZER_AVAILABLE else {'status': 'DISABLED'}
             },
             'data_coverage': {
                 'symbols_count': len(COT_SYMBOLS),
@@ -1390,6 +2307,27 @@ def cache_stats_api():
         return jsonify({'error': str(e)}), 500
 
 
+@app.route('/api/admin/queries/stats')
+@login_required
+def query_stats_api():
+    """Query SQL per endpoint dall'avvio (conteggi, tempo DB, N+1) - solo admin"""
+    if not current_user.is_admin:
+        return jsonify({'error': 'Access denied'}), 403
+    
+    if request.args.get('reset') == '1':
+        query_monitor.ENDPOINT_STATS.reset()
+    
+    return jsonify({
+        'timestamp': datetime.now().isoformat(),
+        'thresholds': {
+            'slow_query_ms': query_monitor.SLOW_QUERY_MS,
+            'n_plus_one': query_monitor.N_PLUS_ONE_THRESHOLD,
+            'query_count_warn': query_monitor.QUERY_COUNT_WARN
+        },
+        'endpoints': query_monitor.ENDPOINT_STATS.snapshot()
+    })
+
+
 @app.route('/api/admin/cache/clear', methods=['POST'])
 @login_required
 def clear_cache_api():
@@ -1430,8 +2368,7 @@ def warm_cache_api():
                 
                 for symbol in priority_symbols:
                     try:
-                        latest_cot = COTData.query.filter_by(symbol=symbol)\
-                            .order_by(COTData.date.desc()).first()
+                        latest_cot = fetch_latest_cot(symbol)
                         
                         if latest_cot:
                             analysis_data = {
@@ -1533,12 +2470,6 @@ def create_fallback_calendar():
         }
     ]
 
-def calculate_oi_delta(symbol):
-    """Calcola variazione Open Interest (simulata)"""
-    import random
-    random.seed(hash(symbol + str(datetime.now().date())))
-    return random.randint(-8000, 12000)
-
 def determine_cot_signal(cot_data):
     """Determina segnale da dati COT"""
     sentiment = cot_data.sentiment_score or 0
@@ -1588,8 +2519,8 @@ def determine_market_regime_synthesis(cot_data, technical_data):
 def get_last_db_update():
     """Ultimo aggiornamento database"""
     try:
-        latest = COTData.query.order_by(COTData.created_at.desc()).first()
-        return latest.created_at.isoformat() if latest else None
+        updated_at = db.session.query(db.func.max(COTLatest.updated_at)).scalar()
+        return updated_at.isoformat() if updated_at else None
     except:
         return None
 
@@ -1603,8 +2534,8 @@ def get_predictions_count():
 def get_newest_data_date():
     """Data del dato pi recente"""
     try:
-        latest = COTData.query.order_by(COTData.date.desc()).first()
-        return latest.date.isoformat() if latest else None
+        newest = db.session.query(db.func.max(COTLatest.date)).scalar()
+        return newest.isoformat() if newest else None
     except:
         return None
 # =================== API ROUTES ===================
@@ -1768,160 +2699,377 @@ def get_symbols():
         'message': 'Piano Starter: max 5 asset monitorabili. Passa a Professional per tutti gli asset.'
     })
 
-@app.route('/api/scrape/<symbol>')
-@login_required
-def scrape_symbol(symbol):
-    """Scraping manuale - solo admin - VERSIONE OTTIMIZZATA"""
-    if not current_user.is_admin:
-        return jsonify({'error': 'Accesso negato - solo admin'}), 403
+def run_scrape_pipeline(symbol, force=False, on_stage=None):
+    """
+    Pipeline completa di ingestione per un simbolo:
+    probe freschezza -> scraping -> DB -> GPT -> predizione -> invalidazione cache.
     
-    if symbol not in COT_SYMBOLS:
-        return jsonify({'error': 'Simbolo non valido'}), 400
+    Args:
+        symbol: simbolo COT
+        force: ignora il probe di freschezza
+        on_stage: callback(stage) chiamata all'inizio di ogni fase
     
-    try:
-        # Lock per scraping
-        import threading
-        if not hasattr(scrape_symbol, 'lock'):
-            scrape_symbol.lock = threading.Lock()
+    Returns:
+        (payload, http_status)
+    """
+    def stage(name):
+        if on_stage:
+            on_stage(name)
+    
+    # Lock per simbolo (condiviso con scheduler ed executor)
+    from collectors.scrape_executor import symbol_lock
+    
+    with symbol_lock(symbol):
+        from collectors.cot_scraper import COTScraper
         
-        with scrape_symbol.lock:
-            from collectors.cot_scraper import COTScraper
-            
-            logger.info(f"🔄 Scraping {symbol}...")
+        # 0. Report invariato: niente scraping, scrittura DB, GPT né invalidazione cache
+        stage('probe')
+        unchanged_date = None if force else get_unchanged_report_date(symbol)
+        if unchanged_date:
+            gpt_analysis = fetch_latest_analysis(symbol)
+            return {
+                'status': 'unchanged',
+                'message': f'No new COT report for {symbol}',
+                'data': {
+                    'symbol': symbol,
+                    'date': unchanged_date.isoformat()
+                },
+                'gpt_analysis': gpt_analysis
+            }, 200
+        
+        logger.info(f"🔄 Scraping {symbol}...")
+        
+        # 1. Scraping COT
+        stage('scrape')
+        with COTScraper(headless=True) as scraper:
+            data = scraper.scrape_cot_data(symbol)
             
-            # 1. Scraping COT
-            with COTScraper(headless=True) as scraper:
-                data = scraper.scrape_cot_data(symbol)
-                
-                if not data:
-                    return jsonify({'error': 'Scraping failed'}), 500
-                
-                # Ricalcola sentiment
-                data['sentiment_score'] = calculate_cot_sentiment(
-                    data['non_commercial_long'],
-                    data['non_commercial_short'], 
-                    data['commercial_long'],
-                    data['commercial_short']
-                )
-                logger.info(f"✅ Sentiment: {data['sentiment_score']:.2f}%")
+            if not data:
+                return {'error': 'Scraping failed'}, 500
             
-            # 2. Salva COT nel DB (UPDATE se esiste, altrimenti INSERT)
-            existing = COTData.query.filter_by(
-                symbol=symbol, date=data['date']
-            ).first()
-
-            if existing:
-                # Aggiorna record esistente con nuovi dati
-                old_net = existing.net_position
-                for key, value in data.items():
-                    if key != 'id':  # Non sovrascrivere l'ID
-                        setattr(existing, key, value)
-                logger.info(f"🔄 COT data UPDATED for {symbol} (Net Position: {old_net} → {data.get('net_position')})")
+            # Ricalcola sentiment
+            data['sentiment_score'] = calculate_cot_sentiment(
+                data['non_commercial_long'],
+                data['non_commercial_short'], 
+                data['commercial_long'],
+                data['commercial_short']
+            )
+            logger.info(f"✅ Sentiment: {data['sentiment_score']:.2f}%")
+        
+        # 2. Salva COT nel DB: report corrente + settimane storiche della pagina in un solo upsert
+        stage('save')
+        written = upsert_cot_rows(cot_report_rows(data))
+        logger.info(f"✅ COT data saved for {symbol} (Net Position: {data.get('net_position')}, {written} righe)")
+        
+        # 3. ⚡ GPT Pre-calcolo (CHIAVE PER PERFORMANCE!)
+        stage('gpt')
+        gpt_analysis = None
+        # Metriche e variazioni settimanali appena calcolate all'ingest
+        latest = fetch_latest_cot(symbol)
+        if latest is not None:
+            data = dict(data, **latest._asdict())
+        try:
+            if gpt_analyzer.client:
+                logger.info(f"🤖 Running GPT analysis for {symbol}...")
+                start_gpt = time.time()
+                gpt_analysis = gpt_analyzer.analyze_single_symbol(data)
+                gpt_duration = (time.time() - start_gpt) * 1000
+                logger.info(f"✅ GPT completed in {gpt_duration:.0f}ms")
             else:
-                # Crea nuovo record
-                cot_entry = COTData(**data)
-                db.session.add(cot_entry)
-                logger.info(f"✅ COT data CREATED for {symbol}")
-
-            db.session.commit()
-            
-            # 3. ⚡ GPT Pre-calcolo (CHIAVE PER PERFORMANCE!)
-            gpt_analysis = None
-            try:
-                if gpt_analyzer.client:
-                    logger.info(f"🤖 Running GPT analysis for {symbol}...")
-                    start_gpt = time.time()
-                    gpt_analysis = gpt_analyzer.analyze_single_symbol(data)
-                    gpt_duration = (time.time() - start_gpt) * 1000
-                    logger.info(f"✅ GPT completed in {gpt_duration:.0f}ms")
-                else:
-                    logger.warning("GPT Analyzer not available - using fallback")
-                    gpt_analysis = gpt_analyzer._create_fallback_analysis(data)
-            except Exception as e:
-                logger.error(f"❌ GPT error: {e}")
+                logger.warning("GPT Analyzer not available - using fallback")
                 gpt_analysis = gpt_analyzer._create_fallback_analysis(data)
-            
-            # 4. Salva predizione con GPT
-            if gpt_analysis:
-                prediction = Prediction(
-                    symbol=symbol,
-                    prediction_date=datetime.now(),
-                    predicted_direction=gpt_analysis.get('direction', 'NEUTRAL'),
-                    confidence=gpt_analysis.get('confidence', 50),
-                    ml_score=None,
-                    gpt_analysis=json.dumps(gpt_analysis) if isinstance(gpt_analysis, dict) else gpt_analysis
-                )
-                db.session.add(prediction)
-                db.session.commit()
+        except Exception as e:
+            logger.error(f"❌ GPT error: {e}")
+            gpt_analysis = gpt_analyzer._create_fallback_analysis(data)
+        
+        # 4. Salva predizione con GPT
+        stage('prediction')
+        if gpt_analysis:
+            _, created = save_prediction_analysis(symbol, gpt_analysis, report_date=data.get('date'))
+            if created:
                 logger.info(f"✅ Prediction saved for {symbol}")
-            
-            # 5. ⚡ INVALIDA ENTRAMBE LE CACHE (CRITICO!)
-            # Invalida Flask cache (usata da smart_cache_response)
-            cache_keys = [
-                f"complete_analysis:get_complete_analysis:{symbol}",
-                f"technical:get_technical_analysis:{symbol}",
-                f"cot_data:get_data:{symbol}",
-                f"synthesis:get_cot_synthesis:{symbol}"
-            ]
-
-            for key in cache_keys:
-                try:
-                    cache.delete(key)
-                    logger.info(f"🗑️ Flask cache invalidated: {key}")
-                except Exception as e:
-                    logger.warning(f"Failed to invalidate Flask cache {key}: {e}")
+        
+        # 5. ⚡ INVALIDA ENTRAMBE LE CACHE (CRITICO!)
+        stage('cache')
+        # Invalida Flask cache (usata da smart_cache_response)
+        cache_keys = [
+            f"complete_analysis:get_complete_analysis:{symbol}",
+            f"technical:get_technical_analysis:{symbol}",
+            f"cot_data:get_data:{symbol}",
+            f"synthesis:get_cot_synthesis:{symbol}"
+        ]
 
-            # Invalida GLOBAL_CACHE (usata da @cached decorator)
+        for key in cache_keys:
             try:
-                GLOBAL_CACHE.invalidate('complete', f"get_complete_analysis:{symbol}")
-                GLOBAL_CACHE.invalidate('technical', f"get_technical_analysis:{symbol}")
-                GLOBAL_CACHE.invalidate('cot_data', f"get_data:{symbol}")
-                GLOBAL_CACHE.invalidate('synthesis', f"get_cot_synthesis:{symbol}")
-                logger.info(f"🗑️ GLOBAL_CACHE invalidated for {symbol}")
+                cache.delete(key)
+                logger.info(f"🗑️ Flask cache invalidated: {key}")
             except Exception as e:
-                logger.warning(f"Failed to invalidate GLOBAL_CACHE: {e}")
-            
-            return jsonify({
-                'status': 'success',
-                'message': f'Analysis completed for {symbol}',
-                'data': {
-                    'symbol': symbol,
-                    'date': data['date'].isoformat() if isinstance(data['date'], datetime) else data['date'],
-                    'sentiment_score': data['sentiment_score'],
-                    'net_position': data['net_position']
-                },
-                'gpt_analysis': gpt_analysis
-            })
-            
+                logger.warning(f"Failed to invalidate Flask cache {key}: {e}")
+
+        # Invalida GLOBAL_CACHE (usata da @cached decorator)
+        try:
+            GLOBAL_CACHE.invalidate('complete', f"get_complete_analysis:{symbol}")
+            GLOBAL_CACHE.invalidate('technical', f"get_technical_analysis:{symbol}")
+            GLOBAL_CACHE.invalidate('cot_data', f"get_data:{symbol}")
+            GLOBAL_CACHE.invalidate('synthesis', f"get_cot_synthesis:{symbol}")
+            logger.info(f"🗑️ GLOBAL_CACHE invalidated for {symbol}")
+        except Exception as e:
+            logger.warning(f"Failed to invalidate GLOBAL_CACHE: {e}")
+        
+        return {
+            'status': 'success',
+            'message': f'Analysis completed for {symbol}',
+            'data': {
+                'symbol': symbol,
+                'date': data['date'].isoformat() if isinstance(data['date'], datetime) else data['date'],
+                'sentiment_score': data['sentiment_score'],
+                'net_position': data['net_position']
+            },
+            'gpt_analysis': gpt_analysis
+        }, 200
+
+# =================== JOB ASINCRONI SCRAPING ===================
+# Worker dedicati: l'ingestione non occupa mai i thread web di gunicorn.
+# LIMITE NOTO: il pool è in-process, uno per worker gunicorn. Un riavvio o un
+# timeout del worker perde i job in coda/in corso: non vengono ripresi, solo
+# segnati come falliti al successivo avvio (fail_interrupted_scrape_jobs) e
+# vanno rilanciati dal client. Per job durevoli serve una coda esterna
+# (es. RQ/Celery su Redis) con worker separati dal web.
+from concurrent.futures import ThreadPoolExecutor as _JobExecutor
+import socket
+
+SCRAPE_JOB_WORKERS = int(os.getenv("SCRAPE_JOB_WORKERS", "2"))
+SCRAPE_JOB_STALE_MINUTES = 15  # job "running" più vecchi sono considerati persi (es. riavvio worker)
+SCRAPE_JOB_EXECUTOR = _JobExecutor(max_workers=SCRAPE_JOB_WORKERS, thread_name_prefix='scrape-job')
+SCRAPE_JOB_HOST = socket.gethostname()
+
+def _job_worker_id():
+    return f"{SCRAPE_JOB_HOST}:{os.getpid()}"
+
+def _pid_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except OSError:
+        return True  # Processo esistente di un altro utente
+    return True
+
+def fail_interrupted_scrape_jobs():
+    """
+    All'avvio: i job in coda/in corso vivono nel pool in-process del worker
+    che li ha accodati, quindi un riavvio li perde. Segna come falliti quelli
+    di processi di questo host non più vivi (o con il nostro stesso pid,
+    riusato dopo un restart del container) e quelli senza proprietario
+    oltre la finestra di stale. I job dei worker fratelli ancora vivi restano.
+    """
+    added = add_missing_columns(ScrapeJob)
+    if added:
+        logger.info(f"✅ Colonne job aggiunte: {', '.join(added)}")
+    
+    stale_before = datetime.utcnow() - timedelta(minutes=SCRAPE_JOB_STALE_MINUTES)
+    me = _job_worker_id()
+    failed = 0
+    for job in ScrapeJob.query.filter(ScrapeJob.status.in_(('queued', 'running'))):
+        if job.worker:
+            host, _, pid = job.worker.rpartition(':')
+            if host != SCRAPE_JOB_HOST:
+                if job.created_at and job.created_at >= stale_before:
+                    continue
+            elif job.worker != me and pid.isdigit() and _pid_alive(int(pid)):
+                continue
+        elif job.created_at and job.created_at >= stale_before:
+            continue
+        job.status = 'failed'
+        job.error = 'Job interrotto dal riavvio del worker'
+        job.stage = None
+        job.finished_at = datetime.utcnow()
+        failed += 1
+    db.session.commit()
+    if failed:
+        logger.warning(f"⚠️ {failed} job di scraping interrotti da un riavvio segnati come falliti")
+
+def run_scrape_job(job_id):
+    """Esegue un job in un worker dedicato aggiornando stato e tempi per fase"""
+    with app.app_context():
+        job = db.session.get(ScrapeJob, job_id)
+        if job is None:
+            return
+        
+        timings = {}
+        current = {'stage': None, 'start': None}
+        
+        def close_stage():
+            if current['stage']:
+                timings[current['stage']] = round((time.perf_counter() - current['start']) * 1000)
+        
+        def on_stage(name):
+            close_stage()
+            current['stage'], current['start'] = name, time.perf_counter()
+            job.stage = name
+            job.stage_timings = json.dumps(timings)
+            db.session.commit()
+        
+        job.status = 'running'
+        job.started_at = datetime.utcnow()
+        db.session.commit()
+        
+        try:
+            payload, status_code = run_scrape_pipeline(job.symbol, force=job.force, on_stage=on_stage)
+            close_stage()
+            if status_code >= 400:
+                job.status = 'failed'
+                job.error = payload.get('error')
+            else:
+                job.status = 'unchanged' if payload.get('status') == 'unchanged' else 'done'
+            job.result = json.dumps(payload, default=str)
+        except Exception as e:
+            close_stage()
+            db.session.rollback()
+            logger.error(f"❌ Job scraping {job.symbol} fallito: {e}")
+            job.status = 'failed'
+            job.error = str(e)
+        
+        job.stage = None
+        job.stage_timings = json.dumps(timings)
+        job.finished_at = datetime.utcnow()
+        db.session.commit()
+        logger.info(f"📋 Job {job_id} ({job.symbol}) {job.status} - fasi: {timings}")
+
+@app.route('/api/scrape/<symbol>', methods=['GET', 'POST'])
+@login_required
+def scrape_symbol(symbol):
+    """
+    Accoda scraping + analisi GPT per un simbolo - solo admin.
+    POST e GET (client storici) ritornano subito 202 con job_id e status_url:
+    il risultato si legge da GET /api/scrape/jobs/<job_id>. Nessuna richiesta
+    web esegue la pipeline (scraping/GPT oltre i timeout di nginx e gunicorn).
+    """
+    if not current_user.is_admin:
+        return jsonify({'error': 'Accesso negato - solo admin'}), 403
+    
+    if symbol not in COT_SYMBOLS:
+        return jsonify({'error': 'Simbolo non valido'}), 400
+    
+    force = request.args.get('force', '').lower() in ('1', 'true', 'yes')
+    
+    try:
+        # Un solo job attivo per simbolo: riusa quello già in coda/in corso
+        job = ScrapeJob.query.filter(
+            ScrapeJob.symbol == symbol,
+            ScrapeJob.status.in_(('queued', 'running')),
+            ScrapeJob.created_at >= datetime.utcnow() - timedelta(minutes=SCRAPE_JOB_STALE_MINUTES)
+        ).order_by(ScrapeJob.created_at.desc()).first()
+        
+        if job is None:
+            job = ScrapeJob(
+                id=uuid.uuid4().hex,
+                symbol=symbol,
+                force=force,
+                requested_by=current_user.id,
+                worker=_job_worker_id()
+            )
+            db.session.add(job)
+            db.session.commit()
+            SCRAPE_JOB_EXECUTOR.submit(run_scrape_job, job.id)
+            logger.info(f"📋 Job scraping {symbol} accodato: {job.id}")
+        
+        status_url = f"/api/scrape/jobs/{job.id}"
+        response = jsonify({**job.to_dict(), 'status_url': status_url})
+        response.headers['Location'] = status_url
+        if request.method == 'GET':
+            # Contratto cambiato: GET non ritorna più il risultato sincrono
+            response.headers['Deprecation'] = 'true'
+            response.headers['Link'] = f'<{status_url}>; rel="status"'
+        return response, 202
+        
     except Exception as e:
-        logger.error(f"❌ Error scraping {symbol}: {str(e)}")
+        db.session.rollback()
+        logger.error(f"❌ Error queuing scrape {symbol}: {str(e)}")
         return jsonify({'error': str(e)}), 500
+
+@app.route('/api/scrape/jobs/<job_id>')
+@login_required
+def scrape_job_status(job_id):
+    """Stato di un job di scraping: fase corrente, tempi per fase e risultato"""
+    if not current_user.is_admin:
+        return jsonify({'error': 'Accesso negato - solo admin'}), 403
+    
+    job = db.session.get(ScrapeJob, job_id)
+    if job is None:
+        return jsonify({'error': 'Job non trovato'}), 404
+    return jsonify(job.to_dict(include_result=True))
     
 @app.route('/api/data/<symbol>')
+@read_replica  # Solo letture: SELECT su replica se configurata
 @login_required
 @smart_cache_response('cot_data')
 # NOTA: NON usare @cached qui! Crea conflitto con smart_cache_response
 # smart_cache_response è sufficiente per gestire la cache correttamente
 def get_data(symbol):
-    """Dati storici simbolo"""
-    days = request.args.get('days', 30, type=int)
-    
-    data = COTData.query.filter_by(symbol=symbol)\
-        .filter(COTData.date >= datetime.now() - timedelta(days=days))\
-        .order_by(COTData.date.desc()).all()
+    """
+    Storico COT paginato con keyset su (symbol, date).
+    
+    Query string:
+        from, to: intervallo date ISO (YYYY-MM-DD), estremi inclusi
+        days: alternativa a from (ultimi N giorni, default 30 se from/to/cursor assenti)
+        limit: righe per pagina (default COT_PAGE_DEFAULT_LIMIT, max COT_PAGE_MAX_LIMIT)
+        order: desc (default, più recenti prima) | asc
+        cursor: next_cursor della pagina precedente
+    """
+    try:
+        since = _parse_date_arg('from')
+        until = _parse_date_arg('to')
+        after = _parse_date_arg('cursor')
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    days = request.args.get('days', type=int)
+    if since is None and (days is not None or (until is None and after is None)):
+        since = datetime.now() - timedelta(days=max(days if days is not None else 30, 0))
+    if until is not None and len(request.args['to']) == 10:
+        until += timedelta(days=1) - timedelta(microseconds=1)  # "to" giornaliero: include tutto il giorno
+    
+    limit = request.args.get('limit', COT_PAGE_DEFAULT_LIMIT, type=int)
+    limit = max(1, min(limit, COT_PAGE_MAX_LIMIT))
+    ascending = request.args.get('order', 'desc').lower() == 'asc'
+    
+    # Una riga in più per sapere se esiste la pagina successiva
+    rows = fetch_cot_rows(symbol, since=since, until=until, after=after,
+                          limit=limit + 1, ascending=ascending)
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    
+    result = []
+    for row in rows:
+        item = dict(zip(COT_HISTORY_KEYS, row))
+        item['date'] = row.date.isoformat()
+        result.append(item)
     
-    return jsonify([{
-        'symbol': d.symbol,  # ✅ AGGIUNTO - mancava!
-        'date': d.date.isoformat(),
-        'non_commercial_long': d.non_commercial_long,
-        'non_commercial_short': d.non_commercial_short,
-        'commercial_long': d.commercial_long,
-        'commercial_short': d.commercial_short,
-        'net_position': d.net_position,
-        'sentiment_score': d.sentiment_score
-    } for d in data])
+    return jsonify({
+        'symbol': symbol,
+        'order': 'asc' if ascending else 'desc',
+        'from': since.isoformat() if since else None,
+        'to': until.isoformat() if until else None,
+        'limit': limit,
+        'count': len(result),
+        'has_more': has_more,
+        'next_cursor': result[-1]['date'] if has_more else None,
+        'data': result
+    })
+
+def _parse_date_arg(name):
+    """Data ISO da query string (None se assente)"""
+    value = request.args.get(name)
+    if not value:
+        return None
+    try:
+        return datetime.fromisoformat(value)
+    except ValueError:
+        raise ValueError(f"Parametro '{name}' non valido: usa il formato YYYY-MM-DD")
 
 @app.route('/api/predictions/<symbol>')
+@read_replica  # Solo letture: SELECT su replica se configurata
 @login_required
 @cached(category='prediction', ttl=600)  # Cache 10 minuti (ridotto da 30)
 def get_predictions(symbol):
@@ -1942,7 +3090,8 @@ def get_predictions(symbol):
         'direction': p.predicted_direction,
         'confidence': p.confidence,
         'ml_score': p.ml_score,
-        'gpt_analysis': p.gpt_analysis
+        'report_date': p.report_date.isoformat() if p.report_date else None,
+        'gpt_analysis': p.analysis
     } for p in predictions])
 
 # ==========================================
@@ -2038,37 +3187,54 @@ def server_error(e):
 
 # =================== SCHEDULED TASKS ===================
 def scheduled_scraping():
-    """Scraping automatico schedulato"""
+    """
+    Scraping automatico schedulato (simboli in parallelo)
+    
+    Returns:
+        riepilogo del batch (ScrapeBatchResult.as_dict) con simboli invariati e righe salvate
+    """
+    from collectors.scrape_executor import ScrapeBatchResult, ScrapeExecutor
+    
     print(f"Avvio scraping automatico: {datetime.now()}")
     
-    for symbol in COT_SYMBOLS.keys():
-        try:
-            data = scrape_cot_data(symbol)
-            if data:
-                # Controlla se esiste gi  
-                existing = COTData.query.filter_by(
-                    symbol=symbol,
-                    date=data['date']
-                ).first()
-                
-                if not existing:
-                    cot_entry = COTData(**data)
-                    db.session.add(cot_entry)
-                    db.session.commit()
-                    print(f" Salvato {symbol}")
-                else:
-                    print(f"- {symbol} gi  presente")
-        except Exception as e:
-            print(f" Errore {symbol}: {str(e)}")
-        
-        time.sleep(10)  # Pausa tra richieste
+    # Solo i simboli con un report più recente di quello salvato
+    unchanged = [s for s in COT_SYMBOLS.keys() if get_unchanged_report_date(s)]
+    symbols = [s for s in COT_SYMBOLS.keys() if s not in unchanged]
+    if not symbols:
+        print("Nessun nuovo report COT, niente da fare")
+        return dict(ScrapeBatchResult(started_at=datetime.now()).as_dict(), unchanged=unchanged, written=0)
+    
+    batch = ScrapeExecutor(scrape_fn=scrape_cot_data).run(symbols)
+    
+    for result in batch.failed:
+        print(f" Errore {result.symbol}: {result.error} ({result.attempts} tentativi)")
+    
+    # Un solo upsert per tutti i simboli (settimana corrente + storico della pagina)
+    rows = []
+    for result in batch.succeeded:
+        rows.extend(cot_report_rows(result.data))
+    
+    written = 0
+    try:
+        written = upsert_cot_rows(rows)
+        print(f" Salvati {len(batch.succeeded)} simboli ({written} righe)")
+    except Exception as e:
+        print(f" Errore salvataggio: {str(e)}")
+    
+    return dict(batch.as_dict(), unchanged=unchanged, written=written)
 
 # =================== INIZIALIZZAZIONE ===================
 # Inizializza database all'avvio
 with app.app_context():
     try:
         db.create_all()
+        ensure_cot_unique_key()
+        ensure_cot_metric_columns()
+        ensure_cot_latest()
+        ensure_prediction_analysis()
+        fail_interrupted_scrape_jobs()
         print("✅ Database creato/verificato")
+        logger.info(f"🗄️ Engine DB: {db_engine.describe(DATABASE_URL)}")
         
         # ⚡ CACHE WARMING - Pre-carica dati più richiesti
         def warm_cache_background():
@@ -2080,13 +3246,19 @@ with app.app_context():
                 logger.info("🔥 Cache warming started...")
                 priority_symbols = ['GOLD', 'USD', 'EUR']
                 
+                # Prefetch parallelo dei dati Twelve Data (un round-trip per tutti i simboli)
+                if TECHNICAL_ANALYZER_AVAILABLE:
+                    try:
+                        refresh_market_data(priority_symbols)
+                    except Exception as e:
+                        logger.warning(f"Prefetch market data fallito: {e}")
+                
                 for symbol in priority_symbols:
                     try:
                         logger.info(f"🔥 Warming cache for {symbol}...")
                         
                         # Recupera ultimo dato COT
-                        latest_cot = COTData.query.filter_by(symbol=symbol)\
-                            .order_by(COTData.date.desc()).first()
+                        latest_cot = fetch_latest_cot(symbol)
                         
                         if not latest_cot:
                             logger.warning(f"⚠️ No COT data for {symbol}, skipping")
@@ -2117,16 +3289,9 @@ with app.app_context():
                                 logger.warning(f"Technical analysis failed for {symbol}: {e}")
                         
                         # Aggiungi ultima predizione GPT se disponibile
-                        last_pred = Prediction.query.filter_by(symbol=symbol)\
-                            .order_by(Prediction.prediction_date.desc()).first()
-                        
-                        if last_pred and last_pred.gpt_analysis:
-                            try:
-                                gpt_json = json.loads(last_pred.gpt_analysis) \
-                                           if isinstance(last_pred.gpt_analysis, str) else last_pred.gpt_analysis
-                                analysis_data['gpt_analysis'] = gpt_json
-                            except Exception as e:
-                                logger.warning(f"Failed to parse GPT analysis: {e}")
+                        latest_analysis = fetch_latest_analysis(symbol)
+                        if latest_analysis:
+                            analysis_data['gpt_analysis'] = latest_analysis
                         
                         # Aggiungi ML prediction
                         if predictor and predictor.is_trained:
@@ -2192,6 +3357,70 @@ def create_admin():
     
     print(f"✅ Admin creato: {email}")
 
+@app.cli.command('backfill-cot')
+@click.argument('paths', nargs=-1, required=True, type=click.Path(exists=True))
+@click.option('--batch-size', default=1000, show_default=True, help='Righe per transazione')
+@click.option('--symbols', default='', help='Simboli separati da virgola (default: tutti)')
+def backfill_cot(paths, batch_size, symbols):
+    """Importa lo storico dai file annuali CFTC - uso: flask backfill-cot data/cftc/"""
+    from collectors.cftc_backfill import backfill
+    from config import current_config
+    
+    ensure_cot_unique_key()
+    ensure_cot_metric_columns()
+
+    selected = current_config.COT_SYMBOLS
+    if symbols:
+        wanted = {s.strip().upper() for s in symbols.split(',')}
+        selected = {k: v for k, v in selected.items() if k in wanted}
+
+    # Archivio colonnare ricostruito una volta alla fine, non a ogni batch
+    stats = backfill(
+        lambda rows: upsert_cot_rows(rows, update=False, archive=False), paths,
+        symbols=selected,
+        sentiment_fn=calculate_cot_sentiment,
+        batch_size=batch_size
+    )
+    if stats['inserted'] and cot_archive.ARCHIVE_ENABLED:
+        archived = rebuild_cot_archive(list(selected))
+        print(f"📦 Archivio colonnare aggiornato: {archived} righe")
+
+    # Lo storico cambia: invalida le cache COT
+    for category in ('cot_data', 'complete', 'synthesis'):
+        GLOBAL_CACHE.invalidate(category)
+    cache.clear()
+
+    print(f"✅ Backfill completato: {stats['inserted']} righe inserite, "
+          f"{stats['skipped']} già presenti ({stats['seconds']}s)")
+
+@app.cli.command('archive-cot')
+@click.option('--symbols', default='', help='Simboli separati da virgola (default: tutti)')
+def archive_cot(symbols):
+    """Ricostruisce l'archivio Parquet/Arrow dello storico COT - uso: flask archive-cot"""
+    if not cot_archive.ARCHIVE_ENABLED:
+        print("❌ Archivio disattivato o pyarrow non installato (pip install pyarrow)")
+        return
+    
+    wanted = [s.strip().upper() for s in symbols.split(',') if s.strip()]
+    start = time.time()
+    archived = rebuild_cot_archive(wanted or None)
+    print(f"✅ Archivio ricostruito: {archived} righe in {time.time() - start:.1f}s ({cot_archive.ARCHIVE_DIR})")
+
+@app.cli.command('prune-predictions')
+@click.option('--keep', default=PREDICTION_RETENTION_PER_SYMBOL, show_default=True, type=click.IntRange(min=1),
+              help='Predizioni hot per simbolo (almeno 1)')
+@click.option('--batch-size', default=PREDICTION_RETENTION_BATCH, show_default=True, help='Righe per transazione')
+def prune_predictions_command(keep, batch_size):
+    """Archivia le predizioni oltre la retention - uso: flask prune-predictions --keep 20"""
+    stats = prune_predictions(keep=keep, batch_size=batch_size)
+    if stats['skipped']:
+        print("⏭️ Retention già in corso in un altro processo")
+        return
+    for symbol, count in sorted(stats['symbols'].items()):
+        print(f"  {symbol}: {count}")
+    print(f"✅ Retention completata: {stats['archived']} predizioni archiviate "
+          f"(keep={stats['keep']}/simbolo, {stats['seconds']}s)")
+
 # =================== CREAZIONE INDICI DATABASE ===================
 def create_database_indexes():
     """
@@ -2229,29 +3458,31 @@ def weekly_gpt_analysis():
     with app.app_context():
         logger.info("🤖 SCHEDULER: Inizio analisi GPT settimanale per tutti i simboli")
 
+        # Report già analizzato per simbolo (puntatore prediction_latest -> predizione)
+        analyzed = dict(db.session.execute(
+            select(PredictionLatest.symbol, Prediction.report_date)
+            .join(Prediction, Prediction.id == PredictionLatest.prediction_id)
+        ).all())
+
         for symbol in COT_SYMBOLS.keys():
             try:
-                logger.info(f"🤖 Generazione GPT per {symbol}...")
-
                 # Ottieni ultimi dati COT
-                latest_cot = COTData.query.filter_by(symbol=symbol)\
-                    .order_by(COTData.date.desc()).first()
+                latest_cot = fetch_latest_cot(symbol)
 
                 if not latest_cot:
                     logger.warning(f"⚠️ Nessun dato COT per {symbol}, skip")
                     continue
 
-                # Prepara dati per GPT
-                gpt_input = {
-                    'symbol': symbol,
-                    'date': latest_cot.date.isoformat(),
-                    'non_commercial_long': latest_cot.non_commercial_long,
-                    'non_commercial_short': latest_cot.non_commercial_short,
-                    'commercial_long': latest_cot.commercial_long,
-                    'commercial_short': latest_cot.commercial_short,
-                    'net_position': latest_cot.net_position,
-                    'sentiment_score': latest_cot.sentiment_score
-                }
+                # Report invariato dall'ultima analisi: nessuna chiamata GPT
+                if analyzed.get(symbol) is not None and analyzed[symbol] >= latest_cot.date:
+                    logger.info(f"⏭️ {symbol}: report {latest_cot.date.date()} già analizzato, skip")
+                    continue
+
+                logger.info(f"🤖 Generazione GPT per {symbol}...")
+
+                # Prepara dati per GPT: metriche e variazioni salvate all'ingest
+                gpt_input = metrics_for(dict(latest_cot._asdict(), symbol=symbol))
+                gpt_input['date'] = latest_cot.date.isoformat()
 
                 # Genera analisi GPT
                 if gpt_analyzer.client:
@@ -2260,17 +3491,10 @@ def weekly_gpt_analysis():
                     logger.warning(f"GPT Analyzer non disponibile per {symbol} - usando fallback")
                     gpt_analysis = gpt_analyzer._create_fallback_analysis(gpt_input)
 
-                # Salva predizione con GPT
-                prediction = Prediction(
-                    symbol=symbol,
-                    prediction_date=datetime.now(),
-                    predicted_direction=gpt_analysis.get('direction', 'NEUTRAL'),
-                    confidence=gpt_analysis.get('confidence', 50),
-                    ml_score=None,
-                    gpt_analysis=json.dumps(gpt_analysis) if isinstance(gpt_analysis, dict) else gpt_analysis
-                )
-                db.session.add(prediction)
-                db.session.commit()
+                # Salva predizione con GPT (analisi identiche non vengono duplicate)
+                _, created = save_prediction_analysis(symbol, gpt_analysis, report_date=latest_cot.date)
+                if not created:
+                    continue
 
                 logger.info(f"✅ GPT salvata per {symbol}")
 
@@ -2284,6 +3508,14 @@ def weekly_gpt_analysis():
 
         logger.info("🤖 SCHEDULER: Analisi GPT settimanale completata!")
 
+def scheduled_prediction_retention():
+    """Job notturno: sposta le predizioni oltre la retention nell'archivio"""
+    with app.app_context():
+        try:
+            prune_predictions()
+        except Exception as e:
+            logger.error(f"❌ Retention predizioni fallita: {e}")
+
 # Configura scheduler
 scheduler.init_app(app)
 scheduler.start()
@@ -2299,7 +3531,17 @@ scheduler.add_job(
     timezone='Europe/Rome'
 )
 
-logger.info("✅ Scheduler configurato: GPT analysis ogni domenica 21:00")
+# Retention predizioni: ogni notte alle 03:30
+scheduler.add_job(
+    id='prune_predictions',
+    func=scheduled_prediction_retention,
+    trigger='cron',
+    hour=3,
+    minute=30,
+    timezone='Europe/Rome'
+)
+
+logger.info("✅ Scheduler configurato: GPT analysis ogni domenica 21:00, retention predizioni ogni notte 03:30")
 
 # =================== AVVIO APP ===================
 if __name__ == '__main__':
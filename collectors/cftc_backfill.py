@@ -0,0 +1,245 @@
+"""
+Backfill storico COT dai file ufficiali CFTC (Legacy Futures Only)
+Legge i file annuali scaricati in locale (deacotYYYY.zip / annual.txt oppure
+dea_fut_xls_YYYY.zip / annualof.xls), filtra i codici contratto configurati
+e inserisce le righe settimanali in transazioni a batch.
+"""
+
+import csv
+import io
+import logging
+import os
+import sys
+import zipfile
+from datetime import datetime
+
+# Aggiungi path per import del config
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+try:
+    from config import current_config as config
+except:
+    config = None
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BATCH_SIZE = 1000
+
+# Intestazioni dei file CFTC -> campo interno.
+# Il formato testo (annual.txt) e quello Excel (annualof.xls) usano nomi diversi.
+COLUMN_ALIASES = {
+    'code': [
+        'CFTC Contract Market Code',
+        'CFTC_Contract_Market_Code',
+    ],
+    'date': [
+        'As of Date in Form YYYY-MM-DD',
+        'Report_Date_as_YYYY-MM-DD',
+        'As of Date in Form YYMMDD',
+        'As_of_Date_In_Form_YYMMDD',
+        'Report_Date_as_MM_DD_YYYY',
+    ],
+    'non_commercial_long': [
+        'Noncommercial Positions-Long (All)',
+        'NonComm_Positions_Long_All',
+    ],
+    'non_commercial_short': [
+        'Noncommercial Positions-Short (All)',
+        'NonComm_Positions_Short_All',
+    ],
+    'non_commercial_spreads': [
+        'Noncommercial Positions-Spreading (All)',
+        'NonComm_Postions_Spread_All',  # refuso originale CFTC
+        'NonComm_Positions_Spread_All',
+    ],
+    'commercial_long': [
+        'Commercial Positions-Long (All)',
+        'Comm_Positions_Long_All',
+    ],
+    'commercial_short': [
+        'Commercial Positions-Short (All)',
+        'Comm_Positions_Short_All',
+    ],
+}
+
+DATE_FORMATS = ['%Y-%m-%d', '%y%m%d', '%m/%d/%Y', '%Y-%m-%d %H:%M:%S']
+
+
+def _resolve_columns(header):
+    """Mappa campo interno -> nome colonna effettivo del file"""
+    normalized = {h.strip(): h for h in header if h}
+    columns = {}
+    for field, aliases in COLUMN_ALIASES.items():
+        for alias in aliases:
+            if alias in normalized:
+                columns[field] = normalized[alias]
+                break
+    missing = [f for f in COLUMN_ALIASES if f not in columns]
+    if missing:
+        raise ValueError(f"Colonne CFTC mancanti: {', '.join(missing)}")
+    return columns
+
+
+def _parse_date(value):
+    if isinstance(value, datetime):
+        return value
+    if hasattr(value, 'to_pydatetime'):
+        return value.to_pydatetime()
+    text = str(value).strip()
+    for fmt in DATE_FORMATS:
+        try:
+            return datetime.strptime(text, fmt)
+        except ValueError:
+            continue
+    return None
+
+
+def _parse_int(value):
+    try:
+        return int(float(str(value).replace(',', '').strip() or 0))
+    except ValueError:
+        return 0
+
+
+def _normalize_code(value):
+    """I codici CFTC sono stringhe di 6 caratteri (gli xls li perdono come numeri)"""
+    code = str(value).strip()
+    if code.endswith('.0'):
+        code = code[:-2]
+    return code.zfill(6) if code.isdigit() else code
+
+
+def _iter_text_rows(stream):
+    """Righe come dict da un file CSV/TXT CFTC, in streaming"""
+    reader = csv.reader(stream)
+    header = next(reader, None)
+    if not header:
+        return
+    header = [h.strip() for h in header]
+    for values in reader:
+        yield dict(zip(header, values))
+
+
+def _iter_excel_rows(data, name):
+    """Righe da file xls/xlsx (richiede pandas + xlrd/openpyxl)"""
+    import pandas as pd
+    frame = pd.read_excel(io.BytesIO(data) if isinstance(data, bytes) else data, dtype={
+        'CFTC_Contract_Market_Code': str,
+    })
+    logger.info(f"Letto {name}: {len(frame)} righe")
+    for record in frame.to_dict('records'):
+        yield record
+
+
+def iter_raw_rows(path):
+    """Itera tutte le righe di un file CFTC: .zip, .txt/.csv, .xls/.xlsx"""
+    lower = path.lower()
+    if lower.endswith('.zip'):
+        with zipfile.ZipFile(path) as archive:
+            for member in archive.namelist():
+                member_lower = member.lower()
+                if member_lower.endswith(('.txt', '.csv')):
+                    with archive.open(member) as raw:
+                        stream = io.TextIOWrapper(raw, encoding='latin-1', newline='')
+                        yield from _iter_text_rows(stream)
+                elif member_lower.endswith(('.xls', '.xlsx')):
+                    yield from _iter_excel_rows(archive.read(member), member)
+    elif lower.endswith(('.xls', '.xlsx')):
+        yield from _iter_excel_rows(path, path)
+    else:
+        with open(path, 'r', encoding='latin-1', newline='') as stream:
+            yield from _iter_text_rows(stream)
+
+
+def iter_cot_records(paths, symbols=None):
+    """
+    Record COT normalizzati per i soli contratti configurati.
+
+    Args:
+        paths: file o cartelle con i report annuali CFTC
+        symbols: dict simbolo -> {'code': ...} (default: config.COT_SYMBOLS)
+    """
+    symbols = symbols if symbols is not None else config.COT_SYMBOLS
+    code_to_symbol = {info['code']: symbol for symbol, info in symbols.items() if info.get('code')}
+
+    for path in _expand_paths(paths):
+        logger.info(f"📂 Parsing {path}")
+        columns = None
+        for row in iter_raw_rows(path):
+            if columns is None:
+                columns = _resolve_columns(row.keys())
+
+            symbol = code_to_symbol.get(_normalize_code(row.get(columns['code'], '')))
+            if not symbol:
+                continue
+
+            report_date = _parse_date(row.get(columns['date']))
+            if report_date is None:
+                continue
+
+            record = {'symbol': symbol, 'date': report_date}
+            for field in ('non_commercial_long', 'non_commercial_short', 'non_commercial_spreads',
+                          'commercial_long', 'commercial_short'):
+                record[field] = _parse_int(row.get(columns[field], 0))
+            record['net_position'] = record['non_commercial_long'] - record['non_commercial_short']
+            yield record
+
+
+def _expand_paths(paths):
+    for path in paths:
+        if os.path.isdir(path):
+            for name in sorted(os.listdir(path)):
+                if name.lower().endswith(('.zip', '.txt', '.csv', '.xls', '.xlsx')):
+                    yield os.path.join(path, name)
+        else:
+            yield path
+
+
+def backfill(upsert_fn, paths, symbols=None, sentiment_fn=None, batch_size=DEFAULT_BATCH_SIZE):
+    """
+    Inserisce lo storico CFTC nella tabella COT a batch. Le settimane già
+    presenti (symbol, date) vengono lasciate invariate dall'upsert.
+
+    Args:
+        upsert_fn: funzione(lista di righe) -> righe scritte, un round trip per batch
+        paths: file/cartelle CFTC
+        symbols: dict simbolo -> config (default: config.COT_SYMBOLS)
+        sentiment_fn: funzione (nc_long, nc_short, c_long, c_short) -> score
+        batch_size: righe per transazione
+
+    Returns:
+        dict con statistiche (parsed, inserted, skipped, seconds)
+    """
+    start = datetime.now()
+    symbols = symbols if symbols is not None else config.COT_SYMBOLS
+
+    stats = {'parsed': 0, 'inserted': 0, 'skipped': 0}
+    batch = []
+
+    def flush():
+        if not batch:
+            return
+        written = upsert_fn(batch)
+        stats['inserted'] += written
+        stats['skipped'] += len(batch) - written
+        logger.info(f"💾 Batch salvato: {stats['inserted']} righe inserite")
+        batch.clear()
+
+    for record in iter_cot_records(paths, symbols):
+        stats['parsed'] += 1
+        if sentiment_fn:
+            record['sentiment_score'] = sentiment_fn(
+                record['non_commercial_long'], record['non_commercial_short'],
+                record['commercial_long'], record['commercial_short']
+            )
+        batch.append(record)
+        if len(batch) >= batch_size:
+            flush()
+    flush()
+
+    stats['seconds'] = round((datetime.now() - start).total_seconds(), 2)
+    logger.info(
+        f"✅ Backfill CFTC completato: {stats['inserted']} inserite, "
+        f"{stats['skipped']} già presenti, {stats['parsed']} lette in {stats['seconds']}s"
+    )
+    return stats
@@ -0,0 +1,375 @@
+"""
+Parser puro dei report COT (pagine tradingster legacy-futures)
+Funzioni senza stato su HTML grezzo (bytes o str): nessun driver, nessuna rete.
+Usa lxml se disponibile, altrimenti html.parser della libreria standard.
+
+Uso:
+    python collectors/cot_parser.py check          # verifica il corpus di fixture
+    python collectors/cot_parser.py bench -n 5000  # pagine/secondo
+"""
+
+import argparse
+import json
+import os
+import re
+import time
+from datetime import datetime
+from html.parser import HTMLParser
+
+try:
+    import lxml.html
+    LXML_AVAILABLE = True
+except ImportError:
+    LXML_AVAILABLE = False
+
+DATE_PATTERN = re.compile(r'\d{4}-\d{2}-\d{2}')
+
+# Selettori per la data del report (in ordine di preferenza)
+DATE_SELECTORS = [
+    'body > div.container > h3',
+    'h3',
+    '.date',
+    '.report-date'
+]
+
+_DATE_XPATHS = {
+    'body > div.container > h3': '/html/body/div[contains(concat(" ", normalize-space(@class), " "), " container ")]/h3',
+    'h3': '//h3',
+    '.date': '//*[contains(concat(" ", normalize-space(@class), " "), " date ")]',
+    '.report-date': '//*[contains(concat(" ", normalize-space(@class), " "), " report-date ")]',
+}
+_TABLE_XPATH = '//table[contains(concat(" ", normalize-space(@class), " "), " table-striped ")]'
+
+_VOID_TAGS = {'area', 'base', 'br', 'col', 'embed', 'hr', 'img', 'input',
+              'link', 'meta', 'source', 'track', 'wbr'}
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures', 'cot_reports')
+
+
+def _normalize_text(text):
+    return ' '.join(text.split())
+
+
+# =================== ESTRAZIONE STRUTTURA ===================
+class _ReportCollector(HTMLParser):
+    """Raccoglie righe delle tabelle .table-striped e testi candidati per la data"""
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.tables = []
+        self.date_texts = {selector: [] for selector in DATE_SELECTORS}
+        self._stack = []          # (tag, classes)
+        self._table_depth = 0     # profondità dentro una table-striped
+        self._row = None
+        self._cell = None
+        self._captures = []       # [selettori, buffer] per h3/.date/.report-date aperti
+
+    def handle_starttag(self, tag, attrs):
+        classes = set((dict(attrs).get('class') or '').split())
+
+        if tag == 'table' and 'table-striped' in classes:
+            self._table_depth += 1
+            self.tables.append([])
+        elif self._table_depth:
+            if tag == 'tr':
+                self._close_row()
+                self._row = []
+            elif tag in ('td', 'th'):
+                self._close_cell()
+                if self._row is None:
+                    self._row = []
+                self._cell = []
+
+        selectors = []
+        if tag == 'h3':
+            selectors.append('h3')
+            if len(self._stack) >= 2 and self._stack[-1][0] == 'div' and 'container' in self._stack[-1][1] \
+                    and self._stack[-2][0] == 'body':
+                selectors.append('body > div.container > h3')
+        if 'date' in classes:
+            selectors.append('.date')
+        if 'report-date' in classes:
+            selectors.append('.report-date')
+
+        if tag not in _VOID_TAGS:
+            self._stack.append((tag, classes))
+            self._captures.append((selectors, []) if selectors else None)
+
+    def handle_endtag(self, tag):
+        if self._table_depth:
+            if tag in ('td', 'th'):
+                self._close_cell()
+            elif tag == 'tr':
+                self._close_row()
+            elif tag == 'table':
+                self._close_row()
+                self._table_depth -= 1
+
+        # Chiude fino al tag corrispondente (tollera tag non chiusi)
+        if any(t == tag for t, _ in self._stack):
+            while self._stack:
+                open_tag, _ = self._stack.pop()
+                capture = self._captures.pop()
+                if capture:
+                    text = _normalize_text(''.join(capture[1]))
+                    for selector in capture[0]:
+                        self.date_texts[selector].append(text)
+                if open_tag == tag:
+                    break
+
+    def handle_data(self, data):
+        if self._cell is not None:
+            self._cell.append(data)
+        for capture in self._captures:
+            if capture:
+                capture[1].append(data)
+
+    def _close_cell(self):
+        if self._cell is not None and self._row is not None:
+            self._row.append(_normalize_text(''.join(self._cell)))
+        self._cell = None
+
+    def _close_row(self):
+        self._close_cell()
+        if self._row and self.tables:
+            self.tables[-1].append(self._row)
+        self._row = None
+
+
+def _collect_stdlib(html):
+    if isinstance(html, bytes):
+        html = html.decode('utf-8', errors='replace')
+    collector = _ReportCollector()
+    collector.feed(html)
+    collector.close()
+    return collector.tables, collector.date_texts
+
+
+def _collect_lxml(html):
+    doc = lxml.html.fromstring(html)
+    tables = []
+    for table in doc.xpath(_TABLE_XPATH):
+        rows = []
+        for row in table.xpath('.//tr'):
+            cells = [_normalize_text(cell.text_content()) for cell in row.xpath('./td|./th')]
+            if cells:
+                rows.append(cells)
+        tables.append(rows)
+    date_texts = {
+        selector: [_normalize_text(el.text_content()) for el in doc.xpath(_DATE_XPATHS[selector])]
+        for selector in DATE_SELECTORS
+    }
+    return tables, date_texts
+
+
+def collect(html, backend=None):
+    """
+    Struttura minima della pagina.
+
+    Returns:
+        (tables, date_texts): righe (liste di testi cella) di ogni table-striped
+        e testi degli elementi candidati per la data, per selettore
+    """
+    backend = backend or ('lxml' if LXML_AVAILABLE else 'stdlib')
+    if backend == 'lxml':
+        return _collect_lxml(html)
+    return _collect_stdlib(html)
+
+
+# =================== PARSING ===================
+def parse_value(text):
+    """Numero da una cella ('1,234', '-56', '12.3', '(78)'); None se non numerica"""
+    cleaned = text.replace(',', '').replace('%', '').strip()
+    if cleaned.startswith('(') and cleaned.endswith(')'):
+        cleaned = '-' + cleaned[1:-1]
+    try:
+        return float(cleaned)
+    except ValueError:
+        return None
+
+
+def section_for_label(label):
+    """Classifica un'etichetta di riga nella sezione corrispondente"""
+    text = label.lower()
+    if 'change' in text:
+        return 'changes'
+    if 'percent' in text or '%' in text:
+        return 'percent_oi'
+    if 'trader' in text:
+        return 'traders'
+    if 'position' in text or 'commitment' in text:
+        return 'positions'
+    return None
+
+
+def _positions_from_values(values, cast):
+    """Le prime 5 colonne: NC long/short/spreads, C long/short"""
+    numbers = [v if v is not None else 0 for v in values]
+    return {
+        'non_commercial_long': cast(numbers[0]),
+        'non_commercial_short': cast(numbers[1]),
+        'non_commercial_spreads': cast(numbers[2]),
+        'commercial_long': cast(numbers[3]),
+        'commercial_short': cast(numbers[4]),
+    }
+
+
+def parse_report_date(date_texts):
+    """Prima data YYYY-MM-DD trovata seguendo l'ordine dei selettori"""
+    for selector in DATE_SELECTORS:
+        for text in date_texts.get(selector, ()):
+            match = DATE_PATTERN.search(text)
+            if match:
+                return datetime.strptime(match.group(0), '%Y-%m-%d')
+    return None
+
+
+def parse_positions(tables):
+    """
+    Estrae tutte le righe delle tabelle del report:
+    posizioni, variazioni settimanali, % open interest, numero trader
+    e, se presenti, le settimane storiche (righe che iniziano con una data).
+    """
+    sections = {}
+    history = {}
+    for rows in tables:
+        section = 'positions'
+        for texts in rows:
+            # Riga storica: data + valori
+            if DATE_PATTERN.fullmatch(texts[0]):
+                values = [parse_value(t) for t in texts[1:]]
+                if len([v for v in values if v is not None]) >= 5:
+                    report_date = datetime.strptime(texts[0], '%Y-%m-%d')
+                    history[report_date] = _positions_from_values(values, int)
+                continue
+
+            # Riga dati: almeno 5 celle numeriche (eventuale etichetta in prima cella)
+            values = [parse_value(t) for t in texts]
+            label = texts[0] if values and values[0] is None else ''
+            cells = texts[1:] if label else texts
+            if label:
+                values = values[1:]
+            numeric = [v for v in values if v is not None]
+            # Celle vuote ammesse (es. trader non reportable), testo no
+            non_numeric = sum(1 for t, v in zip(cells, values) if v is None and t)
+
+            if len(numeric) >= 5 and non_numeric <= 1:
+                key = section_for_label(label) or section
+                if key not in sections:
+                    cast = float if key == 'percent_oi' else int
+                    sections[key] = _positions_from_values(values, cast)
+                continue
+
+            # Riga etichetta: definisce la sezione delle righe successive
+            key = section_for_label(' '.join(texts))
+            if key:
+                section = key
+
+    positions = sections.get('positions')
+    if not positions:
+        return None
+
+    result = dict(positions)
+    for key in ('changes', 'percent_oi', 'traders'):
+        if key in sections:
+            result[key] = sections[key]
+    result['history'] = [
+        dict(values, date=report_date) for report_date, values in sorted(history.items())
+    ]
+    return result
+
+
+def parse_report(html, backend=None):
+    """
+    Parsing completo di una pagina report.
+
+    Returns:
+        dict con 'report_date' (datetime o None) e i campi posizione,
+        oppure None se la tabella posizioni non è presente
+    """
+    tables, date_texts = collect(html, backend)
+    positions = parse_positions(tables)
+    if positions is None:
+        return None
+    positions['report_date'] = parse_report_date(date_texts)
+    return positions
+
+
+def parse_report_date_only(html, backend=None):
+    """Solo la data del report (usato dal probe di freschezza)"""
+    _, date_texts = collect(html, backend)
+    return parse_report_date(date_texts)
+
+
+# =================== FIXTURE E BENCHMARK ===================
+def _jsonable(value):
+    if isinstance(value, datetime):
+        return value.strftime('%Y-%m-%d')
+    if isinstance(value, dict):
+        return {k: _jsonable(v) for k, v in value.items()}
+    if isinstance(value, list):
+        return [_jsonable(v) for v in value]
+    return value
+
+
+def load_fixtures(directory=FIXTURES_DIR):
+    """Coppie (nome, html bytes, atteso) dal corpus di fixture"""
+    with open(os.path.join(directory, 'expected.json'), 'r', encoding='utf-8') as f:
+        expected = json.load(f)
+    fixtures = []
+    for name in sorted(expected):
+        with open(os.path.join(directory, name), 'rb') as f:
+            fixtures.append((name, f.read(), expected[name]))
+    return fixtures
+
+
+def check_fixtures(backend=None, directory=FIXTURES_DIR):
+    """Confronta il parsing di ogni fixture con il risultato atteso"""
+    failures = 0
+    for name, html, expected in load_fixtures(directory):
+        actual = _jsonable(parse_report(html, backend))
+        if actual == expected:
+            print(f"  OK   {name}")
+        else:
+            failures += 1
+            print(f"  FAIL {name}\n       atteso:  {expected}\n       ottenuto: {actual}")
+    return failures
+
+
+def run_benchmark(pages=5000, backend=None, directory=FIXTURES_DIR):
+    """Pagine parse al secondo sul corpus di fixture (ciclico)"""
+    corpus = [html for _, html, _ in load_fixtures(directory)]
+    start = time.perf_counter()
+    for i in range(pages):
+        parse_report(corpus[i % len(corpus)], backend)
+    elapsed = time.perf_counter() - start
+    return {
+        'backend': backend or ('lxml' if LXML_AVAILABLE else 'stdlib'),
+        'pages': pages,
+        'seconds': round(elapsed, 3),
+        'pages_per_second': round(pages / elapsed) if elapsed else None,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Parser COT: verifica fixture e benchmark")
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    check = sub.add_parser('check', help='verifica il corpus di fixture')
+    check.add_argument('--backend', choices=['lxml', 'stdlib'])
+
+    bench = sub.add_parser('bench', help='benchmark pagine/secondo')
+    bench.add_argument('-n', '--pages', type=int, default=5000)
+    bench.add_argument('--backend', choices=['lxml', 'stdlib'])
+
+    args = parser.parse_args()
+    if args.command == 'check':
+        failures = check_fixtures(args.backend)
+        print("Tutte le fixture OK" if not failures else f"{failures} fixture fallite")
+        raise SystemExit(1 if failures else 0)
+
+    print(json.dumps(run_benchmark(args.pages, args.backend), indent=2))
+
+
+if __name__ == '__main__':
+    main()
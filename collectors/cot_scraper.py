@@ -9,10 +9,11 @@ from selenium.webdriver.chrome.service import Service
 from selenium.webdriver.common.by import By
 from selenium.webdriver.chrome.options import Options
 from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
+from selenium.common.exceptions import TimeoutException
 from webdriver_manager.chrome import ChromeDriverManager
+import requests
+from requests.adapters import HTTPAdapter
 import time
-import re
 from datetime import datetime
 import logging
 import os
@@ -21,10 +22,17 @@ import platform
 import tempfile
 import uuid
 import random
+from urllib.parse import urlparse
+import threading
+import atexit
+from contextlib import contextmanager
 
 # Aggiungi path per import del config
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
+from analysis.cot_metrics import compute_metrics
+from collectors.cot_parser import DATE_PATTERN, DATE_SELECTORS, parse_report, parse_report_date_only
+
 # Importa config se disponibile, altrimenti usa defaults
 try:
     from config import current_config as config
@@ -33,6 +41,11 @@ except:
         SELENIUM_HEADLESS = True
         SELENIUM_WAIT_TIME = 10
         SELENIUM_TIMEOUT = 30
+        SCRAPER_MODE = 'auto'
+        SCRAPER_HTTP_TIMEOUT = 15
+        BROWSER_POOL_SIZE = 2
+        BROWSER_POOL_MAX_PAGES = 50
+        SCRAPER_HOST_MIN_INTERVAL = 0.25
         SENTIMENT_THRESHOLD_BULLISH = 20
         SENTIMENT_THRESHOLD_BEARISH = -20
         CSV_OUTPUT_FOLDER = 'data/csv_output'
@@ -70,17 +83,168 @@ logger = logging.getLogger(__name__)
 # Rileva se siamo in ambiente Docker
 IS_DOCKER = os.path.exists('/.dockerenv') or os.environ.get('DOCKER_ENV') == 'true'
 
+USER_AGENT = (
+    "Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
+    "AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36"
+)
+
+# Sessione HTTP condivisa con pool di connessioni keep-alive
+_HTTP_SESSION = requests.Session()
+_HTTP_SESSION.headers.update({
+    "User-Agent": USER_AGENT,
+    "Accept": "text/html,application/xhtml+xml",
+    "Accept-Language": "en-US,en;q=0.9",
+})
+_HTTP_SESSION.mount("https://", HTTPAdapter(pool_connections=4, pool_maxsize=16))
+_HTTP_SESSION.mount("http://", HTTPAdapter(pool_connections=4, pool_maxsize=16))
+
+
+class HostRateLimiter:
+    """
+    Cortesia verso i siti scrapati basata sul rate: garantisce un intervallo
+    minimo tra due richieste allo stesso host, senza pause fisse tra simboli.
+    Le richieste verso host diversi non si attendono a vicenda.
+    """
+    
+    def __init__(self, min_interval):
+        self.min_interval = min_interval
+        self._next_slot = {}
+        self._lock = threading.Lock()
+    
+    def wait(self, url):
+        """Blocca solo il tempo necessario per rispettare il rate dell'host"""
+        if self.min_interval <= 0:
+            return 0.0
+        host = urlparse(url).netloc
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_slot.get(host, now))
+            self._next_slot[host] = slot + self.min_interval
+        delay = slot - now
+        if delay > 0:
+            time.sleep(delay)
+        return delay
+
+
+HOST_LIMITER = HostRateLimiter(getattr(config, 'SCRAPER_HOST_MIN_INTERVAL', 0.25))
+
+# Cache HTTP per URL: validatori (ETag/Last-Modified) + ultimo contenuto e data report.
+# Permette GET condizionali (304) sia per il probe di freschezza sia per lo scraping,
+# e il riuso diretto della pagina appena scaricata dal probe (server senza validatori).
+_PAGE_CACHE = {}
+_PAGE_CACHE_LOCK = threading.Lock()
+PAGE_REUSE_SECONDS = getattr(config, 'SCRAPER_PAGE_REUSE_SECONDS', 300)
+
+
+def fetch_page(url, timeout=15, max_age=0):
+    """
+    GET condizionale della pagina.
+    
+    Args:
+        max_age: secondi entro cui il contenuto già scaricato viene riusato
+                 senza nessuna richiesta (0 = sempre almeno un GET condizionale)
+    
+    Returns:
+        (content, not_modified): contenuto HTML (dalla cache se 304 o riusato) e flag
+    """
+    with _PAGE_CACHE_LOCK:
+        cached = dict(_PAGE_CACHE.get(url, {}))
+    
+    if max_age and cached.get('content') is not None and \
+            time.monotonic() - cached.get('fetched_at', 0) <= max_age:
+        return cached['content'], True
+    
+    headers = {}
+    if cached.get('etag'):
+        headers['If-None-Match'] = cached['etag']
+    if cached.get('last_modified'):
+        headers['If-Modified-Since'] = cached['last_modified']
+    
+    HOST_LIMITER.wait(url)
+    response = _HTTP_SESSION.get(url, timeout=timeout, headers=headers)
+    
+    if response.status_code == 304 and cached.get('content') is not None:
+        with _PAGE_CACHE_LOCK:
+            if url in _PAGE_CACHE:
+                _PAGE_CACHE[url]['fetched_at'] = time.monotonic()
+        return cached['content'], True
+    if response.status_code != 200:
+        raise requests.HTTPError(f"HTTP {response.status_code} per {url}")
+    
+    with _PAGE_CACHE_LOCK:
+        _PAGE_CACHE[url] = {
+            'etag': response.headers.get('ETag'),
+            'last_modified': response.headers.get('Last-Modified'),
+            'content': response.content,
+            'report_date': None,
+            'fetched_at': time.monotonic(),
+        }
+    return response.content, False
+
+
+def probe_report_date(symbol, timeout=None):
+    """
+    Probe economico della data del report pubblicato (senza estrarre la tabella).
+    Usa il GET condizionale: se la pagina non è cambiata riusa la data già nota.
+    
+    Returns:
+        datetime della data report, oppure None se non determinabile
+    """
+    if symbol not in config.COT_SYMBOLS:
+        return None
+    url = config.COT_SYMBOLS[symbol]['url']
+    try:
+        content, not_modified = fetch_page(url, timeout or getattr(config, 'SCRAPER_HTTP_TIMEOUT', 15))
+        with _PAGE_CACHE_LOCK:
+            known = _PAGE_CACHE.get(url, {}).get('report_date')
+        if not_modified and known:
+            logger.info(f"Probe {symbol}: pagina invariata (304), report {known.date()}")
+            return known
+        
+        report_date = parse_report_date_only(content)
+        
+        if report_date:
+            with _PAGE_CACHE_LOCK:
+                if url in _PAGE_CACHE:
+                    _PAGE_CACHE[url]['report_date'] = report_date
+        return report_date
+        
+    except Exception as e:
+        logger.warning(f"Probe freschezza {symbol} fallito: {e}")
+        return None
+
+
+def _page_ready(driver):
+    """Condizione di readiness: tabella con righe dati e data report nell'header"""
+    tables = driver.find_elements(By.CSS_SELECTOR, 'table.table-striped')
+    if not tables or len(tables[0].find_elements(By.TAG_NAME, 'tr')) < 4:
+        return False
+    headers = driver.find_elements(By.CSS_SELECTOR, DATE_SELECTORS[0]) or \
+        driver.find_elements(By.TAG_NAME, 'h3')
+    return any(DATE_PATTERN.search(h.text or '') for h in headers)
+
+
 class COTScraper:
     """Classe principale per lo scraping dei dati COT - ottimizzata per Docker e locale"""
     
-    def __init__(self, headless=None):
+    def __init__(self, headless=None, mode=None, use_pool=None):
         """
         Inizializza il scraper
         
         Args:
             headless: Se True, esegue Chrome in modalità headless
+            mode: 'http' (solo fetch HTTP), 'selenium' (solo browser) o
+                  'auto' (HTTP con fallback automatico su Selenium)
+            use_pool: Se True usa i browser caldi del BrowserPool condiviso
+                      invece di avviare un Chrome dedicato (default: attivo
+                      se BROWSER_POOL_SIZE > 0)
         """
+        if use_pool is None:
+            use_pool = getattr(config, 'BROWSER_POOL_SIZE', 0) > 0
+        self.use_pool = use_pool
         self.headless = headless if headless is not None else config.SELENIUM_HEADLESS
+        self.mode = (mode or getattr(config, 'SCRAPER_MODE', 'auto')).lower()
+        self.http_timeout = getattr(config, 'SCRAPER_HTTP_TIMEOUT', 15)
         self.driver = None
         self.wait_time = config.SELENIUM_WAIT_TIME
         self.timeout = config.SELENIUM_TIMEOUT
@@ -238,9 +402,9 @@ class COTScraper:
                 self._cleanup_temp_dir()  # Pulisci in caso di errore
                 raise Exception(error_msg)
             
-            # Configura timeout
+            # Configura timeout (nessun implicit wait: la readiness è esplicita)
             self.driver.set_page_load_timeout(self.timeout)
-            self.driver.implicitly_wait(10)
+            self.driver.implicitly_wait(0)
             
             logger.info("Chrome driver pronto!")
             return True
@@ -252,7 +416,9 @@ class COTScraper:
     
     def scrape_cot_data(self, symbol):
         """
-        Scrape dei dati COT per un simbolo specifico
+        Scrape dei dati COT per un simbolo specifico.
+        In modalità 'auto' prova prima il fetch HTTP (pagina statica) e usa
+        Selenium solo se l'estrazione HTTP fallisce.
         
         Args:
             symbol: Simbolo da analizzare (es. 'GOLD', 'USD')
@@ -264,171 +430,112 @@ class COTScraper:
             logger.error(f"Simbolo {symbol} non trovato nella configurazione")
             return None
         
+        start = time.perf_counter()
+        method = 'http'
+        data = None
+        if self.mode in ('http', 'auto'):
+            data = self._scrape_via_http(symbol)
+            if not data and self.mode == 'auto':
+                logger.info(f"Estrazione HTTP fallita per {symbol}, fallback su Selenium")
+        
+        if not data and self.mode != 'http':
+            method = 'selenium'
+            data = self._scrape_via_browser(symbol)
+        
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        logger.info(f"⏱️ Scrape {symbol} [{method}] {'ok' if data else 'fallito'} in {elapsed_ms:.0f}ms")
+        return data
+    
+    def _scrape_via_http(self, symbol):
+        """Scraping tramite semplice GET HTTP + parsing HTML (nessun browser)"""
+        url = config.COT_SYMBOLS[symbol]['url']
         try:
-            # Setup driver se necessario
-            if not self.driver:
-                if not self.setup_driver():
-                    return None
-            
-            # Ottieni URL per il simbolo
-            url = config.COT_SYMBOLS[symbol]['url']
-            logger.info(f"Scraping {symbol} da: {url}")
-            
-            # Naviga alla pagina
-            self.driver.get(url)
-            
-            # Attendi caricamento tabella
-            try:
-                WebDriverWait(self.driver, self.timeout).until(
-                    EC.presence_of_element_located((By.CLASS_NAME, 'table-striped'))
-                )
-            except:
-                logger.warning("Timeout attesa tabella, procedo comunque...")
-            
-            time.sleep(self.wait_time)
-            
-            # Estrai data del report
-            report_date = self._extract_report_date()
-            
-            # Estrai dati dalla tabella
-            positions_data = self._extract_positions_data()
-            
-            if not positions_data:
-                logger.error(f"Impossibile estrarre dati per {symbol}")
+            # Riusa la pagina appena scaricata dal probe di freschezza: un solo download
+            content, _ = fetch_page(url, self.http_timeout, max_age=PAGE_REUSE_SECONDS)
+            report = parse_report(content)
+            if not report:
+                logger.warning(f"Tabella posizioni non trovata nell'HTML di {symbol}")
                 return None
             
-            # Aggiungi metadati
-            positions_data['symbol'] = symbol
-            positions_data['date'] = report_date
-            positions_data['name'] = config.COT_SYMBOLS[symbol]['name']
-            positions_data['category'] = config.COT_SYMBOLS[symbol].get('category', 'unknown')
-            
-            # Calcola net position
-            positions_data['net_position'] = (
-                positions_data['non_commercial_long'] - 
-                positions_data['non_commercial_short']
-            )
-            
-            # Calcola sentiment score
-            total_long = positions_data['non_commercial_long'] + positions_data['commercial_long']
-            total_short = positions_data['non_commercial_short'] + positions_data['commercial_short']
-            
-            if (total_long + total_short) > 0:
-                positions_data['sentiment_score'] = (
-                    (total_long - total_short) / (total_long + total_short) * 100
-                )
-            else:
-                positions_data['sentiment_score'] = 0
-            
-            # Calcola ratios (con protezione divisione per zero)
-            positions_data['nc_long_ratio'] = (
-                positions_data['non_commercial_long'] / 
-                max(positions_data['non_commercial_short'], 1)
-            )
-            
-            positions_data['c_long_ratio'] = (
-                positions_data['commercial_long'] / 
-                max(positions_data['commercial_short'], 1)
-            )
-            
-            # Determina direzione sentiment
-            if positions_data['sentiment_score'] > config.SENTIMENT_THRESHOLD_BULLISH:
-                positions_data['sentiment_direction'] = 'BULLISH'
-            elif positions_data['sentiment_score'] < config.SENTIMENT_THRESHOLD_BEARISH:
-                positions_data['sentiment_direction'] = 'BEARISH'
-            else:
-                positions_data['sentiment_direction'] = 'NEUTRAL'
-            
-            logger.info(f"Dati estratti per {symbol}")
-            logger.info(f"  Net Position: {positions_data['net_position']:,}")
-            logger.info(f"  Sentiment: {positions_data['sentiment_direction']} ({positions_data['sentiment_score']:.2f}%)")
-            
-            return positions_data
+            return self._build_result(symbol, report.pop('report_date'), report)
             
         except Exception as e:
-            logger.error(f"Errore durante scraping {symbol}: {str(e)}")
+            logger.warning(f"Errore scraping HTTP {symbol}: {str(e)}")
             return None
     
-    def _extract_report_date(self):
-        """Estrae la data del report dalla pagina"""
+    def _scrape_via_browser(self, symbol):
+        """Scraping tramite Chrome/Selenium (fallback per pagine non statiche)"""
         try:
-            # Prova diversi selettori
-            selectors = [
-                'body > div.container > h3',
-                'h3',
-                '.date',
-                '.report-date'
-            ]
+            # Browser condiviso dal pool: nessun cold start di Chrome per simbolo
+            if self.use_pool:
+                with get_browser_pool().lease() as browser:
+                    return browser._scrape_page(symbol)
             
-            date_text = None
-            for selector in selectors:
-                try:
-                    element = self.driver.find_element(By.CSS_SELECTOR, selector)
-                    date_text = element.text.strip()
-                    if date_text:
-                        break
-                except:
-                    continue
+            # Setup driver se necessario
+            if not self.driver:
+                if not self.setup_driver():
+                    return None
             
-            if date_text:
-                # Cerca data in formato YYYY-MM-DD
-                match = re.search(r'\d{4}-\d{2}-\d{2}', date_text)
-                if match:
-                    date_str = match.group(0)
-                    return datetime.strptime(date_str, '%Y-%m-%d')
+            return self._scrape_page(symbol)
             
-            logger.warning("Data report non trovata, uso data corrente")
-            return datetime.now()
-                
         except Exception as e:
-            logger.warning(f"Errore estrazione data: {str(e)}")
-            return datetime.now()
+            logger.error(f"Errore durante scraping {symbol}: {str(e)}")
+            return None
     
-    def _extract_positions_data(self):
-        """Estrae i dati delle posizioni dalla tabella"""
+    def _scrape_page(self, symbol):
+        """Carica la pagina del simbolo nel driver corrente ed estrae i dati.
+        Le eccezioni del browser vengono propagate (il pool ricicla la sessione)."""
+        # Ottieni URL per il simbolo
+        url = config.COT_SYMBOLS[symbol]['url']
+        logger.info(f"Scraping {symbol} da: {url}")
+        
+        # Naviga alla pagina
+        HOST_LIMITER.wait(url)
+        self.driver.get(url)
+        
+        # Attendi che la pagina sia pronta: righe dati in tabella + data nell'header
         try:
-            # Trova la tabella
-            table = self.driver.find_element(By.CLASS_NAME, 'table-striped')
-            rows = table.find_elements(By.TAG_NAME, 'tr')
-            
-            if len(rows) < 4:
-                logger.error("Tabella non ha abbastanza righe")
-                return None
-            
-            # Prova diverse righe (alcuni report hanno strutture diverse)
-            for row_index in [3, 2, 4, 1]:
-                if row_index < len(rows):
-                    cells = rows[row_index].find_elements(By.TAG_NAME, 'td')
-                    if len(cells) >= 5:
-                        break
-            
-            if len(cells) < 5:
-                logger.error("Non trovo abbastanza celle nella tabella")
-                return None
-            
-            # Estrai valori
-            positions = {
-                'non_commercial_long': self._clean_number(cells[0].text),
-                'non_commercial_short': self._clean_number(cells[1].text),
-                'non_commercial_spreads': self._clean_number(cells[2].text) if len(cells) > 2 else 0,
-                'commercial_long': self._clean_number(cells[3].text) if len(cells) > 3 else 0,
-                'commercial_short': self._clean_number(cells[4].text) if len(cells) > 4 else 0,
-            }
-            
-            return positions
-            
-        except Exception as e:
-            logger.error(f"Errore estrazione dati: {str(e)}")
+            WebDriverWait(self.driver, self.wait_time, poll_frequency=0.2).until(_page_ready)
+        except TimeoutException:
+            logger.warning("Timeout attesa tabella, procedo comunque...")
+        
+        # Parsing dell'HTML renderizzato con lo stesso parser del percorso HTTP
+        report = parse_report(self.driver.page_source)
+        
+        if not report:
+            logger.error(f"Impossibile estrarre dati per {symbol}")
             return None
+        
+        return self._build_result(symbol, report.pop('report_date'), report)
     
-    def _clean_number(self, text):
-        """Pulisce e converte stringhe numeriche in interi"""
-        try:
-            # Rimuovi tutto tranne numeri e segno meno
-            cleaned = re.sub(r'[^\d\-]', '', str(text))
-            return int(cleaned) if cleaned and cleaned != '-' else 0
-        except:
-            return 0
+    def _build_result(self, symbol, report_date, positions_data):
+        """Aggiunge metadati e metriche derivate ai dati estratti"""
+        if report_date is None:
+            logger.warning("Data report non trovata, uso data corrente")
+            report_date = datetime.now()
+        
+        # Aggiungi metadati
+        positions_data['symbol'] = symbol
+        positions_data['date'] = report_date
+        positions_data['name'] = config.COT_SYMBOLS[symbol]['name']
+        positions_data['category'] = config.COT_SYMBOLS[symbol].get('category', 'unknown')
+        
+        # Net position, sentiment, OI e ratios: stesse formule usate all'ingest
+        positions_data.update(compute_metrics(positions_data))
+        
+        # Determina direzione sentiment
+        if positions_data['sentiment_score'] > config.SENTIMENT_THRESHOLD_BULLISH:
+            positions_data['sentiment_direction'] = 'BULLISH'
+        elif positions_data['sentiment_score'] < config.SENTIMENT_THRESHOLD_BEARISH:
+            positions_data['sentiment_direction'] = 'BEARISH'
+        else:
+            positions_data['sentiment_direction'] = 'NEUTRAL'
+        
+        logger.info(f"Dati estratti per {symbol}")
+        logger.info(f"  Net Position: {positions_data['net_position']:,}")
+        logger.info(f"  Sentiment: {positions_data['sentiment_direction']} ({positions_data['sentiment_score']:.2f}%)")
+        
+        return positions_data
     
     def _cleanup_temp_dir(self):
         """Pulisce la directory temporanea - NUOVO METODO"""
@@ -462,6 +569,132 @@ class COTScraper:
         self.close()
 
 
+class BrowserPool:
+    """
+    Pool di sessioni Chrome già avviate, prestate ai job di scraping.
+    
+    Ogni sessione viene riciclata dopo max_pages pagine o al primo errore
+    del browser, così il costo di avvio di Chrome non si paga per ogni simbolo.
+    """
+    
+    def __init__(self, size=2, max_pages=50, headless=True, acquire_timeout=120):
+        self.size = max(1, size)
+        self.max_pages = max(1, max_pages)
+        self.headless = headless
+        self.acquire_timeout = acquire_timeout
+        self._idle = []          # sessioni libere (COTScraper con driver attivo)
+        self._pages = {}         # id(sessione) -> pagine servite
+        self._created = 0        # sessioni vive (libere + in prestito)
+        self._cond = threading.Condition()
+        self._closed = False
+    
+    def _new_session(self):
+        session = COTScraper(headless=self.headless, mode='selenium', use_pool=False)
+        if not session.setup_driver():
+            raise RuntimeError("Impossibile avviare Chrome per il pool")
+        self._pages[id(session)] = 0
+        return session
+    
+    def _discard(self, session):
+        self._pages.pop(id(session), None)
+        try:
+            session.close()
+        except Exception as e:
+            logger.warning(f"Errore chiusura sessione pool: {e}")
+    
+    def _acquire(self):
+        deadline = time.monotonic() + self.acquire_timeout
+        with self._cond:
+            while True:
+                if self._closed:
+                    raise RuntimeError("BrowserPool chiuso")
+                if self._idle:
+                    return self._idle.pop()
+                if self._created < self.size:
+                    self._created += 1
+                    break
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise TimeoutError("Nessun browser libero nel pool")
+                self._cond.wait(remaining)
+        
+        # Avvio di Chrome fuori dal lock
+        try:
+            session = self._new_session()
+            logger.info(f"Nuova sessione browser nel pool ({self._created}/{self.size})")
+            return session
+        except Exception:
+            with self._cond:
+                self._created -= 1
+                self._cond.notify()
+            raise
+    
+    def _release(self, session, failed):
+        pages = self._pages.get(id(session), 0) + 1
+        recycle = failed or pages >= self.max_pages or self._closed
+        if recycle:
+            reason = "errore" if failed else f"{pages} pagine"
+            logger.info(f"Riciclo sessione browser ({reason})")
+            self._discard(session)
+        with self._cond:
+            if recycle:
+                self._created -= 1
+            else:
+                self._pages[id(session)] = pages
+                self._idle.append(session)
+            self._cond.notify()
+    
+    @contextmanager
+    def lease(self):
+        """Presta una sessione browser; in caso di eccezione viene riciclata"""
+        session = self._acquire()
+        failed = False
+        try:
+            yield session
+        except Exception:
+            failed = True
+            raise
+        finally:
+            self._release(session, failed)
+    
+    def close(self):
+        """Chiude tutte le sessioni libere (quelle in prestito al rilascio)"""
+        with self._cond:
+            self._closed = True
+            idle, self._idle = self._idle, []
+            self._created -= len(idle)
+            self._cond.notify_all()
+        for session in idle:
+            self._discard(session)
+    
+    def get_status(self):
+        with self._cond:
+            return {
+                'size': self.size,
+                'alive': self._created,
+                'idle': len(self._idle),
+                'max_pages': self.max_pages,
+            }
+
+
+_BROWSER_POOL = None
+_BROWSER_POOL_LOCK = threading.Lock()
+
+
+def get_browser_pool():
+    """Pool di browser condiviso dal processo (creato al primo uso)"""
+    global _BROWSER_POOL
+    with _BROWSER_POOL_LOCK:
+        if _BROWSER_POOL is None:
+            _BROWSER_POOL = BrowserPool(
+                size=getattr(config, 'BROWSER_POOL_SIZE', 2),
+                max_pages=getattr(config, 'BROWSER_POOL_MAX_PAGES', 50),
+                headless=config.SELENIUM_HEADLESS,
+            )
+            atexit.register(_BROWSER_POOL.close)
+        return _BROWSER_POOL
+
+
 # Funzione helper per compatibilità
 def test_scraper():
     """Test rapido del scraper"""
@@ -13,7 +13,8 @@ from email.mime.multipart import MIMEMultipart
 # Setup path per imports
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from config import current_config as config
-from collectors.cot_scraper import COTScraper
+from collectors.cot_scraper import probe_report_date
+from collectors.scrape_executor import ScrapeExecutor
 from analysis.gpt_analyzer import GPTAnalyzer
 from analysis.predictions import COTPredictionSystem
 
@@ -33,7 +34,6 @@ class COTScheduler:
         """
         self.scheduler = BackgroundScheduler(timezone=config.SCHEDULER_TIMEZONE)
         self.db = db
-        self.scraper = None
         self.analyzer = GPTAnalyzer() if config.OPENAI_API_KEY else None
         self.predictor = COTPredictionSystem()
         self.last_update = None
@@ -120,16 +120,18 @@ class COTScheduler:
         }
         
         try:
-            # Inizializza scraper
-            self.scraper = COTScraper()
-            
-            # Scraping per tutti i simboli
-            for symbol in config.COT_SYMBOLS.keys():
+            # 1. Scraping parallelo dei soli simboli con un nuovo report
+            symbols = [s for s in config.COT_SYMBOLS.keys() if not self._report_unchanged(s)]
+            results['unchanged'] = [s for s in config.COT_SYMBOLS.keys() if s not in symbols]
+            batch = ScrapeExecutor().run(symbols)
+            results['scrape'] = batch.as_dict()
+            
+            for scrape_result in batch.results:
+                symbol = scrape_result.symbol
                 try:
                     logger.info(f"\n📊 Processing {symbol}...")
                     
-                    # 1. Scraping dati
-                    cot_data = self.scraper.scrape_cot_data(symbol)
+                    cot_data = scrape_result.data
                     
                     if cot_data:
                         # 2. Salva nel database se disponibile
@@ -159,14 +161,6 @@ class COTScheduler:
                 except Exception as e:
                     logger.error(f"Errore processing {symbol}: {str(e)}")
                     results['failed'].append(symbol)
-                
-                # Pausa tra richieste
-                import time
-                time.sleep(5)
-            
-            # Chiudi scraper
-            if self.scraper:
-                self.scraper.close()
             
             # Genera report
             self._generate_update_report(results)
@@ -183,9 +177,6 @@ class COTScheduler:
             
         except Exception as e:
             logger.error(f"Errore durante aggiornamento schedulato: {str(e)}")
-        finally:
-            if self.scraper:
-                self.scraper.close()
     
     def daily_analysis(self):
         """Analisi giornaliera dei dati esistenti"""
@@ -275,27 +266,38 @@ class COTScheduler:
         except Exception as e:
             logger.error(f"Errore pulizia file: {str(e)}")
     
+    def _report_unchanged(self, symbol):
+        """True se il report pubblicato non è più recente dell'ultimo salvato"""
+        if not self.db:
+            return False
+        
+        try:
+            from app_complete import COTData
+            
+            published = probe_report_date(symbol)
+            if not published:
+                return False
+            latest = self.db.session.query(self.db.func.max(COTData.date))\
+                .filter(COTData.symbol == symbol).scalar()
+            return bool(latest and published.date() <= latest.date())
+        except Exception as e:
+            logger.warning(f"Probe freschezza {symbol} fallito: {e}")
+            return False
+    
     def _save_to_database(self, cot_data):
         """Salva dati nel database"""
         if not self.db:
             return
         
         try:
-            from app_complete import COTData
+            from app_complete import upsert_cot_rows, save_cot_history
             
-            # Controlla se esiste già
-            existing = self.db.session.query(COTData).filter_by(
-                symbol=cot_data['symbol'],
-                date=cot_data['date']
-            ).first()
-            
-            if not existing:
-                entry = COTData(**cot_data)
-                self.db.session.add(entry)
-                self.db.session.commit()
-                logger.info(f"✓ Salvato nel database: {cot_data['symbol']}")
-            else:
-                logger.info(f"- {cot_data['symbol']} già presente nel database")
+            # Upsert nativo su (symbol, date): un solo round trip
+            upsert_cot_rows([cot_data])
+            logger.info(f"✓ Salvato nel database: {cot_data['symbol']}")
+            
+            # Settimane storiche presenti nella stessa pagina
+            save_cot_history(cot_data['symbol'], cot_data.get('history'))
                 
         except Exception as e:
             logger.error(f"Errore salvataggio database: {str(e)}")
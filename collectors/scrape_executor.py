@@ -0,0 +1,152 @@
+"""
+Esecutore parallelo per lo scraping COT multi-simbolo
+Concorrenza limitata (worker globali + tetto per host), retry per simbolo
+e risultato strutturato con i tempi di ogni simbolo.
+"""
+
+import logging
+import os
+import sys
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Callable, Dict, List, Optional
+from urllib.parse import urlparse
+
+# Aggiungi path per import del config
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from collectors.cot_scraper import COTScraper, config
+
+logger = logging.getLogger(__name__)
+
+
+# Lock per simbolo (rientrante): simboli diversi procedono in parallelo,
+# lo stesso simbolo non viene scrapato due volte in contemporanea
+_SYMBOL_LOCKS: Dict[str, threading.RLock] = defaultdict(threading.RLock)
+_SYMBOL_LOCKS_GUARD = threading.Lock()
+
+
+def symbol_lock(symbol: str) -> threading.RLock:
+    with _SYMBOL_LOCKS_GUARD:
+        return _SYMBOL_LOCKS[symbol]
+
+
+@dataclass
+class SymbolScrapeResult:
+    symbol: str
+    ok: bool
+    data: Optional[dict] = None
+    attempts: int = 0
+    elapsed_ms: int = 0
+    error: Optional[str] = None
+
+    def as_dict(self) -> dict:
+        return {
+            'symbol': self.symbol,
+            'ok': self.ok,
+            'attempts': self.attempts,
+            'elapsed_ms': self.elapsed_ms,
+            'error': self.error,
+        }
+
+
+@dataclass
+class ScrapeBatchResult:
+    started_at: datetime
+    elapsed_ms: int = 0
+    results: List[SymbolScrapeResult] = field(default_factory=list)
+
+    @property
+    def succeeded(self) -> List[SymbolScrapeResult]:
+        return [r for r in self.results if r.ok]
+
+    @property
+    def failed(self) -> List[SymbolScrapeResult]:
+        return [r for r in self.results if not r.ok]
+
+    def as_dict(self) -> dict:
+        return {
+            'started_at': self.started_at.isoformat(),
+            'elapsed_ms': self.elapsed_ms,
+            'success': [r.symbol for r in self.succeeded],
+            'failed': [r.symbol for r in self.failed],
+            'symbols': [r.as_dict() for r in self.results],
+        }
+
+
+class ScrapeExecutor:
+    """
+    Scraping parallelo di più simboli.
+
+    Args:
+        workers: thread di scraping concorrenti
+        per_host: richieste contemporanee massime verso lo stesso host
+        retries: tentativi aggiuntivi per simbolo in caso di fallimento
+        retry_backoff: attesa base (secondi) tra i tentativi, raddoppia a ogni retry
+        scrape_fn: funzione symbol -> dict|None (default: COTScraper.scrape_cot_data)
+    """
+
+    def __init__(self, workers: int = None, per_host: int = None, retries: int = None,
+                 retry_backoff: float = 2.0, scrape_fn: Callable[[str], Optional[dict]] = None):
+        self.workers = max(1, workers or getattr(config, 'SCRAPE_WORKERS', 4))
+        self.per_host = max(1, per_host or getattr(config, 'SCRAPE_PER_HOST_CONCURRENCY', 4))
+        self.retries = retries if retries is not None else getattr(config, 'SCRAPE_RETRIES', 1)
+        self.retry_backoff = retry_backoff
+        self._scrape_fn = scrape_fn or self._default_scrape
+        self._host_slots: Dict[str, threading.BoundedSemaphore] = {}
+        self._host_guard = threading.Lock()
+
+    @staticmethod
+    def _default_scrape(symbol: str) -> Optional[dict]:
+        with COTScraper(headless=True) as scraper:
+            return scraper.scrape_cot_data(symbol)
+
+    def _host_slot(self, symbol: str) -> threading.BoundedSemaphore:
+        host = urlparse(config.COT_SYMBOLS.get(symbol, {}).get('url', '')).netloc
+        with self._host_guard:
+            if host not in self._host_slots:
+                self._host_slots[host] = threading.BoundedSemaphore(self.per_host)
+            return self._host_slots[host]
+
+    def _scrape_one(self, symbol: str) -> SymbolScrapeResult:
+        result = SymbolScrapeResult(symbol=symbol, ok=False)
+        start = time.perf_counter()
+        with symbol_lock(symbol):
+            for attempt in range(self.retries + 1):
+                result.attempts = attempt + 1
+                try:
+                    with self._host_slot(symbol):
+                        data = self._scrape_fn(symbol)
+                    if data:
+                        result.ok = True
+                        result.data = data
+                        result.error = None
+                        break
+                    result.error = 'Nessun dato estratto'
+                except Exception as e:
+                    result.error = str(e)
+                    logger.warning(f"Tentativo {attempt + 1} fallito per {symbol}: {e}")
+                if attempt < self.retries:
+                    time.sleep(self.retry_backoff * (2 ** attempt))
+        result.elapsed_ms = round((time.perf_counter() - start) * 1000)
+        return result
+
+    def run(self, symbols: List[str]) -> ScrapeBatchResult:
+        """Scrapa tutti i simboli in parallelo e ritorna i risultati nell'ordine richiesto"""
+        batch = ScrapeBatchResult(started_at=datetime.now())
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=min(self.workers, max(1, len(symbols))),
+                                thread_name_prefix='cot-scrape') as pool:
+            batch.results = list(pool.map(self._scrape_one, symbols))
+        batch.elapsed_ms = round((time.perf_counter() - start) * 1000)
+
+        slowest = max((r.elapsed_ms for r in batch.results), default=0)
+        logger.info(
+            f"⏱️ Scraping {len(symbols)} simboli: {len(batch.succeeded)} ok, "
+            f"{len(batch.failed)} falliti in {batch.elapsed_ms}ms (simbolo più lento {slowest}ms)"
+        )
+        return batch
@@ -35,7 +35,25 @@ class Config:
     # === SELENIUM CONFIGURATION ===
     SELENIUM_HEADLESS = True  # False per vedere il browser durante lo scraping
     SELENIUM_TIMEOUT = 30  # Timeout in secondi
-    SELENIUM_WAIT_TIME = 10  # Tempo di attesa caricamento pagina
+    SELENIUM_WAIT_TIME = 10  # Attesa massima readiness pagina (tabella + data)
+    SCRAPER_HOST_MIN_INTERVAL = float(os.environ.get('SCRAPER_HOST_MIN_INTERVAL', '0.25'))  # Secondi tra richieste allo stesso host
+    
+    # === SCRAPING PARALLELO ===
+    SCRAPE_WORKERS = int(os.environ.get('SCRAPE_WORKERS', '4'))  # Simboli in parallelo
+    SCRAPE_PER_HOST_CONCURRENCY = int(os.environ.get('SCRAPE_PER_HOST_CONCURRENCY', '4'))  # Richieste contemporanee per host
+    SCRAPE_RETRIES = 1  # Tentativi aggiuntivi per simbolo
+    
+    # === SCRAPER MODE ===
+    # 'auto' = fetch HTTP + parsing HTML, Selenium solo come fallback automatico
+    # 'http' = solo HTTP, 'selenium' = solo browser
+    SCRAPER_MODE = os.environ.get('SCRAPER_MODE', 'auto')
+    SCRAPER_HTTP_TIMEOUT = 15  # Timeout richieste HTTP in secondi
+    SCRAPER_PAGE_REUSE_SECONDS = 300  # Pagina scaricata dal probe riusata dallo scraping entro questa finestra
+    
+    # === BROWSER POOL ===
+    # Sessioni Chrome tenute calde e riusate tra i simboli (0 = disattivato)
+    BROWSER_POOL_SIZE = int(os.environ.get('BROWSER_POOL_SIZE', '2'))
+    BROWSER_POOL_MAX_PAGES = 50  # Pagine per sessione prima del riciclo
     
     # === COT SYMBOLS CONFIGURATION ===
     COT_SYMBOLS = {
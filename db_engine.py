@@ -0,0 +1,118 @@
+# db_engine.py
+"""
+Opzioni engine SQLAlchemy per dialetto
+- PostgreSQL: statement timeout e pool dimensionato su thread web + job in background
+- SQLite: WAL, synchronous=NORMAL, mmap, cache e busy_timeout a ogni connessione,
+  così le letture proseguono mentre l'ingest scrive
+"""
+
+import logging
+import os
+import sqlite3
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine, make_url
+from sqlalchemy.pool import QueuePool, StaticPool
+
+logger = logging.getLogger("db_engine")
+
+# Concorrenza per processo (allineata a gunicorn --workers / --threads)
+WEB_WORKERS = int(os.getenv("WEB_CONCURRENCY", "2"))
+WEB_THREADS = int(os.getenv("GUNICORN_THREADS", "4"))
+DB_BACKGROUND_CONNECTIONS = int(os.getenv("DB_BACKGROUND_CONNECTIONS", "3"))  # Job scraping + scheduler
+DB_MAX_CONNECTIONS = int(os.getenv("DB_MAX_CONNECTIONS", "0"))  # Budget connessioni del server (0 = nessun tetto)
+
+# PostgreSQL
+PG_STATEMENT_TIMEOUT_MS = int(os.getenv("PG_STATEMENT_TIMEOUT_MS", "30000"))
+PG_CONNECT_TIMEOUT = int(os.getenv("PG_CONNECT_TIMEOUT", "10"))
+
+# SQLite
+SQLITE_BUSY_TIMEOUT_MS = int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000"))
+SQLITE_CACHE_SIZE_KB = int(os.getenv("SQLITE_CACHE_SIZE_KB", "65536"))           # 64 MB di page cache
+SQLITE_MMAP_SIZE = int(os.getenv("SQLITE_MMAP_SIZE", str(256 * 1024 * 1024)))   # 256 MB memory-mapped I/O
+
+
+def pool_sizing():
+    """
+    (pool_size, max_overflow) per processo: un thread web o un job in
+    background tiene al più una connessione. Con DB_MAX_CONNECTIONS il totale
+    dei worker resta dentro il budget del server.
+    """
+    pool_size = WEB_THREADS + DB_BACKGROUND_CONNECTIONS
+    max_overflow = max(pool_size // 2, 2)
+    if DB_MAX_CONNECTIONS > 0:
+        per_process = max(DB_MAX_CONNECTIONS // max(WEB_WORKERS, 1), 2)
+        pool_size = min(pool_size, per_process)
+        max_overflow = max(per_process - pool_size, 0)
+    return pool_size, max_overflow
+
+
+def engine_options(url):
+    """SQLALCHEMY_ENGINE_OPTIONS adatte al dialetto dell'URL"""
+    backend = make_url(url).get_backend_name()
+
+    if backend == 'sqlite':
+        database = make_url(url).database
+        if not database or database == ':memory:':
+            # Database in memoria: una sola connessione condivisa tra i thread
+            return {
+                'poolclass': StaticPool,
+                'connect_args': {'check_same_thread': False},
+            }
+        pool_size, max_overflow = pool_sizing()
+        return {
+            'poolclass': QueuePool,
+            'pool_size': pool_size,
+            'max_overflow': max_overflow,
+            'pool_timeout': 30,
+            'connect_args': {
+                'check_same_thread': False,                  # Connessioni condivise dal pool tra thread
+                'timeout': SQLITE_BUSY_TIMEOUT_MS / 1000,    # Attesa lock del driver
+            },
+        }
+
+    pool_size, max_overflow = pool_sizing()
+    options = {
+        'poolclass': QueuePool,
+        'pool_size': pool_size,        # Connessioni base nel pool
+        'max_overflow': max_overflow,  # Connessioni extra nei picchi
+        'pool_timeout': 30,            # Timeout acquisizione connessione
+        'pool_recycle': 3600,          # Ricicla connessioni dopo 1h
+        'pool_pre_ping': True,         # Verifica connessione prima dell'uso
+    }
+    if backend == 'postgresql':
+        options['connect_args'] = {
+            'connect_timeout': PG_CONNECT_TIMEOUT,
+            'options': f'-c statement_timeout={PG_STATEMENT_TIMEOUT_MS}',
+        }
+    return options
+
+
+@event.listens_for(Engine, 'connect')
+def _sqlite_pragmas(dbapi_connection, connection_record):
+    """Pragma applicati a ogni nuova connessione SQLite"""
+    if not isinstance(dbapi_connection, sqlite3.Connection):
+        return
+    cursor = dbapi_connection.cursor()
+    try:
+        cursor.execute('PRAGMA journal_mode=WAL')  # Letture concorrenti durante le scritture
+        cursor.execute('PRAGMA synchronous=NORMAL')  # Sicuro con WAL, meno fsync
+        cursor.execute(f'PRAGMA busy_timeout={SQLITE_BUSY_TIMEOUT_MS}')
+        cursor.execute(f'PRAGMA cache_size=-{SQLITE_CACHE_SIZE_KB}')
+        cursor.execute(f'PRAGMA mmap_size={SQLITE_MMAP_SIZE}')
+        cursor.execute('PRAGMA temp_store=MEMORY')
+    finally:
+        cursor.close()
+
+
+def describe(url):
+    """Riepilogo configurazione per log/status (senza credenziali)"""
+    parsed = make_url(url)
+    pool_size, max_overflow = pool_sizing()
+    return {
+        'dialect': parsed.get_backend_name(),
+        'pool_size': pool_size,
+        'max_overflow': max_overflow,
+        'statement_timeout_ms': PG_STATEMENT_TIMEOUT_MS if parsed.get_backend_name() == 'postgresql' else None,
+        'journal_mode': 'wal' if parsed.get_backend_name() == 'sqlite' else None,
+    }
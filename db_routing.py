@@ -0,0 +1,164 @@
+# db_routing.py
+"""
+Routing letture verso repliche read-only (opzionale)
+Con DATABASE_REPLICA_URL configurato, gli endpoint marcati con @read_replica
+eseguono le SELECT su una replica; scritture, richieste che hanno già scritto
+e utenti che hanno scritto da poco (read-your-writes) restano sul primario.
+Una replica con lag oltre REPLICA_MAX_LAG_SECONDS viene esclusa finché non
+rientra nella soglia.
+"""
+
+import logging
+import os
+import random
+import threading
+import time
+from functools import wraps
+
+from flask import g, has_request_context, session
+from flask_sqlalchemy.session import Session
+from sqlalchemy import event, text
+from sqlalchemy.sql import Select
+
+from db_engine import engine_options
+
+logger = logging.getLogger("db_routing")
+
+REPLICA_URLS = [u.strip() for u in os.getenv("DATABASE_REPLICA_URL", "").split(",") if u.strip()]
+REPLICA_MAX_LAG_SECONDS = float(os.getenv("REPLICA_MAX_LAG_SECONDS", "30"))   # Staleness guard
+REPLICA_LAG_CHECK_SECONDS = float(os.getenv("REPLICA_LAG_CHECK_SECONDS", "10"))  # Cache del controllo lag
+READ_YOUR_WRITES_SECONDS = float(os.getenv("READ_YOUR_WRITES_SECONDS", "10"))   # Primario dopo una scrittura
+
+REPLICA_BIND_PREFIX = 'replica_'
+
+# Lag in secondi (0 se la replica ha applicato tutto il WAL ricevuto)
+_PG_LAG_SQL = text(
+    "SELECT CASE WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0 "
+    "ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0) END"
+)
+
+
+def _normalize_url(url):
+    if url.startswith('postgres://'):
+        return url.replace('postgres://', 'postgresql://', 1)
+    return url
+
+
+def replica_binds():
+    """Bind Flask-SQLAlchemy per le repliche configurate (vuoto = routing disattivato)"""
+    binds = {}
+    for i, url in enumerate(REPLICA_URLS):
+        url = _normalize_url(url)
+        # Opzioni del dialetto della replica, non quelle del primario
+        binds[f'{REPLICA_BIND_PREFIX}{i}'] = dict(engine_options(url), url=url)
+    return binds
+
+
+class ReplicaHealth:
+    """Lag delle repliche, ricontrollato al massimo ogni REPLICA_LAG_CHECK_SECONDS"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._checked = {}  # bind -> (monotonic, lag o None se irraggiungibile)
+
+    def lag(self, bind_key, engine):
+        now = time.monotonic()
+        with self._lock:
+            checked = self._checked.get(bind_key)
+            if checked and now - checked[0] < REPLICA_LAG_CHECK_SECONDS:
+                return checked[1]
+
+        lag = None
+        try:
+            if engine.dialect.name == 'postgresql':
+                with engine.connect() as conn:
+                    lag = float(conn.execute(_PG_LAG_SQL).scalar() or 0)
+            else:
+                lag = 0.0
+        except Exception as e:
+            logger.warning(f"⚠️ Replica {bind_key} non raggiungibile: {e}")
+
+        if lag is not None and lag > REPLICA_MAX_LAG_SECONDS:
+            logger.warning(f"⚠️ Replica {bind_key} in ritardo di {lag:.1f}s (soglia {REPLICA_MAX_LAG_SECONDS}s)")
+
+        with self._lock:
+            self._checked[bind_key] = (now, lag)
+        return lag
+
+    def status(self):
+        with self._lock:
+            return {
+                bind: {'lag_seconds': lag, 'healthy': lag is not None and lag <= REPLICA_MAX_LAG_SECONDS}
+                for bind, (_, lag) in self._checked.items()
+            }
+
+
+REPLICA_HEALTH = ReplicaHealth()
+
+
+def pick_replica(db):
+    """Engine di una replica entro la soglia di lag (casuale tra le sane), altrimenti None"""
+    candidates = [key for key in db.engines if isinstance(key, str) and key.startswith(REPLICA_BIND_PREFIX)]
+    random.shuffle(candidates)
+    for bind_key in candidates:
+        engine = db.engines[bind_key]
+        lag = REPLICA_HEALTH.lag(bind_key, engine)
+        if lag is not None and lag <= REPLICA_MAX_LAG_SECONDS:
+            return engine
+    return None
+
+
+class RoutingSession(Session):
+    """
+    Sessione Flask-SQLAlchemy che manda le SELECT delle richieste abilitate
+    a una replica. Tutto il resto (flush, DML, sessioni con modifiche
+    pendenti, job e scheduler fuori richiesta) usa il bind standard.
+    """
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None and self._replica_allowed(clause):
+            engine = pick_replica(self._db)
+            if engine is not None:
+                return engine
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+    def _replica_allowed(self, clause):
+        if not has_request_context() or not g.get('db_use_replica') or g.get('db_wrote'):
+            return False
+        if self._flushing or self.new or self.dirty or self.deleted:
+            return False
+        return isinstance(clause, Select)
+
+
+@event.listens_for(RoutingSession, 'after_flush')
+def _mark_write(session, flush_context):
+    if has_request_context():
+        g.db_wrote = True
+
+
+def read_replica(f):
+    """Endpoint di sola lettura: le SELECT possono andare su una replica"""
+    @wraps(f)
+    def wrapper(*args, **kwargs):
+        if REPLICA_URLS:
+            last_write = session.get('db_last_write', 0)
+            g.db_use_replica = time.time() - last_write > READ_YOUR_WRITES_SECONDS
+        return f(*args, **kwargs)
+    return wrapper
+
+
+def finish_request(response):
+    """Memorizza l'ultima scrittura dell'utente per il read-your-writes"""
+    if REPLICA_URLS and g.get('db_wrote'):
+        session['db_last_write'] = time.time()
+    return response
+
+
+def status():
+    return {
+        'enabled': bool(REPLICA_URLS),
+        'replicas': len(REPLICA_URLS),
+        'max_lag_seconds': REPLICA_MAX_LAG_SECONDS,
+        'read_your_writes_seconds': READ_YOUR_WRITES_SECONDS,
+        'health': REPLICA_HEALTH.status(),
+    }
@@ -0,0 +1,334 @@
+# market_data_client.py
+"""
+Client HTTP asincrono per i fornitori di dati di mercato (Twelve Data).
+Pool keep-alive dimensionato, retry con backoff esponenziale + jitter,
+deadline per chiamata e fan-out concorrente. I wrapper sincroni permettono
+a TechnicalAnalyzer (e ai thread di gunicorn) di usarlo senza asyncio.
+"""
+
+import asyncio
+import logging
+import os
+import random
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from time import monotonic
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+try:
+    import aiohttp
+    AIOHTTP_AVAILABLE = True
+except ImportError:
+    aiohttp = None
+    AIOHTTP_AVAILABLE = False
+
+import requests
+
+logger = logging.getLogger("market_data_client")
+
+# Status HTTP per cui ha senso riprovare
+RETRYABLE_STATUS = {429, 500, 502, 503, 504}
+
+
+class _RetryableError(Exception):
+    """Errore transitorio: la richiesta può essere ripetuta."""
+
+
+class CircuitBreaker:
+    """
+    Circuit breaker per un endpoint upstream.
+    CLOSED: chiamate normali. OPEN: fast-fail fino a reset_timeout.
+    HALF_OPEN: una sola chiamata di prova; successo -> CLOSED, errore -> OPEN.
+    """
+
+    CLOSED = "CLOSED"
+    OPEN = "OPEN"
+    HALF_OPEN = "HALF_OPEN"
+
+    def __init__(self, name: str, failure_threshold: Optional[int] = None,
+                 reset_timeout: Optional[float] = None):
+        self.name = name
+        self.failure_threshold = failure_threshold or int(os.getenv("TD_BREAKER_FAILURE_THRESHOLD", "5"))
+        self.reset_timeout = reset_timeout or float(os.getenv("TD_BREAKER_RESET_SEC", "30"))
+        self.state = self.CLOSED
+        self.consecutive_failures = 0
+        self.opened_at: Optional[float] = None
+        self.last_error: Optional[str] = None
+        self.rejected_calls = 0
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+
+    def allow_request(self) -> bool:
+        """True se la chiamata può partire; False = fast-fail verso il fallback."""
+        with self._lock:
+            if self.state == self.CLOSED:
+                return True
+            if self.state == self.OPEN and monotonic() - self.opened_at >= self.reset_timeout:
+                self.state = self.HALF_OPEN
+                self._trial_in_flight = False
+                logger.info(f"Circuit {self.name}: HALF_OPEN (chiamata di prova)")
+            if self.state == self.HALF_OPEN and not self._trial_in_flight:
+                self._trial_in_flight = True
+                return True
+            self.rejected_calls += 1
+            return False
+
+    def record_success(self) -> None:
+        with self._lock:
+            if self.state != self.CLOSED:
+                logger.info(f"Circuit {self.name}: CLOSED (upstream tornato disponibile)")
+            self.state = self.CLOSED
+            self.consecutive_failures = 0
+            self.opened_at = None
+            self._trial_in_flight = False
+
+    def record_failure(self, error: str) -> None:
+        with self._lock:
+            self.consecutive_failures += 1
+            self.last_error = error
+            self._trial_in_flight = False
+            if self.state == self.HALF_OPEN or self.consecutive_failures >= self.failure_threshold:
+                if self.state != self.OPEN:
+                    logger.warning(
+                        f"Circuit {self.name}: OPEN dopo {self.consecutive_failures} errori ({error})"
+                    )
+                self.state = self.OPEN
+                self.opened_at = monotonic()
+
+    def get_status(self) -> Dict[str, Any]:
+        with self._lock:
+            retry_in = None
+            if self.state == self.OPEN and self.opened_at is not None:
+                retry_in = max(0.0, round(self.reset_timeout - (monotonic() - self.opened_at), 1))
+            return {
+                "state": self.state,
+                "consecutive_failures": self.consecutive_failures,
+                "failure_threshold": self.failure_threshold,
+                "retry_in_seconds": retry_in,
+                "rejected_calls": self.rejected_calls,
+                "last_error": self.last_error,
+            }
+
+
+class MarketDataClient:
+    """
+    Client condiviso tra thread. Le coroutine girano su un event loop dedicato
+    in un thread di background; request()/fetch_many() sono i wrapper sincroni.
+    Se aiohttp non è installato usa requests in un thread pool (stessa logica di retry).
+    """
+
+    def __init__(
+        self,
+        pool_size: Optional[int] = None,
+        keepalive_seconds: Optional[float] = None,
+        max_retries: Optional[int] = None,
+        backoff_base: Optional[float] = None,
+        backoff_max: Optional[float] = None,
+        default_deadline: Optional[float] = None,
+        user_agent: str = "cot-platform/1.0",
+    ):
+        self.pool_size = pool_size or int(os.getenv("TD_HTTP_POOL_SIZE", "20"))
+        self.keepalive_seconds = keepalive_seconds or float(os.getenv("TD_HTTP_KEEPALIVE_SEC", "30"))
+        self.max_retries = max_retries if max_retries is not None else int(os.getenv("TD_HTTP_MAX_RETRIES", "2"))
+        self.backoff_base = backoff_base or float(os.getenv("TD_HTTP_BACKOFF_BASE_SEC", "0.5"))
+        self.backoff_max = backoff_max or float(os.getenv("TD_HTTP_BACKOFF_MAX_SEC", "4"))
+        self.default_deadline = default_deadline or float(os.getenv("TD_HTTP_DEADLINE_SEC", "8"))
+        self.user_agent = user_agent
+
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._session = None
+        self._start_lock = threading.Lock()
+
+        # Fallback sincrono (senza aiohttp)
+        self._fallback_session: Optional[requests.Session] = None
+        self._fallback_executor: Optional[ThreadPoolExecutor] = None
+
+    # -------------------------------------------------------------------------
+    # EVENT LOOP & SESSIONE
+    # -------------------------------------------------------------------------
+    def _ensure_loop(self) -> asyncio.AbstractEventLoop:
+        """Avvia (una volta) l'event loop di background."""
+        if self._loop is not None:
+            return self._loop
+        with self._start_lock:
+            if self._loop is None:
+                loop = asyncio.new_event_loop()
+                thread = threading.Thread(
+                    target=loop.run_forever, name="market-data-loop", daemon=True
+                )
+                thread.start()
+                self._thread = thread
+                self._loop = loop
+                logger.info(
+                    f"Market data client avviato (aiohttp={AIOHTTP_AVAILABLE}, pool={self.pool_size})"
+                )
+        return self._loop
+
+    async def _get_session(self):
+        if self._session is None:
+            connector = aiohttp.TCPConnector(
+                limit=self.pool_size,
+                limit_per_host=self.pool_size,
+                keepalive_timeout=self.keepalive_seconds,
+                ttl_dns_cache=300,
+            )
+            self._session = aiohttp.ClientSession(
+                connector=connector, headers={"User-Agent": self.user_agent}
+            )
+        return self._session
+
+    def _get_fallback(self) -> Tuple[requests.Session, ThreadPoolExecutor]:
+        if self._fallback_session is None:
+            session = requests.Session()
+            session.headers.update({"User-Agent": self.user_agent})
+            adapter = requests.adapters.HTTPAdapter(
+                pool_connections=self.pool_size, pool_maxsize=self.pool_size
+            )
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+            self._fallback_session = session
+            self._fallback_executor = ThreadPoolExecutor(
+                max_workers=self.pool_size, thread_name_prefix="market-data-http"
+            )
+        return self._fallback_session, self._fallback_executor
+
+    # -------------------------------------------------------------------------
+    # TRASPORTO
+    # -------------------------------------------------------------------------
+    async def _send(self, url: str, params: Dict, timeout: float) -> Tuple[int, Any]:
+        """Singola GET. Ritorna (status, payload JSON o testo)."""
+        if AIOHTTP_AVAILABLE:
+            session = await self._get_session()
+            async with session.get(
+                url, params=params, timeout=aiohttp.ClientTimeout(total=timeout)
+            ) as r:
+                if r.status != 200:
+                    return r.status, await r.text()
+                return r.status, await r.json(content_type=None)
+
+        session, executor = self._get_fallback()
+        loop = asyncio.get_running_loop()
+        r = await loop.run_in_executor(
+            executor, partial(session.get, url, params=params, timeout=timeout)
+        )
+        if r.status_code != 200:
+            return r.status_code, r.text
+        return r.status_code, r.json()
+
+    def _backoff_delay(self, attempt: int) -> float:
+        """Backoff esponenziale con full jitter."""
+        cap = min(self.backoff_max, self.backoff_base * (2 ** (attempt - 1)))
+        return random.uniform(0, cap)
+
+    async def fetch(self, url: str, params: Dict, deadline: Optional[float] = None) -> Optional[Any]:
+        """
+        GET con retry entro la deadline complessiva.
+        Ritorna il JSON decodificato oppure None se la richiesta è fallita.
+        """
+        loop = asyncio.get_running_loop()
+        deadline_at = loop.time() + (deadline or self.default_deadline)
+        attempt = 0
+
+        while True:
+            remaining = deadline_at - loop.time()
+            if remaining <= 0:
+                logger.warning(f"Deadline superata per {url}")
+                return None
+
+            try:
+                status, payload = await self._send(url, params, remaining)
+
+                if status in RETRYABLE_STATUS:
+                    raise _RetryableError(f"HTTP {status}")
+                if status != 200:
+                    logger.warning(f"HTTP error {status} per {url}: {str(payload)[:200]}")
+                    return None
+
+                # Twelve Data segnala il rate-limit anche con HTTP 200
+                if isinstance(payload, dict) and payload.get("status") == "error" \
+                        and payload.get("code") in RETRYABLE_STATUS:
+                    raise _RetryableError(f"API code {payload.get('code')}")
+
+                return payload
+
+            except (_RetryableError, asyncio.TimeoutError, OSError) as e:
+                last_error = e
+            except Exception as e:
+                if AIOHTTP_AVAILABLE and isinstance(e, aiohttp.ClientError):
+                    last_error = e
+                elif isinstance(e, requests.RequestException):
+                    last_error = e
+                else:
+                    logger.warning(f"Errore non recuperabile per {url}: {e}")
+                    return None
+
+            attempt += 1
+            if attempt > self.max_retries:
+                logger.warning(f"Retry esauriti per {url}: {last_error}")
+                return None
+
+            delay = self._backoff_delay(attempt)
+            if delay >= deadline_at - loop.time():
+                logger.warning(f"Nessun tempo per retry su {url}: {last_error}")
+                return None
+            logger.info(f"Retry {attempt}/{self.max_retries} per {url} tra {delay:.2f}s ({last_error})")
+            await asyncio.sleep(delay)
+
+    async def fetch_many_async(
+        self, calls: Sequence[Tuple[str, Dict]], deadline: Optional[float] = None
+    ) -> List[Optional[Any]]:
+        """Fan-out concorrente: tutte le richieste partono insieme."""
+        return list(await asyncio.gather(*(self.fetch(url, params, deadline) for url, params in calls)))
+
+    # -------------------------------------------------------------------------
+    # WRAPPER SINCRONI
+    # -------------------------------------------------------------------------
+    def request(self, url: str, params: Dict, deadline: Optional[float] = None) -> Optional[Any]:
+        """Versione sincrona di fetch() per chiamanti non asyncio."""
+        deadline = deadline or self.default_deadline
+        loop = self._ensure_loop()
+        future = asyncio.run_coroutine_threadsafe(self.fetch(url, params, deadline), loop)
+        try:
+            return future.result(timeout=deadline + 1)
+        except Exception as e:
+            future.cancel()
+            logger.warning(f"Richiesta {url} interrotta: {e}")
+            return None
+
+    def fetch_many(
+        self, calls: Sequence[Tuple[str, Dict]], deadline: Optional[float] = None
+    ) -> List[Optional[Any]]:
+        """Versione sincrona di fetch_many_async(): un solo round-trip per N richieste."""
+        if not calls:
+            return []
+        deadline = deadline or self.default_deadline
+        loop = self._ensure_loop()
+        future = asyncio.run_coroutine_threadsafe(self.fetch_many_async(calls, deadline), loop)
+        try:
+            return future.result(timeout=deadline + 1)
+        except Exception as e:
+            future.cancel()
+            logger.warning(f"Batch di {len(calls)} richieste interrotto: {e}")
+            return [None] * len(calls)
+
+    def close(self) -> None:
+        """Chiude sessione e loop di background."""
+        loop = self._loop
+        if loop is None:
+            return
+        if self._session is not None:
+            asyncio.run_coroutine_threadsafe(self._session.close(), loop).result(timeout=5)
+            self._session = None
+        loop.call_soon_threadsafe(loop.stop)
+        if self._thread:
+            self._thread.join(timeout=5)
+        self._loop = None
+        self._thread = None
+        if self._fallback_executor:
+            self._fallback_executor.shutdown(wait=False)
+            self._fallback_executor = None
+        if self._fallback_session:
+            self._fallback_session.close()
+            self._fallback_session = None
@@ -23,6 +23,8 @@ if not logger.handlers:
     logger.addHandler(_h)
 logger.setLevel(logging.INFO)
 
+from analysis.cot_metrics import metrics_for
+
 # Import opzionale di NumPy: lo usiamo solo se presente
 try:
     import numpy as np  # type: ignore
@@ -92,20 +94,21 @@ class COTPredictorFixed:
         if not self.ml_available or np is None:
             return None
         try:
+            # Metriche salvate all'ingest (fallback: stesse formule al volo)
+            metrics = metrics_for(data_point)
+
             # Estrai features base
-            nc_long = float(data_point.get("non_commercial_long", 0))
-            nc_short = float(data_point.get("non_commercial_short", 0))
-            c_long = float(data_point.get("commercial_long", 0))
-            c_short = float(data_point.get("commercial_short", 0))
-            net_pos = float(data_point.get("net_position", 0))
-            sentiment = float(data_point.get("sentiment_score", 0))
+            nc_long = float(metrics.get("non_commercial_long") or 0)
+            nc_short = float(metrics.get("non_commercial_short") or 0)
+            c_long = float(metrics.get("commercial_long") or 0)
+            c_short = float(metrics.get("commercial_short") or 0)
+            net_pos = float(metrics["net_position"])
+            sentiment = float(metrics["sentiment_score"])
 
             # Derivate
-            nc_ratio = nc_long / (nc_short + 1.0)
-            c_ratio = c_long / (c_short + 1.0)
-            total_long = nc_long + c_long
-            total_short = nc_short + c_short
-            total_oi = total_long + total_short
+            nc_ratio = float(metrics["nc_long_ratio"])
+            c_ratio = float(metrics["c_long_ratio"])
+            total_oi = float(metrics["total_oi"])
 
             if total_oi > 0:
                 nc_long_pct = nc_long / total_oi
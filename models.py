@@ -9,7 +9,10 @@ from werkzeug.security import generate_password_hash, check_password_hash
 from datetime import datetime, timedelta
 import os
 
-db = SQLAlchemy()
+from db_routing import RoutingSession
+
+# Sessione con routing opzionale delle letture verso le repliche
+db = SQLAlchemy(session_options={'class_': RoutingSession})
 
 # ==========================================
 # CONFIGURAZIONE PIANI
@@ -1,12 +1,13 @@
 # populate_db.py - Esegui questo script per aggiungere dati di test
 
-from app_complete import app, db, COTData
+from app_complete import app, upsert_cot_rows
 from datetime import datetime, timedelta
 import random
 
 with app.app_context():
     # Genera dati di test per gli ultimi 30 giorni
     symbols = ['GOLD', 'EUR', 'USD', 'GBP']
+    rows = []
     
     for symbol in symbols:
         for i in range(30):
@@ -21,19 +22,18 @@ with app.app_context():
             net_pos = nc_long - nc_short
             sentiment = ((nc_long - nc_short) / (nc_long + nc_short)) * 100
             
-            data = COTData(
-                symbol=symbol,
-                date=date,
-                non_commercial_long=nc_long,
-                non_commercial_short=nc_short,
-                non_commercial_spreads=0,
-                commercial_long=c_long,
-                commercial_short=c_short,
-                net_position=net_pos,
-                sentiment_score=sentiment
-            )
-            
-            db.session.add(data)
+            rows.append({
+                'symbol': symbol,
+                'date': date,
+                'non_commercial_long': nc_long,
+                'non_commercial_short': nc_short,
+                'non_commercial_spreads': 0,
+                'commercial_long': c_long,
+                'commercial_short': c_short,
+                'net_position': net_pos,
+                'sentiment_score': sentiment
+            })
     
-    db.session.commit()
-    print("Database popolato con dati di test!")
\ No newline at end of file
+    # Stesso percorso dell'ingest: metriche derivate, cot_latest e archivio aggiornati
+    written = upsert_cot_rows(rows)
+    print(f"Database popolato con dati di test! ({written} righe)")
\ No newline at end of file
@@ -0,0 +1,157 @@
+# query_monitor.py
+"""
+Strumentazione SQL per richiesta
+Conta query e tempo DB di ogni richiesta Flask tramite gli eventi di
+SQLAlchemy, segnala statement ripetuti (pattern N+1) e query lente
+con i relativi parametri, e aggiunge i totali agli header di timing.
+
+Un executemany (es. bulk insert/update) conta come una sola query per
+batch, non una per riga: il tempo misurato è quello dell'intero batch.
+"""
+
+import logging
+import os
+import threading
+import time
+from collections import Counter, defaultdict
+
+from flask import g, has_request_context, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+logger = logging.getLogger("query_monitor")
+
+SLOW_QUERY_MS = float(os.getenv("SLOW_QUERY_MS", "200"))           # Statement lento oltre questa soglia
+N_PLUS_ONE_THRESHOLD = int(os.getenv("N_PLUS_ONE_THRESHOLD", "5"))  # Stesso statement ripetuto N volte
+QUERY_COUNT_WARN = int(os.getenv("QUERY_COUNT_WARN", "20"))         # Query per richiesta prima del warning
+MAX_PARAMS_LOG = 500  # Caratteri massimi dei parametri nei log
+
+
+class RequestQueryStats:
+    """Query eseguite durante una singola richiesta"""
+
+    __slots__ = ('count', 'total_ms', 'statements', 'slow')
+
+    def __init__(self):
+        self.count = 0
+        self.total_ms = 0.0
+        self.statements = Counter()
+        self.slow = 0
+
+    def repeated(self, threshold=N_PLUS_ONE_THRESHOLD):
+        """Statement eseguiti almeno `threshold` volte (candidati N+1)"""
+        return [(sql, n) for sql, n in self.statements.most_common() if n >= threshold]
+
+
+class EndpointQueryStats:
+    """Aggregati per endpoint dall'avvio del processo (visibili dalla API admin)"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._stats = defaultdict(lambda: {
+            'requests': 0, 'queries': 0, 'db_ms': 0.0, 'max_queries': 0, 'n_plus_one': 0, 'slow': 0,
+        })
+
+    def record(self, endpoint, stats, n_plus_one):
+        with self._lock:
+            entry = self._stats[endpoint]
+            entry['requests'] += 1
+            entry['queries'] += stats.count
+            entry['db_ms'] += stats.total_ms
+            entry['max_queries'] = max(entry['max_queries'], stats.count)
+            entry['slow'] += stats.slow
+            if n_plus_one:
+                entry['n_plus_one'] += 1
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                endpoint: {
+                    'requests': s['requests'],
+                    'avg_queries': round(s['queries'] / s['requests'], 2),
+                    'max_queries': s['max_queries'],
+                    'avg_db_ms': round(s['db_ms'] / s['requests'], 2),
+                    'n_plus_one_requests': s['n_plus_one'],
+                    'slow_queries': s['slow'],
+                }
+                for endpoint, s in sorted(self._stats.items())
+            }
+
+    def reset(self):
+        with self._lock:
+            self._stats.clear()
+
+
+ENDPOINT_STATS = EndpointQueryStats()
+
+
+def _current_stats():
+    """Statistiche della richiesta corrente (None fuori da una richiesta, es. job e scheduler)"""
+    if not has_request_context():
+        return None
+    return g.get('query_stats')
+
+
+def _format_params(parameters):
+    text = repr(parameters)
+    return text if len(text) <= MAX_PARAMS_LOG else text[:MAX_PARAMS_LOG] + '...'
+
+
+@event.listens_for(Engine, 'before_cursor_execute')
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    # Inizio sul contesto dello statement, non sulla connessione del pool:
+    # uno statement che fallisce non lascia residui sulla connessione
+    if context is not None:
+        context._query_start = time.perf_counter()
+
+
+@event.listens_for(Engine, 'after_cursor_execute')
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    start = getattr(context, '_query_start', None)
+    if start is None:
+        return
+    elapsed = (time.perf_counter() - start) * 1000
+
+    if elapsed > SLOW_QUERY_MS:
+        logger.warning(f"🐢 SLOW QUERY ({elapsed:.1f}ms): {statement} | params={_format_params(parameters)}")
+
+    stats = _current_stats()
+    if stats is None:
+        return
+    stats.count += 1
+    stats.total_ms += elapsed
+    stats.statements[statement] += 1
+    if elapsed > SLOW_QUERY_MS:
+        stats.slow += 1
+
+
+def start_request():
+    g.query_stats = RequestQueryStats()
+
+
+def finish_request(response):
+    """Log di N+1 / troppe query e header di timing con i totali DB"""
+    stats = g.pop('query_stats', None)
+    if stats is None:
+        return response
+
+    repeated = stats.repeated()
+    for statement, times in repeated:
+        logger.warning(
+            f"🔁 N+1 sospetto su {request.method} {request.path}: "
+            f"statement eseguito {times} volte: {statement[:300]}"
+        )
+    if stats.count > QUERY_COUNT_WARN:
+        logger.warning(
+            f"⚠️ {request.method} {request.path}: {stats.count} query "
+            f"({stats.total_ms:.1f}ms DB), soglia {QUERY_COUNT_WARN}"
+        )
+
+    ENDPOINT_STATS.record(request.endpoint or request.path, stats, bool(repeated))
+
+    response.headers['X-DB-Query-Count'] = str(stats.count)
+    response.headers['X-DB-Time'] = f"{stats.total_ms:.2f}ms"
+    timing = f'db;dur={stats.total_ms:.2f};desc="{stats.count} queries"'
+    existing = response.headers.get('Server-Timing')
+    response.headers['Server-Timing'] = f"{existing}, {timing}" if existing else timing
+    return response
@@ -502,11 +502,12 @@ async function loadOverview(symbol) {
     // Carica dati COT separatamente se necessario
     const cotUrl = `/api/data/${encodeURIComponent(symbol)}?days=90`;
     console.log('  Fetching COT:', cotUrl);
-    const cotRes = await fetchWithCache(cotUrl);
+    const cotPage = await fetchWithCache(cotUrl);
+    const cotRes = cotPage?.data || [];
 
     console.log('  Risposta cotRes:', cotRes);
 
-    if (cotRes && cotRes.length > 0) {
+    if (cotRes.length > 0) {
       const latest = cotRes[0];
       const prev = cotRes[1] || null;
 
@@ -679,9 +680,10 @@ function updateQuickAnalysis(data) {
 // =====================================================
 async function loadCotHistory(symbol, days = 30) {
   try {
-    const res = await fetchWithCache(`/api/data/${encodeURIComponent(symbol)}?days=${days}`);
+    const page = await fetchWithCache(`/api/data/${encodeURIComponent(symbol)}?days=${days}`);
+    const res = page?.data || [];
 
-    if (!res || !res.length) {
+    if (!res.length) {
       console.warn('Nessun dato COT disponibile');
       return;
     }
@@ -1368,8 +1370,9 @@ async function runFullAnalysis(symbol) {
   showAlert('Analisi AI in corso...', 'info', 10000);
 
   try {
+    // Accoda il job (risposta immediata con job_id)
     const res = await fetch(`/api/scrape/${encodeURIComponent(symbol)}`, {
-      method: 'GET',
+      method: 'POST',
       headers: {
         'Accept': 'application/json'
       }
@@ -1377,20 +1380,34 @@ async function runFullAnalysis(symbol) {
 
     if (!res.ok) throw new Error('scrape failed');
 
-    const data = await res.json();
+    let job = await res.json();
+    console.log('📋 Job accodato:', job.job_id);
+
+    // Polling dello stato finché il job non termina
+    while (job.status === 'queued' || job.status === 'running') {
+      await new Promise(resolve => setTimeout(resolve, 1500));
+      const statusRes = await fetch(job.status_url || `/api/scrape/jobs/${job.job_id}`, {
+        headers: { 'Accept': 'application/json' }
+      });
+      if (!statusRes.ok) throw new Error('job status failed');
+      job = { ...job, ...(await statusRes.json()) };
+      console.log(`⏳ Job ${job.status}${job.stage ? ' - fase ' + job.stage : ''}`);
+    }
+
+    if (job.status === 'failed') throw new Error(job.error || 'scrape failed');
 
-    console.log('✅ Scraping completato, risposta:', data);
-    console.log('🔍 data.gpt_analysis:', data.gpt_analysis);
-    console.log('🔍 data.data?.gpt_analysis:', data.data?.gpt_analysis);
+    console.log('✅ Scraping completato, tempi per fase:', job.stage_timings);
+    console.log('🔍 gpt_analysis:', job.result?.gpt_analysis);
+
+    if (job.status === 'unchanged') {
+      showAlert('Nessun nuovo report COT: dati già aggiornati', 'info', 5000);
+      return;
+    }
 
     // Pulisci TUTTA la cache per forzare refresh
     cache.clear();
     console.log('🗑️ Cache JavaScript completamente pulita');
 
-    // Aspetta 2 secondi per assicurarsi che il backend abbia salvato tutto E invalidato la cache
-    console.log('⏳ Aspetto 2 secondi per backend cache invalidation...');
-    await new Promise(resolve => setTimeout(resolve, 2000));
-
     // Ricarica tutto FORZANDO il bypass della cache
     console.log('🔄 Ricaricamento forzato di tutti i dati...');
     await reloadAll(true); // Force refresh = true
@@ -1552,9 +1569,10 @@ async function loadMarketLeaders() {
     // Carica dati COT per tutti i simboli
     console.log('📡 Step 2: Fetching COT data per ogni simbolo...');
     const cotPromises = symbols.map(s =>
-      fetchWithCache(`/api/data/${encodeURIComponent(s.code)}?days=7`)
-        .then(data => {
-          if (data && data.length > 0) {
+      fetchWithCache(`/api/data/${encodeURIComponent(s.code)}?days=7&limit=1`)
+        .then(page => {
+          const data = page?.data || [];
+          if (data.length > 0) {
             const latest = data[0];
             console.log(`  ✓ ${s.code}: net_position=${latest.net_position}`);
             return {
@@ -0,0 +1,208 @@
+# symbol_catalog.py
+"""
+Cache persistente del catalogo simboli Twelve Data (forex_pairs + commodities)
+e della tabella di risoluzione simbolo logico -> simbolo Twelve Data.
+
+Il catalogo viene salvato su disco con TTL in giorni, condiviso tra i worker
+e tra i riavvii; quando scade viene aggiornato in background senza bloccare
+le richieste. La risoluzione è un lookup O(1) su un indice precalcolato.
+"""
+
+import json
+import logging
+import os
+import threading
+from datetime import datetime, timedelta
+from typing import Callable, Dict, List, Optional, Set
+
+logger = logging.getLogger("symbol_catalog")
+
+# Un refresh in corso da più di così è considerato abbandonato
+_REFRESH_LOCK_MAX_AGE = 300
+# Attesa minima tra due tentativi di refresh falliti (evita di bruciare crediti)
+_REFRESH_RETRY_SECONDS = 900
+
+
+class SymbolCatalog:
+    """
+    Catalogo simboli persistito su file JSON.
+
+    Args:
+        path: file JSON di persistenza
+        ttl_days: validità del catalogo in giorni
+        fetcher: callable che scarica il catalogo e ritorna
+                 {"forex": set, "commodities": set} oppure None
+        direct_mapping: simboli logici risolti senza catalogo
+        candidates: simboli logici -> candidati Twelve Data in ordine di preferenza
+    """
+
+    def __init__(
+        self,
+        path: str,
+        ttl_days: int,
+        fetcher: Callable[[], Optional[Dict[str, Set[str]]]],
+        direct_mapping: Dict[str, str],
+        candidates: Dict[str, List[str]],
+    ):
+        self.path = path
+        self.ttl = timedelta(days=ttl_days)
+        self._fetcher = fetcher
+        self._direct_mapping = dict(direct_mapping)
+        self._candidates = {k: list(v) for k, v in candidates.items()}
+
+        self.fetched_at: Optional[datetime] = None
+        self.symbols: Dict[str, Set[str]] = {"forex": set(), "commodities": set()}
+        self._index: Dict[str, Optional[str]] = self._build_index()
+
+        self._refresh_lock = threading.Lock()
+        self._refreshing = False
+        self._next_attempt: Optional[datetime] = None
+
+        self._load_from_disk()
+
+    # -------------------------------------------------------------------------
+    # INDICE DI RISOLUZIONE
+    # -------------------------------------------------------------------------
+    def _build_index(self) -> Dict[str, Optional[str]]:
+        """Precalcola logical -> td_symbol usando mapping diretto, catalogo e fallback."""
+        known = self.symbols["forex"] | self.symbols["commodities"]
+        index: Dict[str, Optional[str]] = {}
+        for logical in set(self._candidates) | set(self._direct_mapping):
+            if logical in self._direct_mapping:
+                index[logical] = self._direct_mapping[logical]
+                continue
+            candidates = self._candidates.get(logical, [])
+            index[logical] = next((c for c in candidates if c in known), candidates[0] if candidates else None)
+        return index
+
+    def resolve(self, logical_symbol: str) -> Optional[str]:
+        """Lookup O(1). Se il catalogo è scaduto avvia un refresh in background."""
+        # I simboli a mapping diretto non dipendono dal catalogo: nessun credito speso
+        if logical_symbol in self._direct_mapping:
+            return self._direct_mapping[logical_symbol]
+        if self.is_stale():
+            self.refresh_in_background()
+        return self._index.get(logical_symbol)
+
+    # -------------------------------------------------------------------------
+    # PERSISTENZA
+    # -------------------------------------------------------------------------
+    def is_stale(self) -> bool:
+        return self.fetched_at is None or datetime.utcnow() - self.fetched_at > self.ttl
+
+    def _load_from_disk(self) -> None:
+        if not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                payload = json.load(f)
+            self.symbols = {
+                "forex": set(payload.get("forex", [])),
+                "commodities": set(payload.get("commodities", [])),
+            }
+            self.fetched_at = datetime.fromisoformat(payload["fetched_at"])
+            index = self._build_index()
+            # La tabella salvata vale solo per simboli risolti via catalogo e per
+            # candidati ancora configurati: il mapping diretto nel codice vince sempre
+            index.update({
+                k: v for k, v in payload.get("resolution", {}).items()
+                if k not in self._direct_mapping and v in self._candidates.get(k, ())
+            })
+            self._index = index
+            logger.info(
+                f"Catalogo simboli caricato da {self.path} "
+                f"({len(self.symbols['forex'])} forex, {len(self.symbols['commodities'])} commodities, "
+                f"fetched_at={self.fetched_at.isoformat()})"
+            )
+        except Exception as e:
+            logger.warning(f"Catalogo simboli su disco non leggibile ({self.path}): {e}")
+
+    def _save_to_disk(self) -> None:
+        payload = {
+            "fetched_at": self.fetched_at.isoformat(),
+            "forex": sorted(self.symbols["forex"]),
+            "commodities": sorted(self.symbols["commodities"]),
+            "resolution": self._index,
+        }
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_path = f"{self.path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(payload, f)
+        os.replace(tmp_path, self.path)  # scrittura atomica, sicura tra worker
+
+    # -------------------------------------------------------------------------
+    # REFRESH
+    # -------------------------------------------------------------------------
+    def refresh_in_background(self) -> None:
+        """Avvia un refresh non bloccante (uno solo per processo alla volta)."""
+        with self._refresh_lock:
+            if self._refreshing:
+                return
+            if self._next_attempt and datetime.utcnow() < self._next_attempt:
+                return
+            self._refreshing = True
+            self._next_attempt = datetime.utcnow() + timedelta(seconds=_REFRESH_RETRY_SECONDS)
+        threading.Thread(target=self._refresh_worker, name="td-catalog-refresh", daemon=True).start()
+
+    def _refresh_worker(self) -> None:
+        try:
+            self.refresh()
+        finally:
+            with self._refresh_lock:
+                self._refreshing = False
+
+    def _acquire_file_lock(self) -> Optional[str]:
+        """Lock tra processi: un solo worker scarica il catalogo."""
+        lock_path = f"{self.path}.lock"
+        directory = os.path.dirname(lock_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        try:
+            if os.path.exists(lock_path) and \
+                    datetime.now().timestamp() - os.path.getmtime(lock_path) > _REFRESH_LOCK_MAX_AGE:
+                os.remove(lock_path)
+            fd = os.open(lock_path, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+            os.close(fd)
+            return lock_path
+        except FileExistsError:
+            return None
+        except OSError as e:
+            logger.warning(f"Lock catalogo non disponibile: {e}")
+            return None
+
+    def refresh(self) -> bool:
+        """Scarica il catalogo (se nessun altro worker lo ha già fatto) e lo persiste."""
+        lock_path = self._acquire_file_lock()
+        if lock_path is None:
+            logger.info("Refresh catalogo già in corso in un altro worker")
+            return False
+        try:
+            # Un altro worker potrebbe averlo appena aggiornato
+            self._load_from_disk()
+            if not self.is_stale():
+                return True
+
+            fetched = self._fetcher()
+            if not fetched or not (fetched.get("forex") or fetched.get("commodities")):
+                logger.warning("Refresh catalogo simboli fallito: mantengo la versione corrente")
+                return False
+
+            self.symbols = {
+                "forex": set(fetched.get("forex", ())),
+                "commodities": set(fetched.get("commodities", ())),
+            }
+            self.fetched_at = datetime.utcnow()
+            self._index = self._build_index()
+            self._save_to_disk()
+            logger.info(f"Catalogo simboli aggiornato e salvato in {self.path}")
+            return True
+        except Exception as e:
+            logger.warning(f"Errore refresh catalogo simboli: {e}")
+            return False
+        finally:
+            try:
+                os.remove(lock_path)
+            except OSError:
+                pass
@@ -0,0 +1,318 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Twelve Data Stand-in - server locale compatibile con le API usate dal Technical Analyzer
+(/quote, /price, /time_series, /forex_pairs, /commodities).
+
+Serve fixture registrate (vedi TD_RECORD_DIR in technical_analyzer) oppure serie
+sintetiche random-walk deterministiche, con latenza, tasso di errore e rate-limit
+configurabili. Permette di fare benchmark e load test di cache, throttling e batching
+senza consumare crediti reali.
+
+Uso:
+    python td_standin_server.py serve --port 8765 --latency-ms 150 --error-rate 0.05
+    TD_BASE_URL=http://127.0.0.1:8765 TD_API_KEY=demo gunicorn app_complete:app
+
+    python td_standin_server.py bench --latency-ms 200
+"""
+
+import argparse
+import json
+import logging
+import os
+import random
+import threading
+import time
+from collections import defaultdict, deque
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional
+
+from flask import Flask, jsonify, request
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger("td_standin")
+
+# Prezzi base per le serie sintetiche (simboli Twelve Data)
+SYNTHETIC_BASE_PRICES = {
+    "XAU/USD": 2650.00, "XAG/USD": 31.50, "USDX": 104.50, "DXY": 104.50,
+    "EUR/USD": 1.0850, "GBP/USD": 1.2750, "AUD/USD": 0.6550, "USD/JPY": 150.00,
+    "USD/CHF": 0.8850, "USD/CAD": 1.3650, "WTI/USD": 75.00, "BRENT/USD": 79.00,
+    "SPY": 460.00, "SPX": 4600.00, "QQQ": 390.00, "NDX": 16000.00,
+}
+
+INTERVAL_STEPS = {
+    "1min": timedelta(minutes=1), "5min": timedelta(minutes=5), "15min": timedelta(minutes=15),
+    "30min": timedelta(minutes=30), "1h": timedelta(hours=1), "4h": timedelta(hours=4),
+    "1day": timedelta(days=1), "1week": timedelta(weeks=1),
+}
+
+
+class StandinConfig:
+    """Comportamento simulato dell'upstream."""
+
+    def __init__(self, latency_ms=0, latency_jitter_ms=0, error_rate=0.0,
+                 rate_limit_per_min=0, reject_key=False, fixtures_dir=None):
+        self.latency_ms = latency_ms
+        self.latency_jitter_ms = latency_jitter_ms
+        self.error_rate = error_rate
+        self.rate_limit_per_min = rate_limit_per_min
+        self.reject_key = reject_key
+        self.fixtures_dir = fixtures_dir
+
+
+def _fixture_name(symbol: str, *qualifiers: str) -> str:
+    """Nome file della fixture: simbolo + eventuali parametri (es. interval, outputsize)."""
+    return "__".join([symbol.replace("/", "_"), *qualifiers])
+
+
+def _td_error(code: int, message: str):
+    """Errore in formato Twelve Data (HTTP 200 con status=error)."""
+    return jsonify({"code": code, "message": message, "status": "error"})
+
+
+def _random_walk(symbol: str, interval: str, outputsize: int) -> List[Dict]:
+    """Serie OHLC deterministica per simbolo/intervallo (stesso input -> stessa serie)."""
+    rng = random.Random(f"{symbol}:{interval}")
+    step = INTERVAL_STEPS.get(interval, timedelta(days=1))
+    price = SYNTHETIC_BASE_PRICES.get(symbol, 100.0)
+    vol = 0.01 if step >= timedelta(days=1) else 0.002
+    start = datetime.now(timezone.utc).replace(second=0, microsecond=0) - step * outputsize
+
+    values = []
+    for i in range(outputsize):
+        open_ = price
+        close = max(open_ * (1 + rng.gauss(0, vol)), 0.0001)
+        high = max(open_, close) * (1 + abs(rng.gauss(0, vol / 2)))
+        low = min(open_, close) * (1 - abs(rng.gauss(0, vol / 2)))
+        values.append({
+            "datetime": (start + step * (i + 1)).strftime("%Y-%m-%d %H:%M:%S"),
+            "open": f"{open_:.5f}", "high": f"{high:.5f}",
+            "low": f"{low:.5f}", "close": f"{close:.5f}",
+        })
+        price = close
+    return values
+
+
+def create_standin_app(cfg: StandinConfig) -> Flask:
+    """Crea l'app Flask del server stand-in."""
+    app = Flask("td_standin")
+    stats = defaultdict(int)
+    calls_per_key: Dict[str, deque] = defaultdict(deque)
+    rate_lock = threading.Lock()
+
+    def load_fixture(endpoint: str, symbol: Optional[str] = None, *qualifiers: str):
+        if not cfg.fixtures_dir:
+            return None
+        if symbol:
+            path = os.path.join(cfg.fixtures_dir, endpoint, f"{_fixture_name(symbol, *qualifiers)}.json")
+        else:
+            path = os.path.join(cfg.fixtures_dir, f"{endpoint}.json")
+        if not os.path.exists(path):
+            return None
+        with open(path, "r", encoding="utf-8") as f:
+            stats["fixture_hits"] += 1
+            return json.load(f)
+
+    @app.before_request
+    def simulate_upstream():
+        stats["requests"] += 1
+        stats[f"requests:{request.path}"] += 1
+
+        if cfg.latency_ms or cfg.latency_jitter_ms:
+            delay = cfg.latency_ms + random.uniform(-cfg.latency_jitter_ms, cfg.latency_jitter_ms)
+            time.sleep(max(delay, 0) / 1000.0)
+
+        if request.path == "/_stats":
+            return None
+
+        apikey = request.args.get("apikey")
+        if not apikey or cfg.reject_key:
+            stats["auth_errors"] += 1
+            return _td_error(401, "**apikey** parameter is incorrect or not specified.")
+
+        if cfg.rate_limit_per_min:
+            now = time.monotonic()
+            with rate_lock:
+                window = calls_per_key[apikey]
+                while window and now - window[0] > 60:
+                    window.popleft()
+                if len(window) >= cfg.rate_limit_per_min:
+                    stats["rate_limited"] += 1
+                    return _td_error(
+                        429,
+                        f"You have run out of API credits for the current minute. "
+                        f"{len(window)} API credits were used, with the current limit being "
+                        f"{cfg.rate_limit_per_min}.",
+                    )
+                window.append(now)
+
+        if cfg.error_rate and random.random() < cfg.error_rate:
+            stats["injected_errors"] += 1
+            return jsonify({"code": 500, "message": "Internal error (simulated)", "status": "error"}), 500
+
+        return None
+
+    @app.route("/quote")
+    def quote():
+        symbol = request.args.get("symbol", "")
+        fixture = load_fixture("quote", symbol)
+        if fixture is not None:
+            return jsonify(fixture)
+        if symbol not in SYNTHETIC_BASE_PRICES:
+            return _td_error(404, f"**symbol** {symbol} not found")
+        last = _random_walk(symbol, "1day", 2)
+        return jsonify({
+            "symbol": symbol,
+            "name": symbol,
+            "datetime": last[-1]["datetime"][:10],
+            "open": last[-1]["open"], "high": last[-1]["high"],
+            "low": last[-1]["low"], "close": last[-1]["close"],
+            "previous_close": last[0]["close"],
+            "is_market_open": True,
+        })
+
+    @app.route("/price")
+    def price():
+        symbol = request.args.get("symbol", "")
+        fixture = load_fixture("price", symbol)
+        if fixture is not None:
+            return jsonify(fixture)
+        if symbol not in SYNTHETIC_BASE_PRICES:
+            return _td_error(404, f"**symbol** {symbol} not found")
+        return jsonify({"price": _random_walk(symbol, "1min", 1)[-1]["close"]})
+
+    @app.route("/time_series")
+    def time_series():
+        symbol = request.args.get("symbol", "")
+        interval = request.args.get("interval", "1day")
+        outputsize = min(int(request.args.get("outputsize", 30)), 5000)
+        # Una fixture per (simbolo, intervallo, outputsize): registrazioni diverse non si sovrascrivono
+        fixture = load_fixture("time_series", symbol, interval, str(outputsize))
+        if fixture is not None:
+            return jsonify(fixture)
+        if symbol not in SYNTHETIC_BASE_PRICES:
+            return _td_error(404, f"**symbol** {symbol} not found")
+        values = _random_walk(symbol, interval, outputsize)
+        if request.args.get("order", "DESC").upper() != "ASC":
+            values.reverse()
+        return jsonify({
+            "meta": {"symbol": symbol, "interval": interval, "type": "synthetic"},
+            "values": values,
+            "status": "ok",
+        })
+
+    @app.route("/forex_pairs")
+    def forex_pairs():
+        fixture = load_fixture("forex_pairs")
+        if fixture is not None:
+            return jsonify(fixture)
+        data = [{"symbol": s} for s in SYNTHETIC_BASE_PRICES if "/" in s and not s.startswith(("XAU", "XAG", "WTI", "BRENT"))]
+        return jsonify({"data": data, "status": "ok"})
+
+    @app.route("/commodities")
+    def commodities():
+        fixture = load_fixture("commodities")
+        if fixture is not None:
+            return jsonify(fixture)
+        data = [{"symbol": s} for s in SYNTHETIC_BASE_PRICES if s.startswith(("XAU", "XAG", "WTI", "BRENT"))]
+        return jsonify({"data": data, "status": "ok"})
+
+    @app.route("/_stats")
+    def get_stats():
+        return jsonify(dict(stats))
+
+    return app
+
+
+def start_in_background(cfg: StandinConfig, host: str = "127.0.0.1", port: int = 0):
+    """Avvia lo stand-in in un thread. Ritorna (server, base_url)."""
+    from werkzeug.serving import make_server
+
+    server = make_server(host, port, create_standin_app(cfg), threaded=True)
+    threading.Thread(target=server.serve_forever, name="td-standin", daemon=True).start()
+    return server, f"http://{host}:{server.server_port}"
+
+
+# =============================================================================
+# BENCHMARK
+# =============================================================================
+def run_benchmark(cfg: StandinConfig, symbols: List[str]) -> Dict:
+    """
+    Misura il Technical Analyzer contro lo stand-in:
+    prezzi sequenziali vs batch (fan-out) e analisi completa a cache fredda/calda.
+    """
+    server, base_url = start_in_background(cfg)
+    os.environ["TD_BASE_URL"] = base_url
+    os.environ.setdefault("TD_API_KEY", "standin")
+    # Lo stand-in ha il suo rate-limit: quello locale non deve falsare le misure
+    os.environ.setdefault("TD_RATE_LIMIT_PER_MIN", "100000")
+    os.environ.setdefault("TD_CATALOG_PATH", os.path.join("data", "td_symbol_catalog.standin.json"))
+
+    import technical_analyzer as ta
+
+    results = {"base_url": base_url, "symbols": symbols}
+    try:
+        analyzer = ta.TechnicalAnalyzer()
+
+        start = time.perf_counter()
+        for s in symbols:
+            analyzer._td_get_price(s)
+        results["prices_sequential_ms"] = round((time.perf_counter() - start) * 1000, 1)
+
+        analyzer = ta.TechnicalAnalyzer()
+        start = time.perf_counter()
+        analyzer.refresh_prices(symbols)
+        results["prices_batch_ms"] = round((time.perf_counter() - start) * 1000, 1)
+
+        start = time.perf_counter()
+        for s in symbols:
+            ta.analyze_symbol_complete(s)
+        results["complete_cold_ms"] = round((time.perf_counter() - start) * 1000, 1)
+
+        start = time.perf_counter()
+        for s in symbols:
+            ta.analyze_symbol_complete(s)
+        results["complete_warm_ms"] = round((time.perf_counter() - start) * 1000, 1)
+
+        results["upstream"] = ta.get_upstream_status()
+    finally:
+        server.shutdown()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Twelve Data stand-in server")
+    parser.add_argument("command", nargs="?", default="serve", choices=["serve", "bench"])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency-ms", type=float, default=float(os.getenv("TD_STANDIN_LATENCY_MS", "0")))
+    parser.add_argument("--latency-jitter-ms", type=float, default=float(os.getenv("TD_STANDIN_JITTER_MS", "0")))
+    parser.add_argument("--error-rate", type=float, default=float(os.getenv("TD_STANDIN_ERROR_RATE", "0")))
+    parser.add_argument("--rate-limit-per-min", type=int, default=int(os.getenv("TD_STANDIN_RATE_LIMIT_PER_MIN", "0")))
+    parser.add_argument("--reject-key", action="store_true", help="Rifiuta ogni apikey (simula chiave revocata)")
+    parser.add_argument("--fixtures", default=os.getenv("TD_STANDIN_FIXTURES"),
+                        help="Directory fixture registrate (es. quella usata con TD_RECORD_DIR)")
+    parser.add_argument("--symbols", default="GOLD,SILVER,EUR,GBP,AUD,JPY,CHF,CAD,USD,OIL")
+    args = parser.parse_args()
+
+    cfg = StandinConfig(
+        latency_ms=args.latency_ms,
+        latency_jitter_ms=args.latency_jitter_ms,
+        error_rate=args.error_rate,
+        rate_limit_per_min=args.rate_limit_per_min,
+        reject_key=args.reject_key,
+        fixtures_dir=args.fixtures,
+    )
+
+    if args.command == "bench":
+        print(json.dumps(run_benchmark(cfg, args.symbols.split(",")), indent=2))
+        return
+
+    logger.info(f"Twelve Data stand-in su http://{args.host}:{args.port} "
+                f"(latency={cfg.latency_ms}ms, errors={cfg.error_rate:.0%}, "
+                f"rate_limit={cfg.rate_limit_per_min or 'off'}, fixtures={cfg.fixtures_dir})")
+    create_standin_app(cfg).run(host=args.host, port=args.port, threaded=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -9,30 +9,63 @@ VERSIONE CORRETTA CON FIX PREZZI ANOMALI
 from __future__ import annotations
 
 import os
+import json
 import logging
 import random
-from typing import Dict, List, Optional, Tuple
+from dataclasses import dataclass
+from types import MappingProxyType
+from typing import Any, Dict, List, Optional, Tuple
 from datetime import datetime, timedelta
 from time import monotonic, sleep
 from threading import Lock, RLock
 
 import numpy as np
 import pandas as pd
-import requests
 from dotenv import load_dotenv
 
+from market_data_client import CircuitBreaker, MarketDataClient
+from symbol_catalog import SymbolCatalog
+
 # -----------------------------------------------------------------------------
 # ENV & LOG
 # -----------------------------------------------------------------------------
 load_dotenv()
 TD_API_KEY = os.getenv("TWELVE_DATA_API_KEY") or os.getenv("TD_API_KEY")
+# Override per puntare allo stand-in locale (td_standin_server.py)
+TD_BASE_URL = os.getenv("TD_BASE_URL", "https://api.twelvedata.com").rstrip("/")
+# Se impostata, le risposte valide vengono salvate come fixture per lo stand-in
+TD_RECORD_DIR = os.getenv("TD_RECORD_DIR")
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger("technical_analyzer")
 
-# Sessione HTTP riutilizzabile
-_TD_SESSION = requests.Session()
-_TD_SESSION.headers.update({"User-Agent": "cot-platform/1.0"})
+# Client HTTP condiviso (pool keep-alive, retry con backoff, deadline per chiamata)
+_TD_CLIENT = MarketDataClient()
+
+# Circuit breaker per endpoint upstream: se Twelve Data è giù si passa subito al fallback
+_TD_BREAKERS: Dict[str, CircuitBreaker] = {
+    name: CircuitBreaker(f"twelvedata.{name}")
+    for name in ("quote", "price", "time_series", "catalog")
+}
+_TD_CATALOG_PATHS = {"forex_pairs", "commodities"}
+# Codici errore Twelve Data che indicano upstream degradato (chiave rifiutata, crediti, 5xx)
+_TD_BREAKER_ERROR_CODES = {401, 403, 429, 500, 502, 503, 504}
+
+
+def _td_breaker(path: str) -> CircuitBreaker:
+    return _TD_BREAKERS["catalog" if path in _TD_CATALOG_PATHS else path]
+
+
+def _td_record_outcome(path: str, data: Optional[dict]) -> None:
+    """Aggiorna il breaker dell'endpoint in base alla risposta grezza."""
+    breaker = _td_breaker(path)
+    if data is None:
+        breaker.record_failure("timeout/HTTP error")
+    elif isinstance(data, dict) and data.get("status") == "error" \
+            and data.get("code") in _TD_BREAKER_ERROR_CODES:
+        breaker.record_failure(f"API code {data.get('code')}: {data.get('message', '')[:120]}")
+    else:
+        breaker.record_success()
 
 
 # =============================================================================
@@ -98,14 +131,44 @@ class TechnicalAnalyzer:
             "OIL":    ["WTI/USD", "BRENT/USD"],
         }
 
-        self.TD_BASE = "https://api.twelvedata.com"
-        self._catalog_cache: Dict[str, set] = {"forex": set(), "commodities": set()}
+        self.TD_BASE = TD_BASE_URL
+
+        # Mapping diretto logico -> Twelve Data (non serve il catalogo)
+        self.td_direct_mapping: Dict[str, str] = {
+            "GOLD": "XAU/USD",
+            "SILVER": "XAG/USD",
+            "EUR": "EUR/USD",
+            "GBP": "GBP/USD",
+            "AUD": "AUD/USD",
+            "JPY": "USD/JPY",
+            "CHF": "USD/CHF",
+            "CAD": "USD/CAD",
+            "USD": "USDX",
+            "OIL": "WTI/USD",
+        }
+
+        # Catalogo simboli persistito su disco (TTL in giorni, refresh in background)
+        self._catalog = SymbolCatalog(
+            path=os.getenv("TD_CATALOG_PATH", os.path.join("data", "td_symbol_catalog.json")),
+            ttl_days=int(os.getenv("TD_CATALOG_TTL_DAYS", "7")),
+            fetcher=self._fetch_catalog,
+            direct_mapping=self.td_direct_mapping,
+            candidates=self.td_symbol_map,
+        )
 
     # -------------------------------------------------------------------------
     # RATE LIMITER & CACHE HELPERS
     # -------------------------------------------------------------------------
     def _throttle(self) -> None:
         """Limita a N richieste/minuto per processo (token bucket)."""
+        self._take_tokens(1)
+
+    def _take_tokens(self, wanted: int) -> int:
+        """
+        Preleva in un colpo fino a `wanted` token e ritorna quanti ne concede:
+        il burst disponibile parte subito; si attende il refill della
+        finestra solo se il bucket e' gia' vuoto.
+        """
         with self._rate_lock:
             now = monotonic()
             elapsed = now - self._window_start
@@ -119,7 +182,9 @@ class TechnicalAnalyzer:
                     sleep(wait)
                 self._tokens = self._tokens_per_min
                 self._window_start = monotonic()
-            self._tokens -= 1
+            granted = max(min(wanted, self._tokens - 1), 1)
+            self._tokens -= granted
+            return granted
 
     def _get_lock(self, symbol: str, interval: str = "") -> Lock:
         """Ritorna (creandolo se serve) il lock per (symbol, interval)."""
@@ -226,6 +291,11 @@ class TechnicalAnalyzer:
             logger.warning("TD_API_KEY non configurata")
             return None
 
+        breaker = _td_breaker(path)
+        if not breaker.allow_request():
+            logger.debug(f"TD circuit {path} aperto: fast-fail verso fallback")
+            return None
+
         q = params.copy()
         q["apikey"] = TD_API_KEY
         url = f"{self.TD_BASE}/{path}"
@@ -233,77 +303,99 @@ class TechnicalAnalyzer:
         try:
             self._throttle()
             logger.debug(f"TD API call: {url} with params: {q}")
-            r = _TD_SESSION.get(url, params=q, timeout=timeout)
-
-            if r.status_code != 200:
-                logger.warning(f"TD API HTTP error {r.status_code}: {r.text}")
-                return None
-
-            data = r.json()
-
-            if isinstance(data, dict) and data.get("status") == "error":
-                msg = data.get("message", "Unknown error")
-                logger.warning(f"TD API error: {msg}")
-                return None
-
-            logger.debug(f"TD API success: {path}")
+            data = _TD_CLIENT.request(url, q, deadline=timeout)
+            _td_record_outcome(path, data)
+            data = self._check_td_response(path, data)
+            if data is not None and TD_RECORD_DIR:
+                self._record_fixture(path, params, data)
             return data
 
         except Exception as e:
             logger.warning(f"TD API exception for {path}: {e}")
             return None
 
-    def _load_catalog(self) -> None:
-        """Carica e cachea i cataloghi di simboli (forex e commodities)."""
+    @staticmethod
+    def _record_fixture(path: str, params: Dict, data: dict) -> None:
+        """Salva la risposta in TD_RECORD_DIR nel layout letto da td_standin_server."""
+        try:
+            symbol = params.get("symbol")
+            if symbol:
+                name = symbol.replace("/", "_")
+                if path == "time_series":
+                    # Stessa chiave dello stand-in: simbolo__intervallo__outputsize
+                    name = f"{name}__{params.get('interval', '1day')}__{params.get('outputsize', '30')}"
+                target = os.path.join(TD_RECORD_DIR, path, f"{name}.json")
+            else:
+                target = os.path.join(TD_RECORD_DIR, f"{path}.json")
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            with open(target, "w", encoding="utf-8") as f:
+                json.dump(data, f)
+        except Exception as e:
+            logger.warning(f"Registrazione fixture {path} fallita: {e}")
+
+    def _check_td_response(self, path: str, data: Optional[dict]) -> Optional[dict]:
+        """Scarta risposte vuote o con status=error di Twelve Data."""
+        if data is None:
+            return None
+
+        if isinstance(data, dict) and data.get("status") == "error":
+            msg = data.get("message", "Unknown error")
+            logger.warning(f"TD API error: {msg}")
+            return None
+
+        logger.debug(f"TD API success: {path}")
+        return data
+
+    def _td_request_many(self, calls: List[Tuple[str, Dict]], timeout: int = 8) -> List[Optional[dict]]:
+        """Fan-out concorrente di piu' richieste: un round-trip invece di N sequenziali."""
         if not TD_API_KEY:
-            return
-        if not self._catalog_cache["forex"]:
-            fx = self._td_request("forex_pairs", {})
-            if isinstance(fx, dict) and isinstance(fx.get("data"), list):
-                self._catalog_cache["forex"] = {
-                    row["symbol"] for row in fx["data"] if "symbol" in row
-                }
-        if not self._catalog_cache["commodities"]:
-            com = self._td_request("commodities", {})
-            if isinstance(com, dict) and isinstance(com.get("data"), list):
-                self._catalog_cache["commodities"] = {
-                    row["symbol"] for row in com["data"] if "symbol" in row
-                }
+            logger.warning("TD_API_KEY non configurata")
+            return [None] * len(calls)
+
+        # Le chiamate verso endpoint con circuito aperto falliscono subito
+        pending = [i for i, (path, _) in enumerate(calls) if _td_breaker(path).allow_request()]
+
+        out: List[Optional[dict]] = [None] * len(calls)
+        while pending:
+            # I crediti vanno comunque rispettati: parte subito il burst ammesso
+            # dal bucket, l'eventuale resto in un'ondata dopo il refill
+            granted = self._take_tokens(len(pending))
+            wave, pending = pending[:granted], pending[granted:]
+            prepared = []
+            for i in wave:
+                path, params = calls[i]
+                q = params.copy()
+                q["apikey"] = TD_API_KEY
+                prepared.append((f"{self.TD_BASE}/{path}", q))
+
+            for i, data in zip(wave, _TD_CLIENT.fetch_many(prepared, deadline=timeout)):
+                path, params = calls[i]
+                _td_record_outcome(path, data)
+                out[i] = self._check_td_response(path, data)
+                if out[i] is not None and TD_RECORD_DIR:
+                    self._record_fixture(path, params, out[i])
+        return out
+
+    def _fetch_catalog(self) -> Optional[Dict[str, set]]:
+        """Scarica i cataloghi di simboli (forex e commodities) da Twelve Data."""
+        if not TD_API_KEY:
+            return None
+        catalog: Dict[str, set] = {"forex": set(), "commodities": set()}
+        fx = self._td_request("forex_pairs", {})
+        if isinstance(fx, dict) and isinstance(fx.get("data"), list):
+            catalog["forex"] = {row["symbol"] for row in fx["data"] if "symbol" in row}
+        com = self._td_request("commodities", {})
+        if isinstance(com, dict) and isinstance(com.get("data"), list):
+            catalog["commodities"] = {row["symbol"] for row in com["data"] if "symbol" in row}
+        return catalog
 
     def _resolve_td_symbol(self, logical_symbol: str) -> Optional[str]:
         """
         Restituisce il simbolo Twelve Data da usare per 'logical_symbol'.
         Es.: GOLD->XAU/USD, EUR->EUR/USD, JPY->USD/JPY (non invertiamo).
+        Lookup O(1) sull'indice precalcolato del catalogo persistito.
         """
-        direct_mapping = {
-            "GOLD": "XAU/USD",
-            "SILVER": "XAG/USD",
-            "EUR": "EUR/USD",
-            "GBP": "GBP/USD",
-            "AUD": "AUD/USD",
-            "JPY": "USD/JPY",
-            "CHF": "USD/CHF",
-            "CAD": "USD/CAD",
-            "USD": "USDX",  
-            "OIL": "WTI/USD",
-        }
-
-        td_symbol = direct_mapping.get(logical_symbol)
-        if td_symbol:
-            logger.debug(f"Resolved {logical_symbol} -> {td_symbol}")
-            return td_symbol
-
-        self._load_catalog()
-        candidates = self.td_symbol_map.get(logical_symbol, [])
-
-        for s in candidates:
-            if s in self._catalog_cache["forex"] or s in self._catalog_cache["commodities"]:
-                logger.debug(f"Resolved {logical_symbol} -> {s} (from catalog)")
-                return s
-
-        result = candidates[0] if candidates else None
-        logger.debug(f"Resolved {logical_symbol} -> {result} (fallback)")
-        return result
+        return self._catalog.resolve(logical_symbol)
 
     def _td_get_price(self, symbol: str) -> Tuple[Optional[float], Optional[str]]:
         """Ultimo prezzo: usa cache+lock; poi /quote, poi /price; fallback cache 'stale' o base."""
@@ -319,14 +411,9 @@ class TechnicalAnalyzer:
 
             # 2) /quote
             try:
-                data = self._td_request("quote", {"symbol": td_sym})
-                if isinstance(data, dict) and not data.get("status") == "error":
-                    if data.get("close"):
-                        raw_price = float(data["close"])
-                        # PATCH: Applica correzione automatica
-                        price = self._fix_anomalous_price(symbol, raw_price)
-                        self._cache_set_price(symbol, price)
-                        return price, td_sym
+                price = self._store_quote(symbol, self._td_request("quote", {"symbol": td_sym}))
+                if price is not None:
+                    return price, td_sym
             except Exception as e:
                 logger.warning(f"Quote API error for {td_sym}: {e}")
 
@@ -390,29 +477,13 @@ class TechnicalAnalyzer:
                     },
                     timeout=12,
                 )
-                vals = (data or {}).get("values")
-                if not vals:
+                df = self._parse_ohlc(data)
+                if df is None:
                     continue
 
-                try:
-                    df = pd.DataFrame(vals)
-                    df["datetime"] = pd.to_datetime(df["datetime"], utc=True)
-                    df = df.sort_values("datetime")
-                    for col in ["open", "high", "low", "close"]:
-                        df[col] = pd.to_numeric(df[col], errors="coerce")
-                    df = df.dropna(subset=["open", "high", "low", "close"])
-                    if df.empty:
-                        continue
-
-                    df = df.rename(
-                        columns={"open": "Open", "high": "High", "low": "Low", "close": "Close"}
-                    )[["Open", "High", "Low", "Close"]]
-
-                    logger.info(f"TD OHLC resolved: {symbol} -> {td_sym} ({itv})")
-                    self._cache_set_ohlc(symbol, interval, df)
-                    return df, td_sym
-                except Exception:
-                    continue
+                logger.info(f"TD OHLC resolved: {symbol} -> {td_sym} ({itv})")
+                self._cache_set_ohlc(symbol, interval, df)
+                return df, td_sym
 
             # 3) fallback su cache "stale" se esiste
             stale = self._ohlc_cache_store.get((symbol, interval))
@@ -423,6 +494,129 @@ class TechnicalAnalyzer:
 
             return None, None
 
+    def _store_quote(self, symbol: str, data: Optional[dict]) -> Optional[float]:
+        """Estrae il prezzo da una risposta /quote, lo corregge e lo mette in cache."""
+        if isinstance(data, dict) and not data.get("status") == "error":
+            if data.get("close"):
+                raw_price = float(data["close"])
+                # PATCH: Applica correzione automatica
+                price = self._fix_anomalous_price(symbol, raw_price)
+                self._cache_set_price(symbol, price)
+                return price
+        return None
+
+    @staticmethod
+    def _parse_ohlc(data: Optional[dict]) -> Optional[pd.DataFrame]:
+        """Converte una risposta /time_series in DataFrame Open/High/Low/Close."""
+        vals = (data or {}).get("values")
+        if not vals:
+            return None
+
+        try:
+            df = pd.DataFrame(vals)
+            df["datetime"] = pd.to_datetime(df["datetime"], utc=True)
+            df = df.sort_values("datetime")
+            for col in ["open", "high", "low", "close"]:
+                df[col] = pd.to_numeric(df[col], errors="coerce")
+            df = df.dropna(subset=["open", "high", "low", "close"])
+            if df.empty:
+                return None
+
+            return df.rename(
+                columns={"open": "Open", "high": "High", "low": "Low", "close": "Close"}
+            )[["Open", "High", "Low", "Close"]]
+        except Exception:
+            return None
+
+    # -------------------------------------------------------------------------
+    # BATCH REFRESH (fan-out concorrente)
+    # -------------------------------------------------------------------------
+    def _price_calls(self, symbols: List[str]) -> Tuple[List[Tuple[str, str]], List[Tuple[str, Dict]]]:
+        """Simboli con prezzo scaduto in cache e relative richieste /quote."""
+        pending = [
+            (s, self._resolve_td_symbol(s)) for s in symbols
+            if self._cache_get_price(s) is None
+        ]
+        pending = [(s, td) for s, td in pending if td]
+        return pending, [("quote", {"symbol": td}) for _, td in pending]
+
+    def _store_quotes(self, pending: List[Tuple[str, str]], results: List[Optional[dict]]) -> Dict[str, float]:
+        refreshed = {}
+        for (symbol, _), data in zip(pending, results):
+            try:
+                price = self._store_quote(symbol, data)
+            except Exception as e:
+                logger.warning(f"Quote batch error for {symbol}: {e}")
+                continue
+            if price is not None:
+                refreshed[symbol] = price
+
+        if pending:
+            logger.info(f"TD batch quote: {len(refreshed)}/{len(pending)} prezzi aggiornati")
+        return refreshed
+
+    def _ohlc_calls(self, symbols: List[str], interval: str,
+                    outputsize: int) -> Tuple[List[Tuple[str, str]], List[Tuple[str, Dict]]]:
+        """Simboli con serie OHLC scaduta in cache e relative richieste /time_series."""
+        pending = [
+            (s, self._resolve_td_symbol(s)) for s in symbols
+            if self._cache_get_ohlc(s, interval) is None
+        ]
+        pending = [(s, td) for s, td in pending if td]
+        calls = [
+            ("time_series", {
+                "symbol": td,
+                "interval": interval,
+                "outputsize": str(outputsize),
+                "timezone": "UTC",
+                "order": "ASC",
+            })
+            for _, td in pending
+        ]
+        return pending, calls
+
+    def _store_ohlc(self, pending: List[Tuple[str, str]], results: List[Optional[dict]], interval: str) -> List[str]:
+        refreshed = []
+        for (symbol, _), data in zip(pending, results):
+            df = self._parse_ohlc(data)
+            if df is not None:
+                self._cache_set_ohlc(symbol, interval, df)
+                refreshed.append(symbol)
+
+        if pending:
+            logger.info(f"TD batch OHLC: {len(refreshed)}/{len(pending)} serie aggiornate ({interval})")
+        return refreshed
+
+    def refresh_prices(self, symbols: List[str]) -> Dict[str, float]:
+        """Aggiorna in parallelo i prezzi scaduti in cache. Ritorna i prezzi ottenuti."""
+        pending, calls = self._price_calls(symbols)
+        if not pending:
+            return {}
+        return self._store_quotes(pending, self._td_request_many(calls))
+
+    def refresh_ohlc(self, symbols: List[str], interval: str = "1day", outputsize: int = 500) -> List[str]:
+        """Aggiorna in parallelo le serie OHLC scadute in cache. Ritorna i simboli aggiornati."""
+        pending, calls = self._ohlc_calls(symbols, interval, outputsize)
+        if not pending:
+            return []
+        return self._store_ohlc(pending, self._td_request_many(calls, timeout=12), interval)
+
+    def refresh_market(self, symbols: List[str], interval: str = "1day", outputsize: int = 500) -> Dict:
+        """
+        Prezzi e serie OHLC scaduti in un unico fan-out: un solo prelievo dal
+        token bucket e una sola deadline invece di due round-trip in sequenza.
+        """
+        price_pending, price_calls = self._price_calls(symbols)
+        ohlc_pending, ohlc_calls = self._ohlc_calls(symbols, interval, outputsize)
+        if not price_calls and not ohlc_calls:
+            return {"ohlc": [], "prices": {}}
+
+        results = self._td_request_many(ohlc_calls + price_calls, timeout=12)
+        return {
+            "ohlc": self._store_ohlc(ohlc_pending, results[:len(ohlc_calls)], interval),
+            "prices": self._store_quotes(price_pending, results[len(ohlc_calls):]),
+        }
+
     # -------------------------------------------------------------------------
     # PUBLIC API
     # -------------------------------------------------------------------------
@@ -1107,29 +1301,112 @@ class TechnicalAnalyzer:
         return sentiment_data
 
 
+# =============================================================================
+# MARKET CONTEXT CONDIVISO (calendario economico + sentiment)
+# =============================================================================
+def _freeze(value: Any) -> Any:
+    """Congela ricorsivamente dict/list in MappingProxyType/tuple."""
+    if isinstance(value, dict):
+        return MappingProxyType({k: _freeze(v) for k, v in value.items()})
+    if isinstance(value, (list, tuple)):
+        return tuple(_freeze(v) for v in value)
+    return value
+
+
+def _thaw(value: Any) -> Any:
+    """Inverso di _freeze: ritorna strutture dict/list serializzabili in JSON."""
+    if isinstance(value, MappingProxyType):
+        return {k: _thaw(v) for k, v in value.items()}
+    if isinstance(value, tuple):
+        return [_thaw(v) for v in value]
+    return value
+
+
+@dataclass(frozen=True)
+class MarketContext:
+    """Snapshot immutabile di calendario + sentiment, identico per tutti i simboli."""
+    context_id: str
+    generated_at: str
+    economic_calendar: Tuple[MappingProxyType, ...]
+    market_sentiment: MappingProxyType
+
+    def as_dict(self) -> Dict:
+        return {
+            "context_id": self.context_id,
+            "generated_at": self.generated_at,
+            "economic_calendar": _thaw(self.economic_calendar),
+            "market_sentiment": _thaw(self.market_sentiment),
+        }
+
+
+class MarketContextProvider:
+    """
+    Calcola calendario economico e sentiment UNA volta per periodo (default: giorno)
+    e li condivide tra tutti i simboli. Le risposte per simbolo riportano solo l'ID.
+    """
+
+    def __init__(self, analyzer: TechnicalAnalyzer, days_ahead: int = 7):
+        self._analyzer = analyzer
+        self._days_ahead = days_ahead
+        self._context: Optional[MarketContext] = None
+        self._lock = Lock()
+
+    @staticmethod
+    def _period_id(now: datetime) -> str:
+        return f"mkt-{now:%Y%m%d}"
+
+    def get(self) -> MarketContext:
+        """Ritorna il contesto del periodo corrente, generandolo solo al cambio periodo."""
+        period_id = self._period_id(datetime.now())
+        ctx = self._context
+        if ctx is not None and ctx.context_id == period_id:
+            return ctx
+
+        with self._lock:
+            ctx = self._context
+            if ctx is not None and ctx.context_id == period_id:
+                return ctx
+            ctx = MarketContext(
+                context_id=period_id,
+                generated_at=datetime.now().isoformat(),
+                economic_calendar=_freeze(self._analyzer.get_economic_calendar(self._days_ahead)),
+                market_sentiment=_freeze(self._analyzer.get_market_sentiment_data()),
+            )
+            self._context = ctx
+            logger.info(f"[OK] Market context {period_id} generato (condiviso tra i simboli)")
+            return ctx
+
+
 # =============================================================================
 # FUNZIONI HELPER PER LE API
 # =============================================================================
 
 # Istanza globale del TechnicalAnalyzer per performance
 GLOBAL_TA = TechnicalAnalyzer()
-
-def analyze_symbol_complete(symbol: str) -> Dict:
+MARKET_CONTEXT = MarketContextProvider(GLOBAL_TA)
+
+def analyze_symbol_complete(symbol: str, include_market_context: bool = False) -> Dict:
+    """
+    Analisi completa per simbolo. Calendario e sentiment non vengono duplicati:
+    la risposta contiene 'market_context_id' (vedi get_market_context()).
+    Con include_market_context=True vengono incorporati come prima.
+    """
     analyzer = GLOBAL_TA
     try:
         sr_analysis = analyzer.calculate_support_resistance(symbol)
         technical_signals = analyzer.get_technical_signals(symbol)
-        economic_calendar = analyzer.get_economic_calendar(7)
-        market_sentiment = analyzer.get_market_sentiment_data()
+        context = MARKET_CONTEXT.get()
         combined = {
             "symbol": symbol,
             "timestamp": datetime.now().isoformat(),
             "support_resistance": sr_analysis,
             "technical_signals": technical_signals,
-            "economic_calendar": economic_calendar,
-            "market_sentiment": market_sentiment,
+            "market_context_id": context.context_id,
             "status": "SUCCESS",
         }
+        if include_market_context:
+            combined["economic_calendar"] = _thaw(context.economic_calendar)
+            combined["market_sentiment"] = _thaw(context.market_sentiment)
         return combined
     except Exception as e:
         logger.error(f"[ERROR] Errore analisi completa {symbol}: {e}")
@@ -1138,11 +1415,27 @@ def analyze_symbol_complete(symbol: str) -> Dict:
 def get_symbol_technical_data(symbol: str) -> Dict:
     return GLOBAL_TA.calculate_support_resistance(symbol)
 
+def refresh_market_data(symbols: List[str]) -> Dict:
+    """Pre-carica prezzi e serie OHLC per piu' simboli in un solo round-trip concorrente."""
+    return GLOBAL_TA.refresh_market(symbols)
+
+def get_upstream_status() -> Dict:
+    """Stato dei circuit breaker Twelve Data (per /api/system/status)."""
+    breakers = {name: b.get_status() for name, b in _TD_BREAKERS.items()}
+    degraded = any(b["state"] != CircuitBreaker.CLOSED for b in breakers.values())
+    return {
+        "status": "NOT_CONFIGURED" if not TD_API_KEY else ("DEGRADED" if degraded else "ONLINE"),
+        "circuits": breakers,
+    }
+
+def get_market_context() -> MarketContext:
+    return MARKET_CONTEXT.get()
+
 def get_economic_events() -> List[Dict]:
-    return GLOBAL_TA.get_economic_calendar()
+    return _thaw(MARKET_CONTEXT.get().economic_calendar)
 
 def get_market_sentiment() -> Dict:
-    return GLOBAL_TA.get_market_sentiment_data()
+    return _thaw(MARKET_CONTEXT.get().market_sentiment)
 
 def get_technical_signals(symbol: str) -> Dict:
     return GLOBAL_TA.get_technical_signals(symbol)
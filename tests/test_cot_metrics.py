@@ -0,0 +1,79 @@
+"""
+Metriche COT: le righe lette da cot_latest devono passare dal fast path
+di metrics_for (valori salvati all'ingest, nessun ricalcolo).
+"""
+
+import os
+import sys
+from datetime import datetime
+
+import pytest
+
+# Setup path per imports
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+pytest.importorskip("pandas")  # analysis/__init__ importa i moduli GPT e previsioni
+
+from analysis.cot_metrics import (  # noqa: E402
+    BASE_FIELDS, METRIC_COLUMNS, compute_changes, compute_metrics, metrics_for,
+)
+
+REPORT = {
+    'non_commercial_long': 250000,
+    'non_commercial_short': 90000,
+    'commercial_long': 120000,
+    'commercial_short': 280000,
+}
+PREVIOUS = {
+    'non_commercial_long': 240000,
+    'non_commercial_short': 95000,
+    'commercial_long': 125000,
+    'commercial_short': 270000,
+}
+
+
+def _stored_row():
+    """Riga come salvata all'ingest: base + metriche + variazioni"""
+    row = dict(REPORT)
+    row.update(compute_metrics(REPORT))
+    row.update(compute_changes(compute_metrics(REPORT), compute_metrics(PREVIOUS)))
+    return row
+
+
+def test_stored_row_passes_fast_path():
+    row = _stored_row()
+    assert metrics_for(row) is row
+
+
+def test_missing_metric_falls_back_to_compute():
+    row = _stored_row()
+    row['total_long'] = None
+    result = metrics_for(row)
+    assert result is not row
+    assert result['total_long'] == REPORT['non_commercial_long'] + REPORT['commercial_long']
+
+
+@pytest.fixture(scope="module")
+def app_module(tmp_path_factory):
+    pytest.importorskip("flask_sqlalchemy")
+    os.environ['DATABASE_URL'] = f"sqlite:///{tmp_path_factory.mktemp('db') / 'cot_test.db'}"
+    os.environ['COT_ARCHIVE_ENABLED'] = 'false'
+    return pytest.importorskip("app_complete")
+
+
+def test_fetch_latest_cot_row_passes_fast_path(app_module):
+    row = dict(REPORT, symbol='GOLD', date=datetime(2024, 6, 4))
+    with app_module.app.app_context():
+        app_module.upsert_cot_rows([row], archive=False)
+        latest = app_module.fetch_latest_cot('GOLD')
+        assert latest is not None
+
+        stored = latest._asdict()
+        assert all(stored.get(column) is not None for column in METRIC_COLUMNS)
+        assert metrics_for(stored) is stored
+
+        expected = compute_metrics(REPORT)
+        for column in METRIC_COLUMNS:
+            assert stored[column] == pytest.approx(expected[column])
+        for field in BASE_FIELDS:
+            assert stored[field] == REPORT[field]